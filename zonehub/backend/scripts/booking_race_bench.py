@@ -0,0 +1,148 @@
+# backend/scripts/booking_race_bench.py
+# Concurrency check for booking creation: N threads POST /api/bookings/ for
+# the same slot(s) at once, then the bookings table is scanned for overlapping
+# live bookings of one field. field_booking_lock + has_conflict must leave at
+# most one booking per slot.
+#
+#   python scripts/booking_race_bench.py --threads 40 --requests 400 --fields 4
+#   python scripts/booking_race_bench.py --delay-ms 5 --unlocked   # shows the race without the lock
+#
+# --delay-ms sleeps between the conflict check and the insert to widen the
+# race window. Uses its own SQLite file by default; with --database-url it
+# seeds a user and fields there, so never point it at production.
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+SLOT_START = datetime(2030, 1, 7, 18)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Concurrent double-booking benchmark')
+    parser.add_argument('--threads', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=400, help='Booking requests in total, spread over the threads')
+    parser.add_argument('--fields', type=int, default=4, help='Fields competed for; every request targets one slot of one field')
+    parser.add_argument('--delay-ms', type=float, default=0, help='Sleep after the conflict check, before the insert')
+    parser.add_argument('--unlocked', action='store_true', help='Replace field_booking_lock with a no-op (expected to FAIL)')
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file')
+    return parser.parse_args()
+
+
+def seed(app, count):
+    """An admin user and `count` fields; returns (auth header, [field id])"""
+    from flask_jwt_extended import create_access_token
+    from src.extensions import db
+    from src.models import User, Field
+    with app.app_context():
+        db.create_all()
+        stamp = int(time.time() * 1000)
+        user = User(username=f'bench_{stamp}', email=f'bench_{stamp}@example.com', password='bench',
+                    full_name='Booking Bench', role='admin')
+        db.session.add(user)
+        db.session.commit()
+        fields = [
+            Field(name=f'Bench {stamp} #{i}', address='Bench', city='Bench', field_type='5',
+                  price_per_hour=100000, owner_id=user.id)
+            for i in range(count)
+        ]
+        db.session.add_all(fields)
+        db.session.commit()
+        return {'Authorization': 'Bearer ' + create_access_token(identity=str(user.id))}, [f.id for f in fields]
+
+
+def patch_route(delay_ms, unlocked):
+    from src.routes import booking as booking_routes
+    if delay_ms:
+        check = booking_routes.ensure_slot_free
+
+        def slow_check(*args, **kwargs):
+            check(*args, **kwargs)
+            time.sleep(delay_ms / 1000)
+
+        booking_routes.ensure_slot_free = slow_check
+    if unlocked:
+        @contextmanager
+        def no_lock(field_id):
+            yield
+
+        booking_routes.field_booking_lock = no_lock
+
+
+def overlapping_pairs(app, field_ids):
+    """Pairs of live bookings of one field whose intervals overlap"""
+    from src.models.booking import Booking
+    from src.services.availability import INACTIVE_STATUSES
+    pairs = 0
+    with app.app_context():
+        for field_id in field_ids:
+            rows = Booking.query.with_entities(Booking.start_time, Booking.end_time).filter(
+                Booking.field_id == field_id, Booking.status.notin_(INACTIVE_STATUSES)
+            ).order_by(Booking.start_time).all()
+            for i, (start, end) in enumerate(rows):
+                pairs += sum(1 for other_start, _ in rows[i + 1:] if other_start < end)
+    return pairs
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'booking_bench.db')
+    os.environ.update(
+        DATABASE_URL=database_url,
+        JWT_SECRET_KEY=os.environ.get('JWT_SECRET_KEY', 'booking-bench-secret-key-of-32-bytes'),
+        PENDING_SWEEPER_ENABLED='0'
+    )
+
+    from src.app import create_app
+    app = create_app()
+    headers, field_ids = seed(app, args.fields)
+    patch_route(args.delay_ms, args.unlocked)
+
+    # Request n books field n % fields; every other request starts 30 minutes
+    # later, so half of them collide on a partial overlap rather than the exact slot
+    payloads = []
+    for n in range(args.requests):
+        start = SLOT_START + timedelta(minutes=30 * (n // args.fields % 2))
+        payloads.append({'field_id': field_ids[n % args.fields], 'start_time': start.isoformat(),
+                         'end_time': (start + timedelta(hours=1)).isoformat()})
+
+    statuses = {}
+    status_lock = threading.Lock()
+    start_gate = threading.Barrier(args.threads)
+
+    def worker(index):
+        client = app.test_client()
+        start_gate.wait()
+        for payload in payloads[index::args.threads]:
+            code = client.post('/api/bookings/', json=payload, headers=headers).status_code
+            with status_lock:
+                statuses[code] = statuses.get(code, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    pairs = overlapping_pairs(app, field_ids)
+    print(f'threads={args.threads} requests={args.requests} fields={args.fields} '
+          f'delay_ms={args.delay_ms} lock={"off" if args.unlocked else "on"}')
+    print(f'responses {dict(sorted(statuses.items()))} in {elapsed:.2f}s = {args.requests / elapsed:.0f} req/s')
+    if pairs or statuses.get(201, 0) > args.fields:
+        print(f'FAIL: {pairs} overlapping booking pairs, {statuses.get(201, 0)} bookings for {args.fields} slots')
+        return 1
+    print('OK: at most one booking per slot')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# backend/scripts/chat_fanout_loadtest.py
+# Load test for multi-worker chat: starts a tcp:// broker and N app workers
+# (src/main.py, one port and CHAT_WORKER_ID each), spreads Socket.IO clients
+# over the workers, has every client send messages to one match room and
+# checks that every client received every message, whichever worker it sits on.
+#
+#   python scripts/chat_fanout_loadtest.py --workers 3 --clients 30 --messages 20
+#
+# Uses its own SQLite file by default; with --database-url it seeds two users,
+# two teams, a match and a chat room there, so never point it at production.
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Cross-worker chat broadcast load test')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--clients', type=int, default=30, help='Socket.IO clients, spread round-robin over the workers')
+    parser.add_argument('--messages', type=int, default=20, help='Messages sent by each client')
+    parser.add_argument('--rate', type=float, default=20, help='Messages per second per client')
+    parser.add_argument('--base-port', type=int, default=5101)
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for delivery')
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Worker on port {port} did not start')
+
+
+def seed(app):
+    """Two team members and an active match room; returns (room_id, [token, token])"""
+    from flask_jwt_extended import create_access_token
+    from src.extensions import db
+    from src.models import User, Team, TeamMember, Match, ChatRoom
+    with app.app_context():
+        db.create_all()
+        stamp = int(time.time() * 1000)
+        users = [
+            User(username=f'loadtest_{side}_{stamp}', email=f'loadtest_{side}_{stamp}@example.com',
+                 password='loadtest', full_name=f'Load Test {side.upper()}', role='user')
+            for side in ('a', 'b')
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        teams = [Team(name=f'Load Test {user.full_name}', owner_id=user.id) for user in users]
+        db.session.add_all(teams)
+        db.session.commit()
+        db.session.add_all([TeamMember(team_id=team.id, user_id=user.id) for team, user in zip(teams, users)])
+        match = Match(team_a_id=teams[0].id, team_b_id=teams[1].id, initiating_team_id=teams[0].id,
+                      invited_team_id=teams[1].id, status='confirmed')
+        db.session.add(match)
+        db.session.commit()
+        room = ChatRoom(match_id=match.id, status='active')
+        db.session.add(room)
+        db.session.commit()
+        return room.id, [create_access_token(identity=str(user.id)) for user in users]
+
+
+class LoadClient:
+    def __init__(self, index, port, token, room_id):
+        import socketio
+        from engineio.payload import Payload
+        # A busy room packs many messages into one long-poll response; the
+        # default decode limit (16) would drop this client
+        Payload.max_decode_packets = 10000
+        self.index = index
+        self.port = port
+        self.room_id = room_id
+        self.received = {}  # content -> receive time
+        self.joined = threading.Event()
+        self.client = socketio.Client()
+        self.client.on('room_joined', lambda data: self.joined.set())
+        self.client.on('new_message', self.on_message)
+        self.client.connect(f'http://127.0.0.1:{port}', auth={'token': token}, transports=['polling'])
+        self.client.emit('join_room', {'room_id': room_id})
+
+    def on_message(self, data):
+        self.received[data['content']] = time.time()
+
+    def send(self, count, rate):
+        # Paced: a polling client packs everything queued into one POST, and
+        # the server refuses payloads of more than 16 packets
+        for n in range(count):
+            self.client.emit('send_message', {'room_id': self.room_id, 'content': f'{self.index}:{n}:{time.time()}'})
+            time.sleep(1 / rate)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+    broker_port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        JWT_SECRET_KEY=os.environ.get('JWT_SECRET_KEY', 'loadtest-secret'),
+        SOCKETIO_MESSAGE_QUEUE=f'tcp://127.0.0.1:{broker_port}',
+        SOCKETIO_ASYNC_MODE='threading',
+        PENDING_SWEEPER_ENABLED='0',
+        FLASK_DEBUG='0'
+    )
+    os.environ.update(env)
+
+    from src.app import create_app
+    from src.services.socket_queue import start_broker
+    broker = start_broker(port=broker_port)
+    room_id, tokens = seed(create_app())
+
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = [
+        subprocess.Popen([sys.executable, os.path.join(BACKEND, 'src', 'main.py')],
+                         env=dict(env, PORT=str(port), CHAT_WORKER_ID=str(i)),
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for i, port in enumerate(ports)
+    ]
+    clients = []
+    try:
+        for port in ports:
+            wait_for_port(port)
+        clients = [LoadClient(i, ports[i % len(ports)], tokens[i % 2], room_id) for i in range(args.clients)]
+        for client in clients:
+            if not client.joined.wait(10):
+                raise RuntimeError(f'Client {client.index} could not join the room')
+
+        expected = args.clients * args.messages
+        started = time.time()
+        senders = [threading.Thread(target=client.send, args=(args.messages, args.rate)) for client in clients]
+        for thread in senders:
+            thread.start()
+        for thread in senders:
+            thread.join()
+        deadline = time.monotonic() + args.timeout
+        while time.monotonic() < deadline and any(len(client.received) < expected for client in clients):
+            time.sleep(0.1)
+        elapsed = time.time() - started
+
+        latencies = []
+        cross_worker = 0
+        for client in clients:
+            for content, received_at in client.received.items():
+                sender, _, sent_at = content.split(':', 2)
+                latencies.append((received_at - float(sent_at)) * 1000)
+                if clients[int(sender)].port != client.port:
+                    cross_worker += 1
+        delivered = sum(len(client.received) for client in clients)
+        missing = [client.index for client in clients if len(client.received) < expected]
+
+        print(f'workers={args.workers} clients={args.clients} messages={expected} broker_relayed={broker.relayed}')
+        print(f'deliveries {delivered}/{expected * args.clients} ({cross_worker} across workers) in {elapsed:.2f}s '
+              f'= {delivered / elapsed:.0f}/s')
+        if latencies:
+            print(f'latency ms p50={percentile(latencies, 0.5):.1f} p95={percentile(latencies, 0.95):.1f} '
+                  f'max={max(latencies):.1f}')
+        if missing:
+            print(f'FAIL: clients {missing} missed messages')
+            return 1
+        print('OK: every client received every message')
+        return 0
+    finally:
+        for client in clients:
+            client.client.disconnect()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+        broker.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
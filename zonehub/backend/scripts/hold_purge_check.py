@@ -0,0 +1,59 @@
+# backend/scripts/hold_purge_check.py
+# Check that expired slot holds do not pile up in SlotHoldMap: holds on slots
+# nobody looks at again (local or received from other workers) must be
+# dropped by the periodic purge in _insert. Runs on a fake clock, no database.
+#
+#   python scripts/hold_purge_check.py
+import os
+import sys
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+import src.app  # noqa: E402,F401  (loads the models/routes before services, as at runtime)
+from src.services.holds import PURGE_EVERY, Hold, SlotHoldMap  # noqa: E402
+
+TTL = 600
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2030, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    clock = Clock()
+    holds = SlotHoldMap(clock=clock)
+    day = datetime(2030, 1, 7, 6)
+
+    # One wave of holds on distinct slots, all of which then expire unseen
+    for n in range(PURGE_EVERY - 1):
+        start = day + timedelta(hours=n % 16, days=n // 16)
+        holds.acquire(1, f'user{n}', start, start + timedelta(hours=1), TTL, max_per_user=5)
+    peak = len(holds)
+    clock.now += timedelta(seconds=TTL + 1)
+
+    # The next inserts, on other fields, trigger the purge; half arrive as remote holds
+    for n in range(PURGE_EVERY):
+        start = day + timedelta(hours=n % 16, days=n // 16)
+        if n % 2:
+            holds.restore(Hold(f'remote{n}', 2, f'remote{n}', start, start + timedelta(hours=1),
+                               clock.now + timedelta(seconds=TTL)))
+        else:
+            holds.acquire(3, f'user{n}', start, start + timedelta(hours=1), TTL, max_per_user=5)
+    live = len(holds)
+
+    print(f'holds before expiry={peak} after {PURGE_EVERY} more inserts={live}')
+    if peak != PURGE_EVERY - 1 or live > PURGE_EVERY:
+        print(f'FAIL: expected at most {PURGE_EVERY} live holds, the expired ones were kept')
+        return 1
+    print('OK: expired holds were purged')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,7 @@ from src.routes.field import field_bp
 from src.routes.booking import booking_bp
 from src.routes.team_finder import team_finder_bp
 from src.routes.notification import notification_bp
+from src.routes.admin import admin_bp
 # from src.routes.chat import chat_bp # Removed import for deprecated chat system
 from src.routes.matchmaking import matchmaking_bp # Import new matchmaking routes
 # Import chat events after defining create_app to avoid circular imports if needed
@@ -32,8 +33,9 @@ def create_app(config_name="default"):
     jwt.init_app(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}}) # Adjust origins as needed
     # Initialize SocketIO with the app
-    # Use async_mode="eventlet" as specified in requirements.txt
-    socketio.init_app(app, cors_allowed_origins="*") # Adjust origins
+    # With SOCKETIO_MESSAGE_QUEUE set, workers share emits and rooms through it (services/socket_queue.py)
+    from .services.socket_queue import socketio_options
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_options()) # Adjust origins
 
     # Register Blueprints
     app.register_blueprint(user_bp, url_prefix="/api/users")
@@ -41,6 +43,7 @@ def create_app(config_name="default"):
     app.register_blueprint(booking_bp, url_prefix="/api/bookings")
     app.register_blueprint(team_finder_bp, url_prefix="/api/team_finder")
     app.register_blueprint(notification_bp, url_prefix="/api/notifications")
+    app.register_blueprint(admin_bp, url_prefix="/api/admin")
     # app.register_blueprint(chat_bp, url_prefix="/api/chat") # Removed registration for deprecated chat system
     app.register_blueprint(matchmaking_bp) # Already has url_prefix="/api/matchmaking"
 
@@ -48,6 +51,21 @@ def create_app(config_name="default"):
     # This needs to be done after socketio is initialized
     from . import chat_events # Assuming chat_events.py is in the same directory (src)
     chat_events.register_events(socketio)
+    from . import booking_events # Live booking feed subscriptions
+    booking_events.register_events(socketio)
+
+    # CLI: flask expire-pending-bookings (the in-process sweeper is started from main.py)
+    from .services.sweeper import register_commands
+    register_commands(app)
+    # CLI: flask rebuild-daily-stats (backfill/repair of the field_daily_stats rollup)
+    from .services import rollups
+    rollups.register_commands(app)
+    # CLI: flask socketio-broker (tcp:// message queue for local multi-worker runs)
+    from .services import socket_queue
+    socket_queue.register_commands(app)
+    # CLI: flask localize-booking-times (one-off move of old UTC booking times to local time)
+    from .services import local_time
+    local_time.register_commands(app)
 
     return app
 
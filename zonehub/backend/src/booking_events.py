@@ -0,0 +1,75 @@
+# backend/src/booking_events.py
+# SocketIO subscriptions for the live booking feed (see services/booking_feed.py)
+from flask import request
+from flask_socketio import emit, join_room, leave_room
+from flask_jwt_extended import decode_token
+from .models import User
+from .services.facets import ensure_field_columns
+from .services.booking_feed import field_room, owner_room
+
+
+def register_events(socketio_instance):
+
+    @socketio_instance.on("subscribe_field")
+    def handle_subscribe_field(data):
+        """Follow slot changes of one field (public, like its availability)."""
+        field_id = data.get("field_id") if isinstance(data, dict) else None
+        if not isinstance(field_id, int) or field_id not in ensure_field_columns().price:
+            emit("error", {"message": "Field not found"})
+            return
+        join_room(field_room(field_id))
+        emit("field_subscribed", {"field_id": field_id})
+
+    @socketio_instance.on("unsubscribe_field")
+    def handle_unsubscribe_field(data):
+        field_id = data.get("field_id") if isinstance(data, dict) else None
+        if field_id is not None:
+            leave_room(field_room(field_id))
+
+    @socketio_instance.on("subscribe_owner")
+    def handle_subscribe_owner(data):
+        """Follow every booking on the caller's own fields (owners), or on owner_id's fields (admins)."""
+        token = data.get("token") if isinstance(data, dict) else None
+        if not token:
+            emit("error", {"message": "Missing token"})
+            return
+
+        try:
+            user_id = decode_token(token)["sub"]
+        except Exception:
+            emit("error", {"message": "Invalid or expired token"})
+            return
+
+        user = User.query.get(user_id)
+        if not user or user.role not in ("owner", "admin"):
+            emit("error", {"message": "Unauthorized"})
+            return
+
+        owner_id = data.get("owner_id")
+        if user.role == "admin":
+            # Admins watch one owner at a time, like GET /api/bookings/owner/stats?owner_id=
+            if not isinstance(owner_id, int) or not User.query.get(owner_id):
+                emit("error", {"message": "owner_id is required"})
+                return
+        elif owner_id is not None and owner_id != user.id:
+            emit("error", {"message": "Unauthorized"})
+            return
+        else:
+            owner_id = user.id
+
+        join_room(owner_room(owner_id))
+        print(f"User {user.id} subscribed to booking feed of owner {owner_id} (sid: {request.sid})")
+        emit("owner_subscribed", {"owner_id": owner_id})
+
+    @socketio_instance.on("unsubscribe_owner")
+    def handle_unsubscribe_owner(data):
+        token = data.get("token") if isinstance(data, dict) else None
+        try:
+            user_id = decode_token(token)["sub"]
+        except Exception:
+            return
+        # Admins pass the owner_id they subscribed to; leaving a room never grants anything
+        owner_id = data.get("owner_id")
+        leave_room(owner_room(owner_id if isinstance(owner_id, int) else user_id))
+
+    print("Booking feed events registered.")
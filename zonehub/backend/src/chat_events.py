@@ -3,8 +3,12 @@ from flask import request
 from flask_socketio import emit, join_room, leave_room
 from flask_jwt_extended import decode_token # To manually decode token if needed
 from .extensions import socketio, db
-from .models import ChatMessage, ChatRoom, User, TeamMember, Match
-from datetime import datetime
+from .models import ChatMessage
+from .services.chat_auth import chat_sessions, chat_room_name, is_user_in_match_room
+from .services.chat_writer import queue_message
+from .services.chat_history import parse_history_args, room_history
+from .services.user_names import display_name
+from .config import CHAT_CONFIG
 
 # Helper function to get user_id from token (adapt as needed)
 # This is a simplified example; robust token handling might be needed
@@ -19,83 +23,118 @@ def get_user_id_from_token(auth_header):
         print(f"Token decoding error: {e}")
         return None
 
-# Function to check if user is part of the match associated with the room
-def is_user_in_match_room(user_id, room_id):
-    room = ChatRoom.query.get(room_id)
-    # Corrected string literal
-    if not room or room.status != "active":
-        return False
-    match = Match.query.get(room.match_id)
-    if not match:
-        return False
-    
-    is_member_a = TeamMember.query.filter_by(team_id=match.team_a_id, user_id=user_id).first()
-    is_member_b = TeamMember.query.filter_by(team_id=match.team_b_id, user_id=user_id).first()
-    
-    return bool(is_member_a or is_member_b)
+# Decode a JWT once and remember the identity for this socket connection
+def authenticate_sid(sid, token):
+    try:
+        decoded_token = decode_token(token)
+    except Exception as e:
+        print(f"Token decoding error: {e}")
+        return None
+    user_id = decoded_token["sub"]
+    chat_sessions.authenticate(sid, user_id, decoded_token.get("exp"))
+    return user_id
+
+# Authorize sid for a room: a cached grant costs nothing; otherwise check the DB once and cache.
+# Returns (user_id, error message or None)
+def authorize_room(sid, room_id, token, action):
+    user_id, allowed = chat_sessions.allowed(sid, room_id)
+    if allowed:
+        return user_id, None
+    if user_id is None:
+        if not token:
+            return None, "Missing token"
+        user_id = authenticate_sid(sid, token)
+        if user_id is None:
+            return None, "Invalid or expired token"
+    if not is_user_in_match_room(user_id, room_id):
+        return user_id, f"Unauthorized to {action}"
+    chat_sessions.grant(sid, room_id)
+    return user_id, None
+
+def parse_room_id(data):
+    try:
+        return int(data.get("room_id"))
+    except (AttributeError, TypeError, ValueError):
+        return None
 
 def register_events(socketio_instance):
 
     # Corrected event names and dictionary keys/values
     @socketio_instance.on("connect")
-    def handle_connect():
-        # Optional: Authenticate user on connection using token
-        # auth_header = request.headers.get("Authorization")
-        # user_id = get_user_id_from_token(auth_header)
-        # if not user_id:
-        #     print(f"Client disconnected: Invalid token")
-        #     return False # Reject connection
-        # print(f"Client connected: {request.sid}, User ID: {user_id}")
-        print(f"Client connected: {request.sid}")
+    def handle_connect(auth=None):
+        # Authenticate once per connection when the client sends io(url, { auth: { token } });
+        # older clients still pass the token with join_room / send_message
+        token = auth.get("token") if isinstance(auth, dict) else None
+        if not token:
+            token = (request.headers.get("Authorization") or "").replace("Bearer ", "", 1) or None
+        user_id = authenticate_sid(request.sid, token) if token else None
+        print(f"Client connected: {request.sid}, User ID: {user_id}")
         emit("connection_success", {"message": "Connected successfully"})
 
     @socketio_instance.on("disconnect")
     def handle_disconnect():
+        chat_sessions.drop(request.sid)
         print(f"Client disconnected: {request.sid}")
 
     @socketio_instance.on("join_room")
     def handle_join_room(data):
         """Handle client joining a chat room."""
-        room_id = data.get("room_id")
-        token = data.get("token") # Expect token for authorization
+        room_id = parse_room_id(data)
+        token = data.get("token") if isinstance(data, dict) else None # Not needed if sent on connect
 
-        if not room_id or not token:
-            emit("error", {"message": "Missing room_id or token"})
-            return
-
-        try:
-            decoded_token = decode_token(token)
-            user_id = decoded_token["sub"]
-        except Exception as e:
-            emit("error", {"message": "Invalid or expired token"})
+        if not room_id:
+            emit("error", {"message": "Missing room_id"})
             return
 
-        if not is_user_in_match_room(user_id, room_id):
-            emit("error", {"message": "Unauthorized to join this room"})
+        user_id, error = authorize_room(request.sid, room_id, token, "join this room")
+        if error:
+            emit("error", {"message": error})
             return
 
-        room_name = f"match_room_{room_id}"
+        room_name = chat_room_name(room_id)
         join_room(room_name)
         print(f"User {user_id} joined room: {room_name} (sid: {request.sid})")
         emit("room_joined", {"room_id": room_id, "message": f"Successfully joined room {room_id}"}, room=room_name)
         
-        # Optionally send recent chat history
+        # Send the latest page of history; older pages come from get_chat_history
         try:
-            messages = ChatMessage.query.filter_by(room_id=room_id).order_by(ChatMessage.timestamp.asc()).limit(50).all()
-            emit("chat_history", {"room_id": room_id, "messages": [msg.to_dict() for msg in messages]})
+            emit("chat_history", room_history(room_id))
         except Exception as e:
              print(f"Error fetching chat history for room {room_id}: {e}")
 
+    @socketio_instance.on("get_chat_history")
+    def handle_get_chat_history(data):
+        """Send one page of messages older than before_id (latest page without it)."""
+        room_id = parse_room_id(data)
+        if not room_id:
+            emit("error", {"message": "Missing room_id"})
+            return
+
+        token = data.get("token") if isinstance(data, dict) else None # Not needed if sent on connect
+
+        user_id, error = authorize_room(request.sid, room_id, token, "read this room")
+        if error:
+            emit("error", {"message": error})
+            return
+
+        try:
+            before_id, limit = parse_history_args(data)
+        except ValueError as e:
+            emit("error", {"message": str(e)})
+            return
+        emit("chat_history", room_history(room_id, before_id, limit))
+
     @socketio_instance.on("leave_room")
     def handle_leave_room(data):
         """Handle client leaving a chat room."""
-        room_id = data.get("room_id")
+        room_id = parse_room_id(data)
         if not room_id:
              emit("error", {"message": "Missing room_id"})
              return
              
-        room_name = f"match_room_{room_id}"
+        room_name = chat_room_name(room_id)
         leave_room(room_name)
+        chat_sessions.revoke(request.sid, room_id)
         # user_id = get_user_id_from_token(request.headers.get("Authorization")) # Get user ID if needed
         print(f"Client {request.sid} left room: {room_name}")
         emit("room_left", {"room_id": room_id, "message": f"Successfully left room {room_id}"})
@@ -103,40 +142,41 @@ def register_events(socketio_instance):
     @socketio_instance.on("send_message")
     def handle_send_message(data):
         """Handle receiving and broadcasting messages."""
-        room_id = data.get("room_id")
-        content = data.get("content")
-        token = data.get("token") # Expect token for authorization
-
-        if not room_id or not content or not token:
-            emit("error", {"message": "Missing room_id, content, or token"})
-            return
+        room_id = parse_room_id(data)
+        content = data.get("content") if isinstance(data, dict) else None
+        token = data.get("token") if isinstance(data, dict) else None # Only used if the socket is not authenticated yet
 
-        try:
-            decoded_token = decode_token(token)
-            user_id = decoded_token["sub"]
-        except Exception as e:
-            emit("error", {"message": "Invalid or expired token"})
+        if not room_id or not content:
+            emit("error", {"message": "Missing room_id or content"})
             return
 
-        if not is_user_in_match_room(user_id, room_id):
-            emit("error", {"message": "Unauthorized to send message to this room"})
+        # Zero queries once this socket holds a grant for the room
+        user_id, error = authorize_room(request.sid, room_id, token, "send message to this room")
+        if error:
+            emit("error", {"message": error})
             return
 
+        room_name = chat_room_name(room_id)
         try:
-            # Save message to database
-            # Corrected string literal
-            message = ChatMessage(
-                room_id=room_id,
-                sender_id=user_id,
-                content=content,
-                message_type="user"
-            )
-            db.session.add(message)
-            db.session.commit()
+            if CHAT_CONFIG["WRITE_MODE"] == "sync":
+                # Save message to database
+                # Corrected string literal
+                message = ChatMessage(
+                    room_id=room_id,
+                    sender_id=user_id,
+                    content=content,
+                    message_type="user"
+                )
+                db.session.add(message)
+                db.session.commit()
+                payload = message.to_dict()
+            else:
+                # Broadcast now; the row is written with the next batch (the name is cached, no query)
+                sender_id = int(user_id)
+                payload = queue_message(room_id, sender_id, display_name(sender_id), content)
 
             # Broadcast message to the room
-            room_name = f"match_room_{room_id}"
-            emit("new_message", message.to_dict(), room=room_name)
+            emit("new_message", payload, room=room_name)
             print(f"Message sent by User {user_id} to room {room_name}: {content}")
 
         except Exception as e:
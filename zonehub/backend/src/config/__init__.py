@@ -17,7 +17,84 @@ JWT_CONFIG = {
     'EXPIRATION': int(os.environ.get('JWT_EXPIRATION', 86400))
 }
 
+# Múi giờ của sân: giờ đặt sân được lưu và tính giá theo giờ địa phương
+TIME_CONFIG = {
+    'TIMEZONE': os.environ.get('APP_TIMEZONE', 'Asia/Ho_Chi_Minh'),
+    # Dùng khi máy không có dữ liệu múi giờ (Windows chưa cài tzdata)
+    'FALLBACK_UTC_OFFSET': int(os.environ.get('APP_UTC_OFFSET', 7))
+}
+
 # Cấu hình cho CORS
 CORS_CONFIG = {
     'ORIGINS': os.environ.get('CORS_ORIGINS', 'http://localhost:5173,http://localhost:3000').split(',')
 }
+
+# Cấu hình cho cache trong bộ nhớ (chi tiết sân / cụm sân)
+CACHE_CONFIG = {
+    'DETAIL_MAXSIZE': int(os.environ.get('DETAIL_CACHE_MAXSIZE', 2048)),
+    'DETAIL_TTL': int(os.environ.get('DETAIL_CACHE_TTL', 300)),
+    'SEARCH_MAXSIZE': int(os.environ.get('SEARCH_CACHE_MAXSIZE', 512)),
+    'SEARCH_TTL': int(os.environ.get('SEARCH_CACHE_TTL', 120)),
+    # Kết quả lớn hơn ngưỡng này không được cache: chỉ nhớ là "quá nhiều" và phân trang keyset trực tiếp từ SQL
+    'SEARCH_MAX_IDS': int(os.environ.get('SEARCH_CACHE_MAX_IDS', 5000)),
+    # Thống kê dashboard của chủ sân
+    'STATS_MAXSIZE': int(os.environ.get('STATS_CACHE_MAXSIZE', 256)),
+    'STATS_TTL': int(os.environ.get('STATS_CACHE_TTL', 300)),
+    # Tổng quan trang quản trị (giây)
+    'SUMMARY_TTL': int(os.environ.get('SUMMARY_CACHE_TTL', 60)),
+    # Bitmap lịch trống theo (sân, ngày)
+    'SLOTS_MAXSIZE': int(os.environ.get('SLOTS_CACHE_MAXSIZE', 4096)),
+    'SLOTS_TTL': int(os.environ.get('SLOTS_CACHE_TTL', 300)),
+    # Bảng giá theo giờ đã biên dịch cho từng sân
+    'PRICING_MAXSIZE': int(os.environ.get('PRICING_CACHE_MAXSIZE', 4096)),
+    'PRICING_TTL': int(os.environ.get('PRICING_CACHE_TTL', 3600)),
+    # Phản hồi đã lưu theo Idempotency-Key (client mobile gửi lại khi timeout)
+    'IDEMPOTENCY_MAXSIZE': int(os.environ.get('IDEMPOTENCY_CACHE_MAXSIZE', 10000)),
+    'IDEMPOTENCY_TTL': int(os.environ.get('IDEMPOTENCY_CACHE_TTL', 86400)),
+    # Key đang xử lý quá số giây này (worker chết giữa chừng) thì request khác được chạy lại
+    'IDEMPOTENCY_IN_FLIGHT_TIMEOUT': int(os.environ.get('IDEMPOTENCY_IN_FLIGHT_TIMEOUT', 60)),
+    # Quyền vào phòng chat đã kiểm tra, lưu theo từng kết nối socket (giây)
+    'CHAT_AUTH_TTL': int(os.environ.get('CHAT_AUTH_CACHE_TTL', 300)),
+    # Tên hiển thị của người dùng (tin nhắn chat); xóa khi đổi hồ sơ
+    'NAMES_MAXSIZE': int(os.environ.get('NAMES_CACHE_MAXSIZE', 10000)),
+    'NAMES_TTL': int(os.environ.get('NAMES_CACHE_TTL', 600)),
+    # Chỉ mục tìm kiếm (geo, text, facet) và bitmap lịch trống nạp lại sau số giây này (0 = không bao giờ);
+    # chạy nhiều worker thì thay đổi được phát qua message queue, TTL chỉ là lưới an toàn
+    'INDEX_TTL': int(os.environ.get('INDEX_RELOAD_TTL', 300))
+}
+
+# Cấu hình giữ chỗ tạm thời (slot hold) khi người dùng đang thanh toán
+HOLD_CONFIG = {
+    'TTL': int(os.environ.get('SLOT_HOLD_TTL', 600)),
+    'MAX_PER_USER': int(os.environ.get('SLOT_HOLD_MAX_PER_USER', 5)),
+    # Ghi hold xuống bảng slot_holds để không mất khi khởi động lại
+    'PERSIST': os.environ.get('SLOT_HOLD_PERSIST', '0') == '1'
+}
+
+# Cấu hình job tự động hủy các đơn đặt sân 'pending' quá hạn thanh toán
+SWEEPER_CONFIG = {
+    'ENABLED': os.environ.get('PENDING_SWEEPER_ENABLED', '1') == '1',
+    'INTERVAL': int(os.environ.get('PENDING_SWEEPER_INTERVAL', 60)),  # giây giữa hai lần chạy
+    'PENDING_TTL': int(os.environ.get('PENDING_BOOKING_TTL', 1800)),  # đơn pending cũ hơn sẽ hết hạn
+    'BATCH_SIZE': int(os.environ.get('PENDING_SWEEPER_BATCH_SIZE', 500))
+}
+
+# Lưu tin nhắn chat: 'write_behind' (phát ngay, ghi DB theo lô) hoặc 'sync' (commit rồi mới phát)
+CHAT_CONFIG = {
+    'WRITE_MODE': os.environ.get('CHAT_WRITE_MODE', 'write_behind'),
+    'FLUSH_INTERVAL_MS': int(os.environ.get('CHAT_FLUSH_INTERVAL_MS', 100)),
+    'FLUSH_BATCH_SIZE': int(os.environ.get('CHAT_FLUSH_BATCH_SIZE', 200)),
+    # Hàng đợi đầy thì người gửi phải chờ ghi DB (tránh mất quá nhiều tin khi sập); DB lỗi thì tin bị từ chối
+    'MAX_QUEUE': int(os.environ.get('CHAT_MAX_QUEUE', 5000)),
+    # 0-31, mỗi worker một giá trị khác nhau để id tin nhắn không trùng
+    'WORKER_ID': os.environ.get('CHAT_WORKER_ID')
+}
+
+# Chạy nhiều worker SocketIO: các worker trao đổi emit/room qua message queue (xem README)
+SOCKETIO_CONFIG = {
+    # redis://..., amqp://..., kafka://... hoặc tcp://host:port (broker `flask socketio-broker`); để trống = 1 tiến trình
+    'MESSAGE_QUEUE': os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None,
+    # Các cụm dùng chung một broker phải đặt channel khác nhau
+    'CHANNEL': os.environ.get('SOCKETIO_CHANNEL', 'zonehub'),
+    'ASYNC_MODE': os.environ.get('SOCKETIO_ASYNC_MODE') or None
+}
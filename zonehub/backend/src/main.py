@@ -17,9 +17,23 @@ if __name__ == '__main__':
     # Database initialization/migration should be done via Flask-Migrate commands
     # init_db() # Removed this call
     
+    # FLASK_DEBUG=0 khi chạy nhiều worker (mỗi worker một PORT và CHAT_WORKER_ID riêng, xem README)
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
+
+    # Job nền tự hủy đơn 'pending' quá hạn; với reloader chỉ chạy trong tiến trình con phục vụ request
+    from src.config import SWEEPER_CONFIG
+    from src.services.sweeper import start_pending_sweeper
+    if SWEEPER_CONFIG['ENABLED'] and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        start_pending_sweeper(app, socketio)
+
+    # Nhận thay đổi chỉ mục/slot hold từ các worker khác ngay từ đầu (khi có SOCKETIO_MESSAGE_QUEUE)
+    from src.services.socket_queue import start_listening
+    start_listening(socketio)
+    
     # Chạy ứng dụng với SocketIO
+    host = os.environ.get('HOST', '127.0.0.1')
     port = int(os.environ.get('PORT', 5000))
     # Use the socketio instance imported from extensions
     # The app instance is passed to socketio.run
-    socketio.run(app, host='127.0.0.1', port=port, debug=True, allow_unsafe_werkzeug=True)
+    socketio.run(app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=True)
 
@@ -6,8 +6,8 @@ db = SQLAlchemy()
 
 # Import all models here so Flask-Migrate can detect them
 from .user import User, Team, TeamMember
-from .field import Field, FieldComplex
-from .booking import Booking, Payment
+from .field import Field, FieldComplex, FieldPriceRule, FieldDailyStat
+from .booking import Booking, Payment, SlotHold, IdempotencyKey
 from .team_finder import FindTeamRequest, FindOpponentRequest, Invitation
 from .notification import Notification
 # from .chat import ChatMessage as OldChatMessage # Keep old chat if needed, or remove
@@ -3,13 +3,19 @@ from datetime import datetime
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Overlap probes and availability range scans filter on all three
+        db.Index('ix_bookings_field_time', 'field_id', 'start_time', 'end_time'),
+        # The pending sweeper looks for old 'pending' rows
+        db.Index('ix_bookings_status_created', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     field_id = db.Column(db.Integer, db.ForeignKey('fields.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, confirmed, cancelled, completed
+    status = db.Column(db.String(20), default='pending')  # pending, confirmed, cancelled, completed, expired
     total_price = db.Column(db.Float, nullable=False)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -32,6 +38,25 @@ class Booking(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+    
+    @staticmethod
+    def batch_to_dict(bookings):
+        """Serialize many bookings with field and user names, one query per related table"""
+        from src.models.field import Field
+        from src.models.user import User
+        field_ids = {booking.field_id for booking in bookings}
+        user_ids = {booking.user_id for booking in bookings}
+        field_names = dict(db.session.query(Field.id, Field.name).filter(
+            Field.id.in_(field_ids)).all()) if field_ids else {}
+        user_names = dict(db.session.query(User.id, User.full_name).filter(
+            User.id.in_(user_ids)).all()) if user_ids else {}
+        results = []
+        for booking in bookings:
+            data = booking.to_dict()
+            data['field_name'] = field_names.get(booking.field_id)
+            data['user_name'] = user_names.get(booking.user_id)
+            results.append(data)
+        return results
 
 
 class Payment(db.Model):
@@ -60,3 +85,34 @@ class Payment(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+# Persisted copy of the in-memory slot holds, only written when SLOT_HOLD_PERSIST=1
+class SlotHold(db.Model):
+    __tablename__ = 'slot_holds'
+    
+    token = db.Column(db.String(64), primary_key=True)
+    field_id = db.Column(db.Integer, db.ForeignKey('fields.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+# Idempotency-Key claims and stored responses, shared by every worker (services/idempotency.py)
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'path', 'key', name='uq_idempotency_keys_scope'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(64), nullable=False)
+    path = db.Column(db.String(255), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(40), nullable=False)
+    # NULL while the first request is still running
+    status = db.Column(db.Integer, nullable=True)
+    body = db.Column(db.LargeBinary(length=2 ** 24 - 1), nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
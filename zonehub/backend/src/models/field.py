@@ -1,4 +1,5 @@
 from src.app import db
+from sqlalchemy import inspect
 from datetime import datetime
 
 class Field(db.Model):
@@ -9,6 +10,7 @@ class Field(db.Model):
     description = db.Column(db.Text, nullable=True)
     address = db.Column(db.String(255), nullable=False)
     city = db.Column(db.String(100), nullable=False)
+    field_type = db.Column(db.String(50), nullable=True)  # e.g. 'Bóng đá 7 người', 'Cầu lông'
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
     price_per_hour = db.Column(db.Float, nullable=False)
@@ -20,15 +22,18 @@ class Field(db.Model):
     
     # Relationships
     bookings = db.relationship('Booking', backref='field', lazy=True)
+    price_rules = db.relationship('FieldPriceRule', backref='field', lazy=True, cascade='all, delete-orphan')
+    daily_stats = db.relationship('FieldDailyStat', backref='field', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    def to_dict(self, include_complex=False):
         """Convert field object to dictionary"""
-        return {
+        data = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'address': self.address,
             'city': self.city,
+            'field_type': self.field_type,
             'latitude': self.latitude,
             'longitude': self.longitude,
             'price_per_hour': self.price_per_hour,
@@ -38,6 +43,49 @@ class Field(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_complex:
+            # Complex name is shown as the cluster name on the search page
+            data['cluster_name'] = self.complex.name if self.complex else None
+        return data
+
+    @staticmethod
+    def batch_to_dict(fields, include_complex=True, include_owner=False):
+        """Serialize many fields with one lookup per related table instead of one per row.
+
+        Complexes already eager-loaded on the instances are used as-is; the rest
+        are resolved with a single id IN (...) query for the whole batch.
+        """
+        complex_names = {}
+        if include_complex:
+            missing = set()
+            for field in fields:
+                if field.complex_id is None:
+                    continue
+                if 'complex' in inspect(field).unloaded:
+                    missing.add(field.complex_id)
+                elif field.complex is not None:
+                    complex_names[field.complex_id] = field.complex.name
+            if missing:
+                complex_names.update(db.session.query(FieldComplex.id, FieldComplex.name).filter(
+                    FieldComplex.id.in_(missing)).all())
+
+        owner_names = {}
+        if include_owner:
+            from src.models.user import User
+            owner_ids = {field.owner_id for field in fields}
+            if owner_ids:
+                owner_names = dict(db.session.query(User.id, User.full_name).filter(
+                    User.id.in_(owner_ids)).all())
+
+        results = []
+        for field in fields:
+            data = field.to_dict()
+            if include_complex:
+                data['cluster_name'] = complex_names.get(field.complex_id)
+            if include_owner:
+                data['owner_name'] = owner_names.get(field.owner_id)
+            results.append(data)
+        return results
 
 
 class FieldComplex(db.Model):
@@ -87,3 +135,51 @@ class FieldLayout(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+class FieldPriceRule(db.Model):
+    __tablename__ = 'field_price_rules'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    field_id = db.Column(db.Integer, db.ForeignKey('fields.id'), nullable=False, index=True)
+    label = db.Column(db.String(50), nullable=True)  # e.g. 'Giờ cao điểm', 'Cuối tuần'
+    days_mask = db.Column(db.Integer, nullable=False, default=127)  # bit d = weekday d (Monday = 0)
+    start_hour = db.Column(db.Integer, nullable=False)
+    end_hour = db.Column(db.Integer, nullable=False)  # exclusive, up to 24
+    price_per_hour = db.Column(db.Float, nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher wins where rules overlap
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert price rule object to dictionary"""
+        return {
+            'id': self.id,
+            'field_id': self.field_id,
+            'label': self.label,
+            'days': [day for day in range(7) if self.days_mask >> day & 1],
+            'start_hour': self.start_hour,
+            'end_hour': self.end_hour,
+            'price_per_hour': self.price_per_hour,
+            'priority': self.priority,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+# One row per field and day, rolled up from bookings by services/rollups.py.
+# A booking counts on the day it starts; hourly_minutes holds the minutes of
+# live bookings in each clock hour of that day (24 numbers, JSON). The
+# (field_id, day) primary key serves the per-owner date range reads.
+class FieldDailyStat(db.Model):
+    __tablename__ = 'field_daily_stats'
+    
+    field_id = db.Column(db.Integer, db.ForeignKey('fields.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_bookings = db.Column(db.Integer, nullable=False, default=0)
+    active_bookings = db.Column(db.Integer, nullable=False, default=0)
+    pending_bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    booked_hours = db.Column(db.Float, nullable=False, default=0)
+    hourly_minutes = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -72,10 +72,18 @@ class ChatRoom(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
 
+def _next_message_id():
+    from src.services.chat_writer import message_ids
+    return message_ids.next()
+
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
 
-    id = db.Column(db.Integer, primary_key=True)
+    # 64-bit time-ordered ids assigned by services/chat_writer.py (INTEGER on SQLite keeps the rowid alias).
+    # Every insert takes one, never AUTO_INCREMENT: max+1 after a generated id would sort
+    # before messages still queued for write-behind and could even collide with one
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True,
+                   autoincrement=False, default=_next_message_id)
     room_id = db.Column(db.Integer, db.ForeignKey('chat_rooms.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True) # Null if system message
     message_type = db.Column(db.String(20), default='user') # user, system
@@ -85,17 +93,32 @@ class ChatMessage(db.Model):
     # Relationships
     sender = db.relationship('User', backref='sent_chat_messages')
 
-    def to_dict(self):
+    __table_args__ = (
+        # History pages: WHERE room_id = ? AND id < ? ORDER BY id DESC LIMIT n
+        db.Index('ix_chat_messages_room_id_id', 'room_id', 'id'),
+    )
+
+    def to_dict(self, sender_names=None):
+        if sender_names is None:
+            from src.services.user_names import display_names_for
+            sender_names = display_names_for([self.sender_id])
         return {
             'id': self.id,
             'room_id': self.room_id,
             'sender_id': self.sender_id,
-            'sender_name': self.sender.full_name if self.sender else 'Hệ thống', # Include sender name
+            'sender_name': sender_names.get(self.sender_id, 'Hệ thống'), # Include sender name
             'message_type': self.message_type,
             'content': self.content,
             'timestamp': self.timestamp.isoformat()
         }
 
+    @staticmethod
+    def batch_to_dict(messages):
+        """Serialize many messages; sender names come from the name cache, misses in one query"""
+        from src.services.user_names import display_names_for
+        sender_names = display_names_for(message.sender_id for message in messages)
+        return [message.to_dict(sender_names) for message in messages]
+
 # Add relationships to other models if needed
 # Example: Add to Booking model
 # match = db.relationship('Match', backref='booking', uselist=False)
@@ -0,0 +1,61 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models.user import User
+from src.config import SWEEPER_CONFIG, CHAT_CONFIG
+from src.services.analytics import cached_admin_summary
+from src.services.sweeper import sweep_metrics, expire_pending_bookings
+from src.services.chat_writer import chat_writer
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_summary():
+    """Totals for the admin dashboard: users by role, bookings by status, revenue (admin only)"""
+    current_user_id = get_jwt_identity()
+    current_user = User.query.get(current_user_id)
+    
+    if not current_user or current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    return jsonify(cached_admin_summary()), 200
+
+@admin_bp.route('/sweeper', methods=['GET'])
+@jwt_required()
+def get_sweeper_metrics():
+    """Pending-booking sweeper settings and per-run metrics (admin only)"""
+    current_user_id = get_jwt_identity()
+    current_user = User.query.get(current_user_id)
+    
+    if not current_user or current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    return jsonify({'config': SWEEPER_CONFIG, 'metrics': sweep_metrics.snapshot()}), 200
+
+@admin_bp.route('/sweeper/run', methods=['POST'])
+@jwt_required()
+def run_sweeper():
+    """Expire stale pending bookings now instead of waiting for the next run (admin only)"""
+    current_user_id = get_jwt_identity()
+    current_user = User.query.get(current_user_id)
+    
+    if not current_user or current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    try:
+        result = expire_pending_bookings()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'result': result, 'metrics': sweep_metrics.snapshot()}), 200
+
+@admin_bp.route('/chat-writer', methods=['GET'])
+@jwt_required()
+def get_chat_writer_metrics():
+    """Chat write-behind settings, queue depth and flush counters of this worker (admin only)"""
+    current_user_id = get_jwt_identity()
+    current_user = User.query.get(current_user_id)
+    
+    if not current_user or current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    return jsonify({'config': CHAT_CONFIG, 'metrics': chat_writer.snapshot()}), 200
@@ -4,10 +4,61 @@ from src.models.booking import Booking, Payment
 from src.models.field import Field
 from src.models.user import User
 from src.app import db
-from datetime import datetime
+from src.services.availability import booking_changed, booking_day_masks, field_slot_masks, INACTIVE_STATUSES
+from src.services.conflicts import BookingConflict, field_booking_lock, ensure_slot_free, sweep_conflicts
+from src.services.pricing import price_table
+from src.services.holds import SlotHeld, TooManyHolds, ensure_holds_loaded, take_hold, release_hold, HOLD_SLOT_MINUTES
+from src.services.facets import ensure_field_columns
+from src.services.analytics import cached_owner_field_stats, invalidate_owner_stats
+from src.services.booking_feed import publish_booking_changes
+from src.services.rollups import refresh_daily_stats
+from src.services.export import EXPORT_FORMATS, export_response
+from src.services.pagination import parse_page_args, parse_sort_args, keyset_sorted, paginated_response
+from src.services.idempotency import idempotent
+from src.services.local_time import parse_local_time, local_today
+from sqlalchemy import insert
+from datetime import datetime, timedelta
 
 booking_bp = Blueprint('booking', __name__)
 
+# Sortable columns for the admin booking list
+BOOKING_SORTS = {'id': Booking.id, 'start_time': Booking.start_time, 'created_at': Booking.created_at}
+# Upper bound on occurrences per bulk/recurring request (a year of weekly slots)
+MAX_BULK_BOOKINGS = 52
+
+def _parse_time(value):
+    """ISO 8601 string -> naive local datetime as stored (a UTC/offset time is converted)"""
+    return parse_local_time(value)
+
+def _export_scope(query, user):
+    """Restrict an export (already joined with Field) to what the user may see; raises ValueError"""
+    if user.role == 'owner':
+        return query.filter(Field.owner_id == user.id)
+    # Admins export everything, or one owner's / field's rows
+    for name, column in (('owner_id', Field.owner_id), ('field_id', Field.id)):
+        if request.args.get(name):
+            try:
+                query = query.filter(column == int(request.args[name]))
+            except ValueError:
+                raise ValueError(f'{name} must be an integer')
+    return query
+
+def _export_args(column):
+    """format, gzip flag and a from / to (YYYY-MM-DD) filter on column; raises ValueError"""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('format must be one of: ' + ', '.join(sorted(EXPORT_FORMATS)))
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    bounds = []
+    try:
+        if request.args.get('from'):
+            bounds.append(column >= datetime.strptime(request.args['from'], '%Y-%m-%d'))
+        if request.args.get('to'):
+            bounds.append(column < datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD.')
+    return fmt, compress, bounds
+
 @booking_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_user_bookings():
@@ -57,8 +108,168 @@ def get_field_bookings(field_id):
     bookings = Booking.query.filter_by(field_id=field_id).all()
     return jsonify({'bookings': [booking.to_dict() for booking in bookings]}), 200
 
+@booking_bp.route('/all', methods=['GET'])
+@jwt_required()
+def get_all_bookings():
+    """List all bookings, one keyset page at a time (admin only)"""
+    current_user_id = get_jwt_identity()
+    
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user or user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    # Filters: status, field_id, user_id, from / to (YYYY-MM-DD, on start_time)
+    query = Booking.query
+    if request.args.get('status'):
+        query = query.filter(Booking.status == request.args['status'])
+    try:
+        for name, column in (('field_id', Booking.field_id), ('user_id', Booking.user_id)):
+            if request.args.get(name):
+                query = query.filter(column == int(request.args[name]))
+    except ValueError:
+        return jsonify({'error': 'field_id and user_id must be integers'}), 400
+    try:
+        if request.args.get('from'):
+            query = query.filter(Booking.start_time >= datetime.strptime(request.args['from'], '%Y-%m-%d'))
+        if request.args.get('to'):
+            query = query.filter(Booking.start_time < datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+    
+    try:
+        page = parse_page_args(request.args)
+        column, descending = parse_sort_args(request.args, BOOKING_SORTS, 'id')
+        query, cursor_of = keyset_sorted(query, page, column, Booking.id, descending)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response('bookings', query, page, Booking.batch_to_dict, cursor_of)
+
+@booking_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_bookings():
+    """Stream booking history as CSV or NDJSON, optionally gzipped (owner or admin)"""
+    current_user_id = get_jwt_identity()
+    
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user or user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    columns = ['id', 'field_id', 'field_name', 'user_id', 'username', 'start_time', 'end_time',
+               'status', 'total_price', 'notes', 'created_at']
+    query = db.session.query(
+        Booking.id, Booking.field_id, Field.name, Booking.user_id, User.username, Booking.start_time,
+        Booking.end_time, Booking.status, Booking.total_price, Booking.notes, Booking.created_at
+    ).join(Field, Field.id == Booking.field_id).join(User, User.id == Booking.user_id)
+    
+    try:
+        fmt, compress, bounds = _export_args(Booking.start_time)
+        query = _export_scope(query, user).filter(*bounds)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if request.args.get('status'):
+        query = query.filter(Booking.status == request.args['status'])
+    
+    filename = f'bookings_{datetime.utcnow().strftime("%Y%m%d")}'
+    return export_response(query.order_by(Booking.id), columns, fmt, filename, compress)
+
+@booking_bp.route('/payments/export', methods=['GET'])
+@jwt_required()
+def export_payments():
+    """Stream payment history as CSV or NDJSON, optionally gzipped (owner or admin)"""
+    current_user_id = get_jwt_identity()
+    
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user or user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    columns = ['id', 'booking_id', 'field_id', 'field_name', 'amount', 'payment_method', 'transaction_id',
+               'status', 'payment_date', 'created_at']
+    query = db.session.query(
+        Payment.id, Payment.booking_id, Booking.field_id, Field.name, Payment.amount, Payment.payment_method,
+        Payment.transaction_id, Payment.status, Payment.payment_date, Payment.created_at
+    ).join(Booking, Booking.id == Payment.booking_id).join(Field, Field.id == Booking.field_id)
+    
+    try:
+        fmt, compress, bounds = _export_args(Payment.created_at)
+        query = _export_scope(query, user).filter(*bounds)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if request.args.get('status'):
+        query = query.filter(Payment.status == request.args['status'])
+    
+    filename = f'payments_{datetime.utcnow().strftime("%Y%m%d")}'
+    return export_response(query.order_by(Payment.id), columns, fmt, filename, compress)
+
+@booking_bp.route('/owner', methods=['GET'])
+@jwt_required()
+def get_owner_bookings():
+    """Bookings on the current owner's fields, one keyset page at a time"""
+    current_user_id = get_jwt_identity()
+
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    if user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    query = Booking.query.join(Field, Field.id == Booking.field_id).filter(Field.owner_id == user.id)
+    if request.args.get('status'):
+        query = query.filter(Booking.status == request.args['status'])
+
+    try:
+        page = parse_page_args(request.args)
+        column, descending = parse_sort_args(request.args, BOOKING_SORTS, 'id')
+        query, cursor_of = keyset_sorted(query, page, column, Booking.id, descending)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return paginated_response('bookings', query, page, Booking.batch_to_dict, cursor_of)
+
+@booking_bp.route('/owner/stats', methods=['GET'])
+@jwt_required()
+def get_owner_stats():
+    """Per-field bookings, revenue and occupancy for the current owner over a date range"""
+    current_user_id = get_jwt_identity()
+    
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    if user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    # Admins may look at another owner's dashboard
+    owner_id = int(current_user_id)
+    if user.role == 'admin' and request.args.get('owner_id'):
+        try:
+            owner_id = int(request.args['owner_id'])
+        except ValueError:
+            return jsonify({'error': 'owner_id must be an integer'}), 400
+    
+    # Date range, inclusive; defaults to the last 30 days
+    try:
+        end_date = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else local_today()
+        start_date = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else end_date - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+    
+    if start_date > end_date:
+        return jsonify({'error': 'from must not be after to'}), 400
+    
+    include_daily = request.args.get('daily', '').lower() in ('1', 'true', 'yes')
+    stats = cached_owner_field_stats(owner_id, start_date, end_date, include_daily)
+    return jsonify(stats), 200
+
 @booking_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_booking():
     """Create a new booking"""
     current_user_id = get_jwt_identity()
@@ -70,8 +281,8 @@ def create_booking():
     
     data = request.get_json()
     
-    # Validate required fields
-    required_fields = ['field_id', 'start_time', 'end_time', 'total_price']
+    # Validate required fields (the price is computed here, not taken from the client)
+    required_fields = ['field_id', 'start_time', 'end_time']
     for field in required_fields:
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
@@ -83,46 +294,233 @@ def create_booking():
     
     # Parse datetime strings
     try:
-        start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
-        end_time = datetime.fromisoformat(data['end_time'].replace('Z', '+00:00'))
+        start_time = _parse_time(data['start_time'])
+        end_time = _parse_time(data['end_time'])
     except ValueError:
         return jsonify({'error': 'Invalid datetime format'}), 400
     
-    # Check if the time slot is available
-    overlapping_bookings = Booking.query.filter(
-        Booking.field_id == data['field_id'],
-        Booking.status != 'cancelled',
-        Booking.start_time < end_time,
-        Booking.end_time > start_time
-    ).all()
-    
-    if overlapping_bookings:
-        return jsonify({'error': 'Time slot is not available'}), 400
-    
-    # Create new booking
-    try:
-        booking = Booking(
-            field_id=data['field_id'],
-            user_id=current_user_id,
-            start_time=start_time,
-            end_time=end_time,
-            status='pending',
-            total_price=data['total_price'],
-            notes=data.get('notes')
-        )
-        
-        db.session.add(booking)
-        db.session.commit()
+    if end_time <= start_time:
+        return jsonify({'error': 'end_time must be after start_time'}), 400
+    
+    # Check the slot and insert under the field's lock so concurrent requests cannot double-book
+    try:
+        with field_booking_lock(field.id):
+            # Another user's hold on the slot wins; the caller's own hold is consumed below
+            ensure_holds_loaded().check(field.id, start_time, end_time, user.id)
+            ensure_slot_free(field.id, start_time, end_time)
+            booking = Booking(
+                field_id=field.id,
+                user_id=current_user_id,
+                start_time=start_time,
+                end_time=end_time,
+                status='pending',
+                total_price=price_table(field.id).price(start_time, end_time),
+                notes=data.get('notes')
+            )
+            
+            db.session.add(booking)
+            db.session.commit()
+        booking_changed(booking)
+        refresh_daily_stats(booking)
+        invalidate_owner_stats(field.owner_id)
+        publish_booking_changes('created', field.owner_id, booking)
+        # The hold has served its purpose once the booking row exists
+        hold = ensure_holds_loaded().get(data['hold_token']) if data.get('hold_token') else None
+        if hold and hold.user_id == user.id:
+            release_hold(hold.token)
         
         return jsonify({
             'message': 'Booking created successfully',
             'booking': booking.to_dict()
         }), 201
     
+    except BookingConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@booking_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_bookings_bulk():
+    """Create many bookings on one field in one transaction.
+
+    Either `occurrences`: [{start_time, end_time}, ...] or `recurrence`:
+    {start_time, end_time, count, interval_days=7} for the first slot and how
+    often it repeats. With partial=true the free occurrences are booked even if
+    others conflict; otherwise any conflict rejects the whole request (409).
+    """
+    current_user_id = get_jwt_identity()
+    
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json()
+    
+    # Validate required fields
+    if 'field_id' not in data:
+        return jsonify({'error': 'Missing required field: field_id'}), 400
+    if not data.get('occurrences') and not data.get('recurrence'):
+        return jsonify({'error': 'Provide occurrences or recurrence'}), 400
+    
+    field = Field.query.get(data['field_id'])
+    if not field:
+        return jsonify({'error': 'Field not found'}), 404
+    
+    # Expand the request into [(start, end)]
+    try:
+        if data.get('occurrences'):
+            intervals = [(_parse_time(o['start_time']), _parse_time(o['end_time'])) for o in data['occurrences']]
+        else:
+            recurrence = data['recurrence']
+            first_start = _parse_time(recurrence['start_time'])
+            first_end = _parse_time(recurrence['end_time'])
+            count = int(recurrence['count'])
+            step = timedelta(days=int(recurrence.get('interval_days', 7)))
+            if count < 1 or step.days < 1:
+                return jsonify({'error': 'count and interval_days must be positive'}), 400
+            if count > MAX_BULK_BOOKINGS:
+                return jsonify({'error': f'At most {MAX_BULK_BOOKINGS} bookings per request'}), 400
+            intervals = [(first_start + step * i, first_end + step * i) for i in range(count)]
+    except (KeyError, TypeError, AttributeError):
+        return jsonify({'error': 'Each occurrence needs start_time and end_time'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid datetime format'}), 400
+    
+    if len(intervals) > MAX_BULK_BOOKINGS:
+        return jsonify({'error': f'At most {MAX_BULK_BOOKINGS} bookings per request'}), 400
+    if any(end <= start for start, end in intervals):
+        return jsonify({'error': 'end_time must be after start_time'}), 400
+    
+    partial = bool(data.get('partial', False))
+    try:
+        with field_booking_lock(field.id):
+            conflicts = sweep_conflicts(field.id, intervals)
+            holds = ensure_holds_loaded()
+            for index, (start, end) in enumerate(intervals):
+                if index in conflicts:
+                    continue
+                try:
+                    holds.check(field.id, start, end, user.id)
+                except SlotHeld:
+                    conflicts[index] = ('held', None)
+            report = [
+                {
+                    'index': index,
+                    'start_time': intervals[index][0].isoformat(),
+                    'end_time': intervals[index][1].isoformat(),
+                    'reason': reason,
+                    'booking_id': booking_id
+                }
+                for index, (reason, booking_id) in sorted(conflicts.items())
+            ]
+            free = [interval for index, interval in enumerate(intervals) if index not in conflicts]
+            if not free or (conflicts and not partial):
+                db.session.rollback()
+                return jsonify({'error': 'Time slot is not available', 'conflicts': report}), 409
+            
+            # One multi-row INSERT for every free occurrence, each priced from the field's table
+            table = price_table(field.id)
+            db.session.execute(insert(Booking), [
+                {
+                    'field_id': field.id,
+                    'user_id': user.id,
+                    'start_time': start,
+                    'end_time': end,
+                    'status': 'pending',
+                    'total_price': table.price(start, end),
+                    'notes': data.get('notes')
+                }
+                for start, end in free
+            ])
+            bookings = Booking.query.filter(
+                Booking.field_id == field.id,
+                Booking.user_id == user.id,
+                Booking.status == 'pending',
+                Booking.start_time.in_([start for start, _ in free])
+            ).order_by(Booking.start_time).all()
+            booking_ids = [booking.id for booking in bookings]
+            owner_id = field.owner_id
+            db.session.commit()
+        # Commit expired the rows; refresh them together rather than one SELECT each
+        bookings = Booking.query.filter(Booking.id.in_(booking_ids)).order_by(Booking.start_time).all()
+        booking_changed(*bookings)
+        refresh_daily_stats(*bookings)
+        invalidate_owner_stats(owner_id)
+        publish_booking_changes('created', owner_id, *bookings)
+        
+        return jsonify({
+            'message': f'{len(bookings)} bookings created successfully',
+            'bookings': [booking.to_dict() for booking in bookings],
+            'conflicts': report
+        }), 201
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@booking_bp.route('/holds', methods=['POST'])
+@jwt_required()
+def create_hold():
+    """Hold a slot while the user checks out; confirm with POST / and hold_token.
+
+    Pass `replace` (a previous token) when the user picks another slot.
+    """
+    current_user_id = get_jwt_identity()
+    
+    # Verify user exists
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json()
+    
+    # Validate required fields
+    for name in ['field_id', 'start_time', 'end_time']:
+        if name not in data:
+            return jsonify({'error': f'Missing required field: {name}'}), 400
+    
+    try:
+        field_id = int(data['field_id'])
+        start_time = _parse_time(data['start_time'])
+        end_time = _parse_time(data['end_time'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid field_id or datetime format'}), 400
+    if end_time <= start_time:
+        return jsonify({'error': 'end_time must be after start_time'}), 400
+    if field_id not in ensure_field_columns().price:
+        return jsonify({'error': 'Field not found'}), 404
+    
+    # Already booked? Answered from the cached slot bitmaps, not a bookings query per click
+    wanted = booking_day_masks(start_time, end_time, HOLD_SLOT_MINUTES)
+    booked = field_slot_masks(field_id, list(wanted), HOLD_SLOT_MINUTES)
+    if any(booked[day] & mask for day, mask in wanted.items()):
+        return jsonify({'error': 'Time slot is not available'}), 409
+    
+    try:
+        hold = take_hold(field_id, user.id, start_time, end_time, replace=data.get('replace'))
+    except SlotHeld as e:
+        return jsonify({'error': str(e)}), 409
+    except TooManyHolds as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify({'hold': hold.to_dict()}), 201
+
+@booking_bp.route('/holds/<token>', methods=['DELETE'])
+@jwt_required()
+def delete_hold(token):
+    """Release a slot hold early (its owner only)"""
+    current_user_id = get_jwt_identity()
+    hold = ensure_holds_loaded().get(token)
+    if not hold:
+        return jsonify({'error': 'Hold not found'}), 404
+    if hold.user_id != int(current_user_id):
+        return jsonify({'error': 'Unauthorized access'}), 403
+    release_hold(token)
+    return jsonify({'message': 'Hold released'}), 200
+
 @booking_bp.route('/<int:booking_id>', methods=['PUT'])
 @jwt_required()
 def update_booking(booking_id):
@@ -147,27 +545,40 @@ def update_booking(booking_id):
     
     data = request.get_json()
     
-    # Update booking status
-    if 'status' in data:
-        booking.status = data['status']
-    
-    # Update notes
-    if 'notes' in data:
-        booking.notes = data['notes']
-    
     try:
-        db.session.commit()
+        with field_booking_lock(booking.field_id):
+            # Re-read under the lock; re-activating a cancelled booking takes its slot again
+            db.session.refresh(booking, with_for_update=True)
+            if 'status' in data and booking.status in INACTIVE_STATUSES and data['status'] not in INACTIVE_STATUSES:
+                ensure_slot_free(booking.field_id, booking.start_time, booking.end_time, exclude_id=booking.id)
+            
+            # Update booking status
+            if 'status' in data:
+                booking.status = data['status']
+            
+            # Update notes
+            if 'notes' in data:
+                booking.notes = data['notes']
+            
+            db.session.commit()
+        booking_changed(booking)
+        refresh_daily_stats(booking)
+        invalidate_owner_stats(field.owner_id)
+        publish_booking_changes('cancelled' if booking.status == 'cancelled' else 'updated', field.owner_id, booking)
         return jsonify({
             'message': 'Booking updated successfully',
             'booking': booking.to_dict()
         }), 200
     
+    except BookingConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @booking_bp.route('/<int:booking_id>/payment', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_payment(booking_id):
     """Create a payment for a booking"""
     current_user_id = get_jwt_identity()
@@ -177,7 +588,8 @@ def create_payment(booking_id):
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    booking = Booking.query.get(booking_id)
+    # Row lock so the pending sweeper cannot expire the booking while it is being paid
+    booking = Booking.query.filter_by(id=booking_id).with_for_update().first()
     
     if not booking:
         return jsonify({'error': 'Booking not found'}), 404
@@ -186,6 +598,14 @@ def create_payment(booking_id):
     if booking.user_id != current_user_id:
         return jsonify({'error': 'Unauthorized access'}), 403
     
+    # A cancelled or expired booking no longer holds its slot; paying must not revive it
+    if booking.status in INACTIVE_STATUSES:
+        return jsonify({'error': f'Booking is {booking.status}'}), 409
+    
+    # Safety net for retries without an Idempotency-Key (or landing on another worker)
+    if Payment.query.filter_by(booking_id=booking.id, status='completed').first():
+        return jsonify({'error': 'Booking is already paid'}), 409
+    
     data = request.get_json()
     
     # Validate required fields
@@ -210,6 +630,9 @@ def create_payment(booking_id):
         
         db.session.add(payment)
         db.session.commit()
+        refresh_daily_stats(booking)
+        invalidate_owner_stats(booking.field.owner_id)
+        publish_booking_changes('paid', booking.field.owner_id, booking)
         
         return jsonify({
             'message': 'Payment created successfully',
@@ -1,85 +1,562 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.field import Field, FieldComplex
+from src.models.field import Field, FieldComplex, FieldPriceRule
 from src.models.user import User
 from src.app import db
+from src.services.geo_index import geo_index, ensure_geo_index
+from src.services.text_search import text_index, ensure_text_index, ALL
+from src.services.availability import (
+    occupancy, has_free_run, window_mask, field_slot_masks, slot_bitmap, slot_runs,
+    OPEN_HOUR, CLOSE_HOUR, SLOT_GRANULARITIES
+)
+from src.services.pagination import parse_page_args, parse_sort_args, keyset_filter, keyset_sorted, paginated_response
+from src.services.cache import detail_cache, make_etag
+from src.services.facets import field_columns, ensure_field_columns, compute_facets, DEFAULT_PRICE_EDGES
+from src.services.search_cache import search_cache, canonical_filters, cached_search_ids, field_snapshot, invalidate_field
+from src.services.pricing import price_table, price_tables, price_tables_for, invalidate_price_table, parse_rules
+from src.services.local_time import parse_local_time, local_today
+from src.services.socket_queue import on_sync, on_reconnect, publish_sync
 from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+from bisect import bisect_right
+from itertools import islice
 
 field_bp = Blueprint("field", __name__, url_prefix="/api/fields") # Added url_prefix for clarity
 
+DEFAULT_SEARCH_RADIUS_KM = 10.0
+GEO_BATCH_SIZE = 50 # Candidate ids per SQL round-trip for nearest=K searches
+# Sortable columns for the plain field list
+FIELD_SORTS = {"id": Field.id, "price": Field.price_per_hour, "created_at": Field.created_at}
+MAX_RANGE_DAYS = 31
+
+def _sync_field_indexes(field, before=None):
+    """Push a committed field row into the search indexes of this and every other worker"""
+    values = {
+        "field_id": field.id,
+        "latitude": field.latitude,
+        "longitude": field.longitude,
+        "name": field.name,
+        "address": field.address,
+        "city": field.city,
+        "field_type": field.field_type,
+        "price_per_hour": field.price_per_hour,
+        "complex_name": field.complex.name if field.complex else None
+    }
+    after = field_snapshot(field)
+    _apply_field_change(before=before, after=after, **values)
+    publish_sync("field", before=before, after=after, **values)
+
+@on_sync("field")
+def _apply_field_change(field_id, latitude, longitude, name, address, city, field_type, price_per_hour,
+                        complex_name, before=None, after=None):
+    geo_index.upsert(field_id, latitude, longitude)
+    text_index.upsert(field_id, name, address, city, field_type, complex_name)
+    field_columns.upsert(field_id, city, field_type, price_per_hour)
+    invalidate_price_table(field_id) # price_per_hour is the base rate
+    detail_cache.delete(("field", field_id))
+    invalidate_field(before, after)
+
+def _drop_field_indexes(field_id, before):
+    """Remove a deleted field from the search indexes of this and every other worker"""
+    _apply_field_delete(field_id, before)
+    publish_sync("field_deleted", field_id=field_id, before=before)
+
+@on_sync("field_deleted")
+def _apply_field_delete(field_id, before):
+    geo_index.remove(field_id)
+    text_index.remove(field_id)
+    field_columns.remove(field_id)
+    detail_cache.delete(("field", field_id))
+    invalidate_price_table(field_id)
+    invalidate_field(before)
+
+# Rule changes on another worker
+on_sync("price_rules")(invalidate_price_table)
+
+@on_reconnect
+def _reload_field_indexes():
+    # Field changes missed while cut off from the other workers: rebuild on next use
+    geo_index.loaded = False
+    text_index.loaded = False
+    field_columns.loaded = False
+    detail_cache.clear()
+    price_tables.clear()
+    search_cache.clear()
+
+def _apply_search_filters(query, filters):
+    """Apply canonical search filters: text through the inverted index, price in SQL"""
+    # Text filters are answered by the accent-insensitive inverted index
+    # instead of leading-wildcard ilike scans
+    text_filters = []
+    if "q" in filters:
+        text_filters.append((filters["q"], ALL, True))
+    if "field_type" in filters:
+        text_filters.append((filters["field_type"], "field_type", False))
+    if "area" in filters:
+        # 'area' maps to 'city' until fields carry a separate district column
+        text_filters.append((filters["area"], "city", False))
+    if "city" in filters:
+        text_filters.append((filters["city"], "city", False))
+
+    matched_ids = None
+    if text_filters:
+        index = ensure_text_index()
+        for text, attr, prefix in text_filters:
+            ids = index.match(text, attr=attr, prefix=prefix)
+            matched_ids = ids if matched_ids is None else matched_ids & ids
+    if matched_ids is not None:
+        query = query.filter(Field.id.in_(list(matched_ids)))
+
+    if "min_price" in filters:
+        query = query.filter(Field.price_per_hour >= filters["min_price"])
+    if "max_price" in filters:
+        query = query.filter(Field.price_per_hour <= filters["max_price"])
+    return query
+
+def _search_facets(filters, busy_ids, geo, radius_km, nearest, edges):
+    """Facet counts for a search, computed in memory from the columnar snapshot.
+
+    The universe is every field matching q and the date window; for geo
+    searches, the ones within radius_km and/or the `nearest` closest of them,
+    the same candidate set the results come from. Type, city and price are
+    applied per facet.
+    """
+    index = ensure_text_index()
+    if "q" in filters:
+        universe = index.match(filters["q"], attr=ALL, prefix=True)
+    else:
+        universe = ensure_field_columns().ids()
+    if busy_ids:
+        universe = [field_id for field_id in universe if field_id not in busy_ids]
+    if geo:
+        candidates = set(universe)
+        near = (
+            field_id for field_id, _ in ensure_geo_index().iter_nearest(geo[0], geo[1], max_km=radius_km)
+            if field_id in candidates
+        )
+        universe = list(islice(near, nearest) if nearest else near)
+
+    type_ids = index.match(filters["field_type"], attr="field_type") if "field_type" in filters else None
+    city_ids = None
+    for name in ("area", "city"):
+        if name in filters:
+            ids = index.match(filters[name], attr="city")
+            city_ids = ids if city_ids is None else city_ids & ids
+    return compute_facets(
+        universe, type_ids=type_ids, city_ids=city_ids,
+        min_price=filters.get("min_price"), max_price=filters.get("max_price"), edges=edges
+    )
+
+def _field_payloads(field_ids):
+    """Field dicts for ids, from the detail cache where possible, else one batch load"""
+    payloads = {}
+    missing = []
+    for field_id in field_ids:
+        entry = detail_cache.get(("field", field_id))
+        if entry is not None:
+            payloads[field_id] = entry[0]["field"]
+        else:
+            missing.append(field_id)
+    if missing:
+        generation = detail_cache.generation
+        fields = Field.query.options(joinedload(Field.complex)).filter(Field.id.in_(missing)).all()
+        for data in Field.batch_to_dict(fields):
+            payload = {"field": data}
+            detail_cache.set(("field", data["id"]), (payload, make_etag(payload)), generation=generation)
+            payloads[data["id"]] = data
+    # Rows deleted since the ids were cached simply drop out
+    return [payloads[field_id] for field_id in field_ids if field_id in payloads]
+
+def _date_range_args():
+    """Dates from..to (YYYY-MM-DD, inclusive, default today) from request.args; raises ValueError"""
+    try:
+        start_date = datetime.strptime(request.args["from"], "%Y-%m-%d").date() if request.args.get("from") else local_today()
+        end_date = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") else start_date
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+    if start_date > end_date:
+        raise ValueError("from must not be after to")
+    days = (end_date - start_date).days + 1
+    if days > MAX_RANGE_DAYS:
+        raise ValueError(f"At most {MAX_RANGE_DAYS} days per request")
+    return [start_date + timedelta(days=i) for i in range(days)]
+
+def _with_quotes(results, day, start_hour, end_hour, duration, day_masks):
+    """Copy result dicts adding quoted_price: the cheapest free `duration`-hour run in the window"""
+    tables = price_tables_for([data["id"] for data in results])
+    quoted = []
+    for data in results:
+        table = tables.get(data["id"])
+        price = table.cheapest_run(day, start_hour, end_hour, duration, day_masks.get(data["id"], 0)) if table else None
+        quoted.append(dict(data, quoted_price=price))
+    return quoted
+
+def _cached_detail(key, load):
+    """Serve a detail payload through the read-through cache, honouring If-None-Match.
+
+    `load` returns the JSON payload or None when the row does not exist.
+    """
+    def load_entry():
+        payload = load()
+        return (payload, make_etag(payload)) if payload is not None else None
+
+    entry = detail_cache.get_or_load(key, load_entry)
+    if entry is None:
+        return None
+    return _etag_response(*entry)
+
+def _etag_response(payload, etag):
+    """JSON response validated by `etag`; 304 when the client already has it"""
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache" # Clients revalidate with the ETag
+    return response
+
+def _valid_geo_cursor(after):
+    """[distance, last id, fields served so far], as written by the geo search"""
+    def count(value):
+        return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+    return (len(after) == 3 and isinstance(after[0], (int, float)) and not isinstance(after[0], bool)
+            and count(after[1]) and count(after[2]))
+
+def _search_near(query, lat, lng, radius_km, nearest, page):
+    """Run the filtered query over the geo index candidates, closest first.
+
+    Pages on (distance, id); nearest=K caps the total across all pages.
+    Returns (fields, distances) with at most page.limit + 1 fields, where
+    distances maps field id -> km.
+    """
+    index = ensure_geo_index()
+    after = tuple(page.after[:2]) if page.after else None
+    served = page.after[2] if page.after else 0
+    want = page.limit + 1
+    if nearest:
+        want = min(want, nearest - served)
+    distances = {}
+    fields = []
+    batch = []
+    batch_size = max(want, GEO_BATCH_SIZE)
+
+    def flush():
+        found = query.filter(Field.id.in_(batch)).all()
+        found.sort(key=lambda f: (distances[f.id], f.id))
+        fields.extend(found)
+
+    if want <= 0:
+        return fields, distances
+    # Walk candidates nearest-first and let SQL apply the other filters
+    # batch by batch, so a page is found without loading every field
+    for field_id, dist in index.iter_nearest(lat, lng, max_km=radius_km):
+        if after is not None and (dist, field_id) <= after:
+            continue
+        distances[field_id] = dist
+        batch.append(field_id)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+            if len(fields) >= want:
+                break
+    if batch and len(fields) < want:
+        flush()
+    return fields[:want], distances
+
 # Modified route to handle new search parameters
 @field_bp.route("/search", methods=["GET"])
 def search_fields():
     """Get all fields with advanced filtering based on type, area, and date."""
-    # Get query parameters for filtering
-    field_type = request.args.get("field_type")
-    area = request.args.get("area") # Assuming 'area' corresponds to 'city' or a specific district field
+    # Attribute filters (field_type, area, city, q, min_price, max_price) are
+    # read by canonical_filters below; 'area' currently maps to 'city'
     date_str = request.args.get("date")
-    # Keep old filters for potential backward compatibility or other uses
-    city = request.args.get("city") 
-    min_price = request.args.get("min_price")
-    max_price = request.args.get("max_price")
-
-    # Start with base query
-    query = Field.query
-
-    # Apply filters if provided
-    if field_type and field_type != 'Tất cả loại sân':
-        # Assuming Field model has a 'field_type' column
-        # Use ilike for case-insensitive matching if needed
-        query = query.filter(Field.field_type.ilike(f"%{field_type}%")) 
-
-    if area and area != 'Tất cả khu vực':
-        # Assuming 'area' maps to 'city' or a specific 'district' column
-        # Using 'city' for now, adjust if there's a different column like 'district' or 'area'
-        query = query.filter(Field.city.ilike(f"%{area}%")) 
-        
-    if city: # Keep city filter if passed directly
-         query = query.filter(Field.city.ilike(f"%{city}%"))
+    # "Near me" search: lat/lng plus radius_km and/or nearest=K
+    lat = request.args.get("lat")
+    lng = request.args.get("lng")
+    radius_km = request.args.get("radius_km")
+    nearest = request.args.get("nearest")
+    try:
+        page = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if date_str:
+    geo = None
+    if lat is not None or lng is not None:
+        try:
+            geo = (float(lat), float(lng))
+            radius_km = float(radius_km) if radius_km else None
+            nearest = int(nearest) if nearest else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "lat, lng, radius_km and nearest must be numeric"}), 400
+        if not (-90 <= geo[0] <= 90 and -180 <= geo[1] <= 180):
+            return jsonify({"error": "lat/lng out of range"}), 400
+        if (radius_km is not None and radius_km <= 0) or (nearest is not None and nearest <= 0):
+            return jsonify({"error": "radius_km and nearest must be positive"}), 400
+        if radius_km is None and nearest is None:
+            radius_km = DEFAULT_SEARCH_RADIUS_KM
+        if page.after and not _valid_geo_cursor(page.after):
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    filters = canonical_filters(request.args)
+    want_facets = request.args.get("facets", "").lower() in ("1", "true", "yes")
+    edges = DEFAULT_PRICE_EDGES
+    if request.args.get("price_buckets"):
         try:
-            # This filter might need refinement based on how availability is stored (e.g., bookings table)
-            # For now, just ensuring the query runs. A real implementation needs availability check.
-            search_date = datetime.strptime(date_str, 
-"%Y-%m-%d").date()
-            # Placeholder: Add logic here to filter based on availability on the given date
-            # This likely involves joining with a Bookings table and checking for time slots.
-            # query = query.filter(...) 
-            pass # Skipping date filtering logic for now as it requires booking info
+            edges = tuple(sorted({float(edge) for edge in request.args["price_buckets"].split(",")}))
         except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+            return jsonify({"error": "price_buckets must be comma-separated numbers"}), 400
 
-    if min_price:
+    busy_ids = set()
+    quote_window = None
+    if date_str:
         try:
-            query = query.filter(Field.price_per_hour >= float(min_price))
+            search_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
-            pass  # Ignore invalid price format
-
-    if max_price:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+        # Optional hour window [start_hour, end_hour) needing `duration` free consecutive hours
         try:
-            query = query.filter(Field.price_per_hour <= float(max_price))
+            start_hour = int(request.args.get("start_hour", OPEN_HOUR))
+            end_hour = int(request.args.get("end_hour", CLOSE_HOUR))
+            duration = int(request.args.get("duration", 1))
         except ValueError:
-            pass  # Ignore invalid price format
+            return jsonify({"error": "start_hour, end_hour and duration must be integers"}), 400
+        if not (0 <= start_hour < end_hour <= 24) or duration < 1:
+            return jsonify({"error": "Invalid hour window"}), 400
+        window = window_mask(start_hour, end_hour)
+        day_masks = occupancy.day_masks(search_date)
+        # Fields with no bookings that day have no mask and are free; only the
+        # (few) fields whose bitmap leaves no room are excluded
+        busy_ids = {
+            field_id for field_id, occupied in day_masks.items()
+            if not has_free_run(occupied, window, duration)
+        }
+        quote_window = (search_date, start_hour, end_hour, duration, day_masks)
+
+    if geo:
+        query = _apply_search_filters(Field.query.options(joinedload(Field.complex)), filters)
+        if busy_ids:
+            query = query.filter(Field.id.notin_(busy_ids))
+        fields, distances = _search_near(query, geo[0], geo[1], radius_km, nearest, page)
+        served = page.after[2] if page.after else 0
+
+        def serialize_near(batch):
+            results = Field.batch_to_dict(batch, include_complex=True)
+            for data in results:
+                data["distance_km"] = round(distances[data["id"]], 3)
+            return _with_quotes(results, *quote_window) if quote_window else results
+
+        extra = {"facets": _search_facets(filters, busy_ids, geo, radius_km, nearest, edges)} if want_facets else None
+        return paginated_response(
+            "fields", fields, page, serialize_near,
+            lambda field: [distances[field.id], field.id, served + page.limit], extra=extra
+        )
 
-    # Execute query and return results
-    fields = query.all()
-    # Add cluster_name to the dict if the Field model has a relationship
-    # Assuming a relationship 'complex' exists on the Field model
-    return jsonify({"fields": [field.to_dict(include_complex=True) for field in fields]}), 200
+    # Everything else is answered from the result cache: the ordered ids for
+    # the canonical filters, with availability applied on top in memory
+    def id_query():
+        return _apply_search_filters(Field.query, filters).with_entities(Field.id)
+
+    def load_ids(limit):
+        return [field_id for (field_id,) in id_query().order_by(Field.id.asc()).limit(limit).all()]
+
+    if page.after and not isinstance(page.after[0], int):
+        return jsonify({"error": "Invalid cursor"}), 400
+    ids = cached_search_ids(filters, load_ids)
+    if ids is None:
+        # Too many matches to cache: keyset-page them straight from SQL
+        query = id_query()
+        if busy_ids:
+            query = query.filter(Field.id.notin_(busy_ids))
+        rows = (field_id for (field_id,) in keyset_filter(query, Field.id, page))
+    else:
+        start = bisect_right(ids, page.after[0]) if page.after else 0
+        rows = (field_id for field_id in islice(ids, start, None) if field_id not in busy_ids)
+    extra = {"facets": _search_facets(filters, busy_ids, None, None, None, edges)} if want_facets else None
+    serialize = _field_payloads
+    if quote_window:
+        serialize = lambda batch: _with_quotes(_field_payloads(batch), *quote_window)
+    return paginated_response("fields", rows, page, serialize, lambda field_id: [field_id], extra=extra)
+
+
+@field_bp.route("/autocomplete", methods=["GET"])
+def autocomplete_fields():
+    """Type-ahead suggestions served from the in-memory text index"""
+    q = request.args.get("q", "")
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    suggestions = ensure_text_index().suggest(q, limit=limit)
+    return jsonify({"suggestions": suggestions}), 200
 
 
 @field_bp.route("/<int:field_id>", methods=["GET"])
 def get_field(field_id):
     """Get field by ID"""
+    def load():
+        field = Field.query.get(field_id)
+        return {"field": field.to_dict(include_complex=True)} if field else None
+
+    response = _cached_detail(("field", field_id), load)
+    if response is None:
+        return jsonify({"error": "Field not found"}), 404
+    return response
+
+@field_bp.route("/", methods=["GET"])
+@jwt_required(optional=True)
+def get_all_fields():
+    """List fields with complex names, one keyset page at a time (owner names for admins only)"""
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id) if current_user_id else None
+    include_owner = user is not None and user.role == "admin"
+
+    query = Field.query.options(joinedload(Field.complex))
+    if request.args.get("city"):
+        query = query.filter(Field.city == request.args["city"])
+    try:
+        for name, column in (("owner_id", Field.owner_id), ("complex_id", Field.complex_id)):
+            if request.args.get(name):
+                query = query.filter(column == int(request.args[name]))
+    except ValueError:
+        return jsonify({"error": "owner_id and complex_id must be integers"}), 400
+
+    try:
+        page = parse_page_args(request.args)
+        column, descending = parse_sort_args(request.args, FIELD_SORTS, "id")
+        query, cursor_of = keyset_sorted(query, page, column, Field.id, descending)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return paginated_response(
+        "fields", query, page, lambda batch: Field.batch_to_dict(batch, include_owner=include_owner), cursor_of
+    )
+
+@field_bp.route("/<int:field_id>/availability", methods=["GET"])
+def get_field_availability(field_id):
+    """Booked slots of a field per day between from and to (YYYY-MM-DD, inclusive).
+
+    granularity is the slot size in minutes; format=bitmap gives one '0'/'1'
+    per slot over opening hours ('1' = booked), format=rle gives runs.
+    """
+    if field_id not in ensure_field_columns().price:
+        return jsonify({"error": "Field not found"}), 404
+
+    try:
+        dates = _date_range_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    start_date, end_date = dates[0], dates[-1]
+
+    try:
+        granularity = int(request.args.get("granularity", 60))
+    except ValueError:
+        granularity = None
+    if granularity not in SLOT_GRANULARITIES:
+        return jsonify({"error": "granularity must be one of: " + ", ".join(map(str, SLOT_GRANULARITIES))}), 400
+    encoding = request.args.get("format", "bitmap")
+    if encoding not in ("bitmap", "rle"):
+        return jsonify({"error": "format must be bitmap or rle"}), 400
+
+    masks = field_slot_masks(field_id, dates, granularity)
+    if encoding == "bitmap":
+        day_list = [{"date": day.isoformat(), "busy": slot_bitmap(masks[day], granularity)} for day in dates]
+    else:
+        day_list = [{"date": day.isoformat(), "runs": slot_runs(masks[day], granularity)} for day in dates]
+    payload = {
+        "field_id": field_id,
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        "granularity": granularity,
+        "open_hour": OPEN_HOUR,
+        "close_hour": CLOSE_HOUR,
+        "format": encoding,
+        "days": day_list
+    }
+    return _etag_response(payload, make_etag(payload))
+
+@field_bp.route("/<int:field_id>/pricing", methods=["GET"])
+def get_field_pricing(field_id):
+    """Rate rules of a field and the weekly hourly table compiled from them"""
+    table = price_table(field_id)
+    if table is None:
+        return jsonify({"error": "Field not found"}), 404
+    rules = FieldPriceRule.query.filter_by(field_id=field_id).order_by(FieldPriceRule.id).all()
+    return jsonify({
+        "field_id": field_id,
+        "rules": [rule.to_dict() for rule in rules],
+        # weekly[d][h] = rate for weekday d (Monday = 0), hour h
+        "weekly": [table.rates[day * 24:(day + 1) * 24] for day in range(7)]
+    }), 200
+
+@field_bp.route("/<int:field_id>/pricing", methods=["PUT"])
+@jwt_required()
+def update_field_pricing(field_id):
+    """Replace a field's rate rules (owner or admin only)"""
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
     field = Field.query.get(field_id)
 
     if not field:
         return jsonify({"error": "Field not found"}), 404
+    if not user or (field.owner_id != current_user_id and user.role != "admin"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json()
+    try:
+        rules = parse_rules(data.get("rules"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        FieldPriceRule.query.filter_by(field_id=field_id).delete()
+        db.session.add_all([FieldPriceRule(field_id=field_id, **rule) for rule in rules])
+        db.session.commit()
+        invalidate_price_table(field_id)
+        publish_sync("price_rules", field_id=field_id)
+        return get_field_pricing(field_id)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error updating pricing: {e}") # Log the error
+        return jsonify({"error": "Failed to update pricing"}), 500
+
+@field_bp.route("/<int:field_id>/quote", methods=["GET"])
+def quote_field(field_id):
+    """Price of start_time..end_time, or hourly slot prices per day for from..to"""
+    table = price_table(field_id)
+    if table is None:
+        return jsonify({"error": "Field not found"}), 404
+
+    if request.args.get("start_time") or request.args.get("end_time"):
+        try:
+            start_time = parse_local_time(request.args["start_time"])
+            end_time = parse_local_time(request.args["end_time"])
+        except (KeyError, ValueError):
+            return jsonify({"error": "start_time and end_time must be ISO datetimes"}), 400
+        if end_time <= start_time:
+            return jsonify({"error": "end_time must be after start_time"}), 400
+        return jsonify({
+            "field_id": field_id,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "total_price": table.price(start_time, end_time)
+        }), 200
 
-    # Assuming to_dict can include related complex info
-    return jsonify({"field": field.to_dict(include_complex=True)}), 200
+    try:
+        dates = _date_range_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    start_date, end_date = dates[0], dates[-1]
+    return jsonify({
+        "field_id": field_id,
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        "open_hour": OPEN_HOUR,
+        "close_hour": CLOSE_HOUR,
+        # prices[i] = rate of the hour starting at open_hour + i
+        "days": [{"date": day.isoformat(), "prices": table.day_rates(day, OPEN_HOUR, CLOSE_HOUR)} for day in dates]
+    }), 200
 
 @field_bp.route("/", methods=["POST"])
 @jwt_required()
@@ -111,6 +588,7 @@ def create_field():
         )
         db.session.add(field)
         db.session.commit()
+        _sync_field_indexes(field)
         return jsonify({
             "message": "Field created successfully",
             "field": field.to_dict(include_complex=True)
@@ -134,6 +612,7 @@ def update_field(field_id):
         return jsonify({"error": "Unauthorized"}), 403
 
     data = request.get_json()
+    before = field_snapshot(field)
     # Update allowed fields
     for key in ["name", "description", "address", "city", "field_type", "latitude", "longitude", "price_per_hour", "image_url", "complex_id"]:
         if key in data:
@@ -141,6 +620,7 @@ def update_field(field_id):
 
     try:
         db.session.commit()
+        _sync_field_indexes(field, before)
         return jsonify({
             "message": "Field updated successfully",
             "field": field.to_dict(include_complex=True)
@@ -163,9 +643,11 @@ def delete_field(field_id):
     if not user or (field.owner_id != current_user_id and user.role != "admin"):
         return jsonify({"error": "Unauthorized"}), 403
 
+    before = field_snapshot(field)
     try:
         db.session.delete(field)
         db.session.commit()
+        _drop_field_indexes(field_id, before)
         return jsonify({"message": "Field deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -176,17 +658,37 @@ def delete_field(field_id):
 
 @field_bp.route("/complex", methods=["GET"])
 def get_all_complexes():
-    """Get all field complexes"""
-    complexes = FieldComplex.query.all()
-    return jsonify({"complexes": [c.to_dict() for c in complexes]}), 200
+    """Get all field complexes, one keyset page at a time"""
+    try:
+        page = parse_page_args(request.args)
+        query = keyset_filter(FieldComplex.query, FieldComplex.id, page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paginated_response(
+        "complexes", query, page, lambda batch: [c.to_dict() for c in batch], lambda c: [c.id]
+    )
 
 @field_bp.route("/complex/<int:complex_id>", methods=["GET"])
 def get_complex(complex_id):
     """Get field complex by ID"""
-    complex_obj = FieldComplex.query.get(complex_id)
-    if not complex_obj:
+    def load():
+        complex_obj = FieldComplex.query.get(complex_id)
+        return {"complex": complex_obj.to_dict()} if complex_obj else None
+
+    response = _cached_detail(("complex", complex_id), load)
+    if response is None:
         return jsonify({"error": "Field complex not found"}), 404
-    return jsonify({"complex": complex_obj.to_dict()}), 200
+    return response
+
+@field_bp.route("/cache-stats", methods=["GET"])
+@jwt_required()
+def get_cache_stats():
+    """Hit/miss counters for the detail and search caches (admin only)"""
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    if not user or user.role != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify({"detail_cache": detail_cache.stats(), "search_cache": search_cache.stats()}), 200
 
 # --- Owner specific routes --- #
 
@@ -198,12 +700,11 @@ def get_owner_fields():
     user = User.query.get(current_user_id)
     if not user or user.role not in ["owner", "admin"]:
          return jsonify({"error": "Unauthorized"}), 403
+    try:
+        page = parse_page_args(request.args)
+        query = Field.query.options(joinedload(Field.complex)).filter_by(owner_id=current_user_id)
+        query = keyset_filter(query, Field.id, page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    fields = Field.query.filter_by(owner_id=current_user_id).all()
-    return jsonify({"fields": [field.to_dict(include_complex=True) for field in fields]}), 200
-
-# --- Need to update Field model's to_dict method --- #
-# Make sure the Field model's to_dict method includes 'field_type' 
-# and optionally 'complex.name' as 'cluster_name' when include_complex=True
-
-
+    return paginated_response("fields", query, page, Field.batch_to_dict, lambda field: [field.id])
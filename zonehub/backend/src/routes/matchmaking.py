@@ -1,11 +1,13 @@
 # backend/src/routes/matchmaking.py
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models import db
+from src.app import db # The initialized instance (src.models.db is never bound to the app)
 from src.models.user import User, Team, TeamMember
 from src.models.booking import Booking
 from src.models.team_finder import FindOpponentRequest # May need adjustment
 from src.models.match_chat import Match, ChatRoom, ChatMessage # Import new models
+from src.services.chat_auth import close_chat_room, is_user_in_match_room
+from src.services.chat_history import parse_history_args, room_history
 from datetime import datetime
 
 matchmaking_bp = Blueprint("matchmaking", __name__, url_prefix="/api/matchmaking")
@@ -253,6 +255,9 @@ def cancel_match(match_id):
             db.session.add(system_message)
             
         db.session.commit()
+        # Kick connected sockets out of the archived room and drop their cached grants
+        if match.chat_room:
+            close_chat_room(match.chat_room.id)
         
         # TODO: Send notification to the other team
         
@@ -265,3 +270,19 @@ def cancel_match(match_id):
 
 # Add endpoints for match history, submitting scores, rating fair play etc. later
 
+@matchmaking_bp.route("/rooms/<int:room_id>/messages", methods=["GET"])
+@jwt_required()
+def get_room_messages(room_id):
+    """Chat history of a match room, newest page first; pass before_id to scroll back."""
+    current_user_id = get_jwt_identity()
+
+    # Members keep read access after the room is archived
+    if not is_user_in_match_room(current_user_id, room_id, active_only=False):
+        return jsonify({"error": "Unauthorized to read this room"}), 403
+
+    try:
+        before_id, limit = parse_history_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(room_history(room_id, before_id, limit)), 200
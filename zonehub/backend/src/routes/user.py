@@ -2,8 +2,13 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from src.models.user import User
 from src.extensions import db
+from src.services.pagination import parse_page_args, parse_sort_args, keyset_sorted, paginated_response, like_prefix
+from src.services.user_names import invalidate_display_name
 import datetime
 
+# Sortable columns for the admin user list
+USER_SORTS = {'id': User.id, 'created_at': User.created_at, 'username': User.username}
+
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/register', methods=['POST'])
@@ -123,6 +128,7 @@ def update_profile():
     
     try:
         db.session.commit()
+        invalidate_display_name(user.id)
         return jsonify({
             'message': 'Profile updated successfully',
             'user': user.to_dict()
@@ -146,12 +152,30 @@ def get_user(user_id):
 @user_bp.route('/all', methods=['GET'])
 @jwt_required()
 def get_all_users():
-    """Get all users (admin only)"""
+    """List users, one keyset page at a time (admin only)"""
     current_user_id = get_jwt_identity()
     current_user = User.query.get(current_user_id)
     
     if not current_user or current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized access'}), 403
     
-    users = User.query.all()
-    return jsonify({'users': [user.to_dict() for user in users]}), 200
+    # Filters: role, q (prefix of username / email / full name)
+    query = User.query
+    if request.args.get('role'):
+        query = query.filter(User.role == request.args['role'])
+    if request.args.get('q'):
+        prefix = like_prefix(request.args['q'].strip())
+        query = query.filter(db.or_(
+            User.username.like(prefix, escape='\\'),
+            User.email.like(prefix, escape='\\'),
+            User.full_name.like(prefix, escape='\\')
+        ))
+    
+    try:
+        page = parse_page_args(request.args)
+        column, descending = parse_sort_args(request.args, USER_SORTS, 'id')
+        query, cursor_of = keyset_sorted(query, page, column, User.id, descending)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response('users', query, page, lambda batch: [user.to_dict() for user in batch], cursor_of)
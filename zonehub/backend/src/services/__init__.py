@@ -0,0 +1 @@
+# In-process services (indexes, caches) shared by the route blueprints
@@ -0,0 +1,152 @@
+# backend/src/services/analytics.py
+# Aggregated booking statistics for owner dashboards. Owner stats read the
+# per-day rollup rows kept by services/rollups.py (O(days), not O(bookings));
+# Python only folds them into per-field totals.
+import json
+from sqlalchemy import func
+from src.app import db
+from src.config import CACHE_CONFIG
+from src.models.booking import Booking, Payment
+from src.models.field import Field, FieldComplex, FieldDailyStat
+from src.models.user import User
+from src.services.availability import OPEN_HOUR, CLOSE_HOUR, HOURS_PER_DAY
+from src.services.cache import TTLCache
+
+# Statuses that count as earned revenue (same rule the dashboards used client-side)
+REVENUE_STATUSES = ('confirmed', 'completed')
+BOOKABLE_HOURS_PER_DAY = CLOSE_HOUR - OPEN_HOUR
+
+# Rolled-up dashboard payloads, keyed ('owner_stats', owner_id, from, to, daily)
+owner_stats_cache = TTLCache(maxsize=CACHE_CONFIG['STATS_MAXSIZE'], ttl=CACHE_CONFIG['STATS_TTL'])
+# Site-wide admin totals; only counters, so a short TTL is enough
+summary_cache = TTLCache(maxsize=1, ttl=CACHE_CONFIG['SUMMARY_TTL'])
+
+
+def _hours_by_hour(minutes):
+    return [round(value / 60, 2) for value in minutes]
+
+
+def owner_field_stats(owner_id, start_date, end_date, include_daily=False):
+    """Per-field bookings, revenue and occupancy for [start_date, end_date]"""
+    days = (end_date - start_date).days + 1
+
+    rows = db.session.query(FieldDailyStat).join(Field, Field.id == FieldDailyStat.field_id).filter(
+        Field.owner_id == owner_id,
+        FieldDailyStat.day >= start_date,
+        FieldDailyStat.day <= end_date
+    ).all()
+
+    fields = {
+        field_id: {
+            'field_id': field_id,
+            'field_name': name,
+            'total_bookings': 0,
+            'active_bookings': 0,
+            'pending_bookings': 0,
+            'revenue': 0.0,
+            'booked_hours': 0.0,
+            'booked_minutes_by_hour': [0.0] * HOURS_PER_DAY
+        }
+        for field_id, name in db.session.query(Field.id, Field.name).filter(Field.owner_id == owner_id).all()
+    }
+    daily = []
+    for row in rows:
+        entry = fields.get(row.field_id)
+        if entry is None:
+            continue
+        entry['total_bookings'] += row.total_bookings
+        entry['active_bookings'] += row.active_bookings
+        entry['pending_bookings'] += row.pending_bookings
+        entry['revenue'] += row.revenue
+        entry['booked_hours'] += row.booked_hours
+        for hour, minutes in enumerate(json.loads(row.hourly_minutes)):
+            entry['booked_minutes_by_hour'][hour] += minutes
+        if include_daily:
+            daily.append({
+                'field_id': row.field_id,
+                'date': row.day.isoformat(),
+                'bookings': row.active_bookings,
+                'revenue': row.revenue,
+                'booked_hours': round(row.booked_hours, 2)
+            })
+
+    capacity = days * BOOKABLE_HOURS_PER_DAY
+    all_minutes = [0.0] * HOURS_PER_DAY
+    for entry in fields.values():
+        entry['booked_hours'] = round(entry['booked_hours'], 2)
+        entry['occupancy_rate'] = round(entry['booked_hours'] / capacity, 4) if capacity else 0.0
+        minutes = entry.pop('booked_minutes_by_hour')
+        all_minutes = [total + value for total, value in zip(all_minutes, minutes)]
+        # Popular hours: booked hours per clock hour over the range
+        entry['booked_hours_by_hour'] = _hours_by_hour(minutes)
+
+    field_list = sorted(fields.values(), key=lambda e: e['field_id'])
+    result = {
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'days': days,
+        'fields': field_list,
+        'totals': {
+            'fields': len(field_list),
+            'total_bookings': sum(e['total_bookings'] for e in field_list),
+            'active_bookings': sum(e['active_bookings'] for e in field_list),
+            'pending_bookings': sum(e['pending_bookings'] for e in field_list),
+            'revenue': sum(e['revenue'] for e in field_list),
+            'booked_hours': round(sum(e['booked_hours'] for e in field_list), 2),
+            'booked_hours_by_hour': _hours_by_hour(all_minutes),
+            'occupancy_rate': round(
+                sum(e['booked_hours'] for e in field_list) / (capacity * len(field_list)), 4
+            ) if capacity and field_list else 0.0
+        }
+    }
+    if include_daily:
+        result['daily'] = sorted(daily, key=lambda d: (d['date'], d['field_id']))
+    return result
+
+
+def cached_owner_field_stats(owner_id, start_date, end_date, include_daily=False):
+    key = ('owner_stats', owner_id, start_date, end_date, include_daily)
+    return owner_stats_cache.get_or_load(
+        key, lambda: owner_field_stats(owner_id, start_date, end_date, include_daily)
+    )
+
+
+def invalidate_owner_stats(owner_id):
+    """Drop cached dashboards for an owner after one of their bookings changes"""
+    owner_stats_cache.delete_where(lambda key: key[1] == owner_id)
+    summary_cache.clear()
+
+
+def admin_summary():
+    """Site-wide totals for the admin dashboard, one GROUP BY per table"""
+    users_by_role = dict(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+
+    bookings_by_status = {}
+    for status, count, amount in db.session.query(
+        Booking.status, func.count(Booking.id), func.sum(Booking.total_price)
+    ).group_by(Booking.status).all():
+        bookings_by_status[status] = {'count': count, 'total_price': float(amount or 0)}
+
+    paid = db.session.query(func.count(Payment.id), func.sum(Payment.amount)).filter(
+        Payment.status == 'completed').one()
+
+    return {
+        'users': {'total': sum(users_by_role.values()), 'by_role': users_by_role},
+        'fields': {
+            'total': db.session.query(func.count(Field.id)).scalar(),
+            'complexes': db.session.query(func.count(FieldComplex.id)).scalar()
+        },
+        'bookings': {
+            'total': sum(entry['count'] for entry in bookings_by_status.values()),
+            'by_status': bookings_by_status
+        },
+        'revenue': {
+            'bookings': sum(bookings_by_status.get(status, {}).get('total_price', 0.0) for status in REVENUE_STATUSES),
+            'payments_completed': float(paid[1] or 0),
+            'payments_completed_count': paid[0]
+        }
+    }
+
+
+def cached_admin_summary():
+    return summary_cache.get_or_load('admin_summary', admin_summary)
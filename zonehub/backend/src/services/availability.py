@@ -0,0 +1,308 @@
+# backend/src/services/availability.py
+# Per-field, per-day hourly occupancy bitmaps derived from the bookings table.
+# Bit h of a day mask is set when hour [h:00, h+1:00) overlaps a live booking,
+# so "is this field free on that date/window" is a couple of integer ops.
+# The same masks at finer slot sizes back the public availability endpoint.
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from datetime import datetime, time, timedelta
+from time import monotonic
+from src.config import CACHE_CONFIG
+from src.services.cache import TTLCache
+from src.services.local_time import to_local
+from src.services.socket_queue import on_sync, on_reconnect, publish_sync
+
+HOURS_PER_DAY = 24
+# Matches the 6:00-22:00 slots offered by the booking form
+OPEN_HOUR = 6
+CLOSE_HOUR = 22
+# Bookings in these statuses no longer hold their slot ('expired' is set by the pending sweeper)
+INACTIVE_STATUSES = ('cancelled', 'expired')
+# Dates kept in memory; older/rarely searched days are reloaded on demand
+MAX_LOADED_DAYS = 120
+# Slot sizes (minutes) the availability endpoint can report in
+SLOT_GRANULARITIES = (15, 30, 60)
+
+
+def window_mask(start_hour, end_hour, size=HOURS_PER_DAY):
+    """Bits for hours (or slots, with size = slots per day) in [start_hour, end_hour)"""
+    start_hour = max(0, start_hour)
+    end_hour = min(size, end_hour)
+    if end_hour <= start_hour:
+        return 0
+    return ((1 << (end_hour - start_hour)) - 1) << start_hour
+
+
+OPENING_MASK = window_mask(OPEN_HOUR, CLOSE_HOUR)
+
+
+def has_free_run(occupied, window, duration=1):
+    """True if the window holds `duration` consecutive hours not in `occupied`"""
+    run = ~occupied & window
+    for _ in range(1, duration):
+        run &= run >> 1
+    return run != 0
+
+
+def booking_day_masks(start_time, end_time, slot_minutes=60):
+    """Split a booking into {date: slot mask} for every day it touches (hourly slots by default)"""
+    slot_seconds = slot_minutes * 60
+    slots_per_day = HOURS_PER_DAY * 60 // slot_minutes
+    masks = {}
+    if not start_time or not end_time or end_time <= start_time:
+        return masks
+    day = start_time.date()
+    while True:
+        day_start = datetime.combine(day, time.min)
+        if day_start >= end_time:
+            break
+        lo = max(start_time, day_start)
+        hi = min(end_time, day_start + timedelta(days=1))
+        first = (lo - day_start).seconds // slot_seconds
+        # Any overlap with a slot marks the whole slot busy
+        last = -(-int((hi - day_start).total_seconds()) // slot_seconds)
+        mask = window_mask(first, last, slots_per_day)
+        if mask:
+            masks[day] = mask
+        day += timedelta(days=1)
+    return masks
+
+
+def _naive(dt):
+    # Stored datetimes are naive local time; an aware value is converted to it
+    return to_local(dt)
+
+
+class OccupancyIndex:
+    """Day-major store: date -> field_id -> {booking_id: mask}"""
+
+    def __init__(self, max_days=MAX_LOADED_DAYS):
+        self.max_days = max_days
+        self._spans = OrderedDict()
+        self._masks = {}
+        self._by_booking = {}
+        self._loaded_at = {}
+        # Bumped on every booking change so a day load can spot a racing write
+        self._version = 0
+        self._lock = threading.RLock()
+
+    def clear(self):
+        with self._lock:
+            self._spans = OrderedDict()
+            self._masks = {}
+            self._by_booking = {}
+            self._loaded_at = {}
+
+    def is_fresh(self, day):
+        """Loaded, and less than INDEX_TTL ago (changes on other workers show up after that)"""
+        if day not in self._spans:
+            return False
+        ttl = CACHE_CONFIG['INDEX_TTL']
+        return not ttl or monotonic() - self._loaded_at.get(day, 0) < ttl
+
+    def _drop_day(self, day):
+        fields = self._spans.pop(day)
+        self._masks.pop(day, None)
+        self._loaded_at.pop(day, None)
+        for bookings in fields.values():
+            for booking_id in bookings:
+                entries = self._by_booking.get(booking_id)
+                if entries:
+                    entries.discard(day)
+                    if not entries:
+                        del self._by_booking[booking_id]
+
+    def _evict(self):
+        while len(self._spans) > self.max_days:
+            self._drop_day(next(iter(self._spans)))
+
+    def _recompute(self, day, field_id):
+        bookings = self._spans[day].get(field_id)
+        if not bookings:
+            self._spans[day].pop(field_id, None)
+            self._masks[day].pop(field_id, None)
+            return
+        mask = 0
+        for booking_mask in bookings.values():
+            mask |= booking_mask
+        self._masks[day][field_id] = mask
+
+    def _add(self, booking_id, field_id, start_time, end_time):
+        # Only days already in memory are touched; the rest load from the DB later
+        for day, mask in booking_day_masks(_naive(start_time), _naive(end_time)).items():
+            if day not in self._spans:
+                continue
+            self._spans[day].setdefault(field_id, {})[booking_id] = mask
+            self._by_booking.setdefault(booking_id, set()).add(day)
+            self._recompute(day, field_id)
+
+    def discard_booking(self, booking_id):
+        with self._lock:
+            for day in self._by_booking.pop(booking_id, ()):
+                fields = self._spans.get(day)
+                if fields is None:
+                    continue
+                for field_id, bookings in list(fields.items()):
+                    if bookings.pop(booking_id, None) is not None:
+                        self._recompute(day, field_id)
+
+    def apply_booking(self, booking):
+        """Reflect a committed booking (new, moved, or status change)"""
+        with self._lock:
+            self._version += 1
+            self.discard_booking(booking.id)
+            if booking.status in INACTIVE_STATUSES:
+                return
+            self._add(booking.id, booking.field_id, booking.start_time, booking.end_time)
+
+    def load_day(self, day):
+        """Build the masks for one date from a single range query over bookings"""
+        from src.models.booking import Booking
+        day_start = datetime.combine(day, time.min)
+        day_end = day_start + timedelta(days=1)
+        while True:
+            version = self._version
+            rows = Booking.query.with_entities(
+                Booking.id, Booking.field_id, Booking.start_time, Booking.end_time
+            ).filter(
+                Booking.status.notin_(INACTIVE_STATUSES),
+                Booking.start_time < day_end,
+                Booking.end_time > day_start
+            ).all()
+            with self._lock:
+                if self.is_fresh(day):
+                    self._spans.move_to_end(day)
+                    return
+                if version != self._version:
+                    continue # A booking changed while we were reading; re-read
+                if day in self._spans:
+                    self._drop_day(day) # Expired: rebuild from the rows just read
+                self._spans[day] = {}
+                self._loaded_at[day] = monotonic()
+                self._masks[day] = {}
+                for booking_id, field_id, start_time, end_time in rows:
+                    start_time = max(_naive(start_time), day_start)
+                    end_time = min(_naive(end_time), day_end)
+                    self._add(booking_id, field_id, start_time, end_time)
+                self._evict()
+                return
+
+    def day_masks(self, day):
+        """{field_id: occupied mask} for a date, loading it if needed (a copy: writers mutate the live dict)"""
+        if not self.is_fresh(day):
+            self.load_day(day)
+        with self._lock:
+            if day in self._spans:
+                self._spans.move_to_end(day)
+            return dict(self._masks.get(day, {}))
+
+    def occupied(self, field_id, day):
+        if not self.is_fresh(day):
+            self.load_day(day)
+        with self._lock:
+            return self._masks.get(day, {}).get(field_id, 0)
+
+    def is_available(self, field_id, day, start_hour=OPEN_HOUR, end_hour=CLOSE_HOUR, duration=1):
+        return has_free_run(self.occupied(field_id, day), window_mask(start_hour, end_hour), duration)
+
+
+occupancy = OccupancyIndex()
+
+
+# Per-field day masks at any slot size, keyed ('slots', field_id, date, slot_minutes)
+slot_cache = TTLCache(maxsize=CACHE_CONFIG['SLOTS_MAXSIZE'], ttl=CACHE_CONFIG['SLOTS_TTL'])
+
+
+def field_slot_masks(field_id, days, slot_minutes=60):
+    """{date: occupied slot mask} for one field; uncached days share one range query"""
+    from src.models.booking import Booking
+    masks = {}
+    missing = []
+    for day in days:
+        mask = slot_cache.get(('slots', field_id, day, slot_minutes))
+        if mask is None:
+            missing.append(day)
+        else:
+            masks[day] = mask
+    if not missing:
+        return masks
+
+    generation = slot_cache.generation
+    range_start = datetime.combine(min(missing), time.min)
+    range_end = datetime.combine(max(missing) + timedelta(days=1), time.min)
+    rows = Booking.query.with_entities(Booking.start_time, Booking.end_time).filter(
+        Booking.field_id == field_id,
+        Booking.status.notin_(INACTIVE_STATUSES),
+        Booking.start_time < range_end,
+        Booking.end_time > range_start
+    ).all()
+    loaded = dict.fromkeys(missing, 0)
+    for start_time, end_time in rows:
+        for day, mask in booking_day_masks(_naive(start_time), _naive(end_time), slot_minutes).items():
+            if day in loaded:
+                loaded[day] |= mask
+    for day, mask in loaded.items():
+        slot_cache.set(('slots', field_id, day, slot_minutes), mask, generation=generation)
+    masks.update(loaded)
+    return masks
+
+
+def slot_bitmap(mask, slot_minutes=60):
+    """'0'/'1' per slot from OPEN_HOUR to CLOSE_HOUR, '1' meaning booked"""
+    per_hour = 60 // slot_minutes
+    return ''.join(
+        '1' if mask >> slot & 1 else '0'
+        for slot in range(OPEN_HOUR * per_hour, CLOSE_HOUR * per_hour)
+    )
+
+
+def slot_runs(mask, slot_minutes=60):
+    """Run-length form of slot_bitmap: [{'start': 'HH:MM', 'end': 'HH:MM', 'busy': bool}]"""
+    def clock(slot):
+        minutes = slot * slot_minutes
+        return '%02d:%02d' % (minutes // 60, minutes % 60)
+
+    per_hour = 60 // slot_minutes
+    runs = []
+    first = OPEN_HOUR * per_hour
+    for slot in range(first, CLOSE_HOUR * per_hour + 1):
+        at_end = slot == CLOSE_HOUR * per_hour
+        if at_end or slot > first and (mask >> slot & 1) != (mask >> (slot - 1) & 1):
+            runs.append({'start': clock(first), 'end': clock(slot), 'busy': bool(mask >> first & 1)})
+            first = slot
+    return runs
+
+
+def booking_changed(*bookings):
+    """Refresh the in-memory availability views of this and every other worker after a booking commit"""
+    _apply_booking_changes(bookings)
+    publish_sync('bookings', bookings=[
+        {'id': b.id, 'field_id': b.field_id, 'status': b.status,
+         'start_time': b.start_time.isoformat(), 'end_time': b.end_time.isoformat()}
+        for b in bookings
+    ])
+
+
+@on_sync('bookings')
+def _apply_remote_bookings(bookings):
+    _apply_booking_changes([
+        SimpleNamespace(**dict(b, start_time=datetime.fromisoformat(b['start_time']),
+                               end_time=datetime.fromisoformat(b['end_time'])))
+        for b in bookings
+    ])
+
+
+@on_reconnect
+def _reload_occupancy():
+    # Bookings written elsewhere while this worker was disconnected are reloaded per day
+    occupancy.clear()
+    slot_cache.clear()
+
+
+def _apply_booking_changes(bookings):
+    for booking in bookings:
+        occupancy.apply_booking(booking)
+    # A booking may have moved, so drop every cached day of its field
+    field_ids = {booking.field_id for booking in bookings}
+    slot_cache.delete_where(lambda key: key[1] in field_ids)
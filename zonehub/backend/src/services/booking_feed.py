@@ -0,0 +1,64 @@
+# backend/src/services/booking_feed.py
+# Live booking change feed. After a booking write commits, one compact event
+# goes to the field's room (open booking forms) and one to the owner's room
+# (owner dashboard), so clients patch what they show instead of re-fetching
+# whole booking lists.
+from datetime import datetime
+from src.extensions import socketio
+
+BOOKING_EVENT = 'booking_event'
+
+
+def field_room(field_id):
+    return f'field_{field_id}'
+
+
+def owner_room(owner_id):
+    return f'owner_{owner_id}'
+
+
+def _slot(booking):
+    # Public view: enough to mark a slot taken or free, nothing about who booked it
+    return {
+        'id': booking.id,
+        'start_time': booking.start_time.isoformat(),
+        'end_time': booking.end_time.isoformat(),
+        'status': booking.status
+    }
+
+
+def _detail(booking):
+    entry = _slot(booking)
+    entry['field_id'] = booking.field_id
+    entry['user_id'] = getattr(booking, 'user_id', None)
+    entry['total_price'] = getattr(booking, 'total_price', None)
+    return entry
+
+
+def publish_booking_changes(action, owner_id, *bookings):
+    """Emit `action` (created, updated, cancelled, paid, expired) for committed bookings.
+
+    Best effort: a failed emit is logged, never raised, since the write already happened.
+    """
+    if not bookings:
+        return
+    at = datetime.utcnow().isoformat()
+    by_field = {}
+    for booking in bookings:
+        by_field.setdefault(booking.field_id, []).append(booking)
+    try:
+        for field_id, items in by_field.items():
+            socketio.emit(BOOKING_EVENT, {
+                'action': action,
+                'field_id': field_id,
+                'at': at,
+                'bookings': [_slot(booking) for booking in items]
+            }, to=field_room(field_id))
+        if owner_id is not None:
+            socketio.emit(BOOKING_EVENT, {
+                'action': action,
+                'at': at,
+                'bookings': [_detail(booking) for booking in bookings]
+            }, to=owner_room(owner_id))
+    except Exception as e:
+        print(f"Error publishing booking event: {e}") # Log the error
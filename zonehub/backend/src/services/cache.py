@@ -0,0 +1,129 @@
+# backend/src/services/cache.py
+# Bounded in-process LRU cache with per-entry TTL and hit/miss counters.
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from src.config import CACHE_CONFIG
+
+
+class TTLCache:
+    """LRU mapping whose entries also expire `ttl` seconds after being stored"""
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        # Bumped by every invalidation; a load that started before it must not be stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def generation(self):
+        """Pass to set() to drop a value loaded before a concurrent invalidation"""
+        return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """Store a value; ignored if `generation` predates an invalidation"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def get_or_load(self, key, loader, cacheable=None):
+        """Read-through: return the cached value or call loader() and cache it.
+
+        A loader returning None (e.g. row not found) is not cached, nor is a
+        value rejected by the optional cacheable(value) predicate.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        generation = self.generation
+        value = loader()
+        if value is not None and (cacheable is None or cacheable(value)):
+            self.set(key, value, generation=generation)
+        return value
+
+    def delete(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def delete_where(self, predicate):
+        """Drop every key for which predicate(key) is true"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+def make_etag(payload):
+    """Strong validator for a JSON payload (stable across processes)"""
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def index_fresh(index):
+    """Whether a lazily built index (.loaded, .loaded_at) is within CACHE_CONFIG['INDEX_TTL']"""
+    if not index.loaded:
+        return False
+    ttl = CACHE_CONFIG['INDEX_TTL']
+    return not ttl or time.monotonic() - index.loaded_at < ttl
+
+
+# Field and complex detail payloads, keyed ('field', id) / ('complex', id)
+detail_cache = TTLCache(maxsize=CACHE_CONFIG['DETAIL_MAXSIZE'], ttl=CACHE_CONFIG['DETAIL_TTL'])
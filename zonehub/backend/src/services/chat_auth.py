@@ -0,0 +1,135 @@
+# backend/src/services/chat_auth.py
+# Per-connection chat authorization. A socket authenticates once (token on
+# connect, or on its first join_room); each room it joins is checked against
+# the database once and remembered for that sid, so send_message needs no
+# token decoding and no queries. Archiving a room revokes its grants at once;
+# grants also expire after CACHE_CONFIG['CHAT_AUTH_TTL'] seconds, which bounds
+# how long a membership change made elsewhere can go unnoticed.
+import threading
+import time
+from src.config import CACHE_CONFIG
+
+
+def chat_room_name(room_id):
+    return f"match_room_{room_id}"
+
+
+def chat_room_id(room_name):
+    """Inverse of chat_room_name; None for any other room"""
+    prefix = "match_room_"
+    if isinstance(room_name, str) and room_name.startswith(prefix) and room_name[len(prefix):].isdigit():
+        return int(room_name[len(prefix):])
+    return None
+
+
+def is_user_in_match_room(user_id, room_id, active_only=True):
+    """Is the user on either team of the room's match? Two queries"""
+    from src.app import db
+    from src.models.match_chat import ChatRoom, Match
+    from src.models.user import TeamMember
+    room = db.session.query(ChatRoom.status, Match.team_a_id, Match.team_b_id).join(
+        Match, Match.id == ChatRoom.match_id
+    ).filter(ChatRoom.id == room_id).first()
+    if not room or (active_only and room.status != "active"):
+        return False
+
+    member = db.session.query(TeamMember.id).filter(
+        TeamMember.user_id == user_id,
+        TeamMember.team_id.in_((room.team_a_id, room.team_b_id))
+    ).first()
+    return member is not None
+
+
+class ChatSession:
+    def __init__(self, user_id, token_expires_at):
+        self.user_id = user_id
+        self.token_expires_at = token_expires_at  # JWT exp (epoch seconds) or None
+        self.rooms = {}  # room_id -> grant expiry (epoch seconds)
+
+
+class ChatSessions:
+    """sid -> ChatSession, guarded by one lock (handlers run on many threads/greenlets)"""
+
+    def __init__(self, ttl, clock=time.time):
+        self._ttl = ttl
+        self._clock = clock
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _live(self, sid):
+        session = self._sessions.get(sid)
+        if session is not None and session.token_expires_at and session.token_expires_at <= self._clock():
+            # The token ran out; the client must authenticate again
+            del self._sessions[sid]
+            return None
+        return session
+
+    def authenticate(self, sid, user_id, token_expires_at=None):
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is None or session.user_id != user_id:
+                session = self._sessions[sid] = ChatSession(user_id, token_expires_at)
+            else:
+                session.token_expires_at = token_expires_at
+            return session
+
+    def user_id(self, sid):
+        with self._lock:
+            session = self._live(sid)
+            return session.user_id if session else None
+
+    def grant(self, sid, room_id):
+        with self._lock:
+            session = self._live(sid)
+            if session is not None:
+                session.rooms[room_id] = self._clock() + self._ttl
+
+    def allowed(self, sid, room_id):
+        """(user_id, True) if the sid holds a live grant for the room, else (user_id or None, False)"""
+        with self._lock:
+            session = self._live(sid)
+            if session is None:
+                return None, False
+            expires_at = session.rooms.get(room_id)
+            if expires_at is None or expires_at <= self._clock():
+                session.rooms.pop(room_id, None)
+                return session.user_id, False
+            return session.user_id, True
+
+    def revoke(self, sid, room_id):
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is not None:
+                session.rooms.pop(room_id, None)
+
+    def revoke_room(self, room_id):
+        """Drop every grant for a room; returns the sids that had one"""
+        with self._lock:
+            sids = [sid for sid, session in self._sessions.items() if session.rooms.pop(room_id, None) is not None]
+            return sids
+
+    def drop(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions = {}
+
+
+chat_sessions = ChatSessions(ttl=CACHE_CONFIG['CHAT_AUTH_TTL'])
+
+
+def close_chat_room(room_id):
+    """After a room is archived: revoke cached grants and remove every socket from it"""
+    from src.extensions import socketio
+    chat_sessions.revoke_room(room_id)
+    room_name = chat_room_name(room_id)
+    try:
+        socketio.emit("room_archived", {"room_id": room_id}, to=room_name)
+        socketio.close_room(room_name)
+    except Exception as e:
+        print(f"Error closing chat room {room_id}: {e}") # Log the error
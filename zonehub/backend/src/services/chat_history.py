@@ -0,0 +1,51 @@
+# backend/src/services/chat_history.py
+# Chat history pages, newest first. A page is one range scan of the
+# (room_id, id) index: "WHERE room_id = :room AND id < :before_id ORDER BY id
+# DESC LIMIT n". Ids are time-ordered (services/chat_writer.py), so id order is
+# send order; messages still in the write-behind queue are merged in.
+from src.services.chat_writer import chat_writer
+
+DEFAULT_HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 100
+
+
+def parse_history_args(args):
+    """before_id and limit from request args or a socket payload; raises ValueError"""
+    try:
+        limit = int(args.get('limit') or DEFAULT_HISTORY_LIMIT)
+        before_id = int(args['before_id']) if args.get('before_id') not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError('before_id and limit must be integers')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return before_id, min(limit, MAX_HISTORY_LIMIT)
+
+
+def room_history(room_id, before_id=None, limit=DEFAULT_HISTORY_LIMIT):
+    """Up to `limit` messages older than before_id (latest when None), oldest first.
+
+    Returns {'room_id', 'messages', 'before_id', 'next_before_id'};
+    next_before_id is None once the start of the room's history is reached.
+    """
+    from src.models.match_chat import ChatMessage
+    query = ChatMessage.query.filter(ChatMessage.room_id == room_id)
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+    rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+
+    messages = ChatMessage.batch_to_dict(rows)
+    known = {message['id'] for message in messages}
+    for payload in chat_writer.pending(room_id):
+        if payload['id'] not in known and (before_id is None or payload['id'] < before_id):
+            messages.append(payload)
+    messages.sort(key=lambda message: message['id'], reverse=True)
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    return {
+        'room_id': room_id,
+        'messages': messages,
+        'before_id': before_id,
+        'next_before_id': messages[0]['id'] if has_more and messages else None
+    }
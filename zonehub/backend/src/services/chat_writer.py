@@ -0,0 +1,237 @@
+# backend/src/services/chat_writer.py
+# Write-behind persistence for chat messages. send_message gives a message its
+# id right away, broadcasts it and queues the row; a background task writes the
+# queue to chat_messages in multi-row INSERTs every FLUSH_INTERVAL_MS or as soon
+# as FLUSH_BATCH_SIZE rows are waiting.
+#
+# Guarantees (CHAT_CONFIG):
+# - Ids are time-ordered: milliseconds | worker id | sequence. They increase
+#   strictly within a process and follow wall-clock order (to the ms) across
+#   workers; every worker needs its own WORKER_ID.
+# - Rows are inserted in the order they were queued, and room history merges
+#   the rows still queued, so a client never sees a message vanish.
+# - 'write_behind' acknowledges before the commit: a crashed process loses at
+#   most the last FLUSH_INTERVAL_MS / MAX_QUEUE worth of messages (the queue is
+#   flushed on a clean exit). While the database is down, sends beyond
+#   MAX_QUEUE are refused rather than queued. WRITE_MODE 'sync' commits before
+#   broadcasting.
+import atexit
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from src.config import CHAT_CONFIG
+
+# 2024-01-01 UTC; 41 bits of milliseconds from here last until 2093. With
+# 32 workers and 128 ids per ms each, an id fits in 53 bits, so JavaScript
+# numbers hold it exactly.
+_ID_EPOCH_MS = 1704067200000
+WORKER_BITS = 5
+SEQUENCE_BITS = 7
+
+
+class MessageIds:
+    """Time-ordered 53-bit ids: ms since _ID_EPOCH_MS | worker id | per-ms sequence"""
+
+    def __init__(self, worker_id, clock=time.time):
+        self.worker_id = worker_id & ((1 << WORKER_BITS) - 1)
+        self._clock = clock
+        self._last = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            now = int(self._clock() * 1000) - _ID_EPOCH_MS
+            # A clock stepping back must not reorder ids; keep counting on the last ms
+            now = max(now, self._last)
+            if now == self._last:
+                self._sequence = (self._sequence + 1) & ((1 << SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    now += 1 # Sequence used up within this ms: borrow the next one
+            else:
+                self._sequence = 0
+            self._last = now
+            return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+
+class ChatWriter:
+    """Queue of chat_messages rows plus the broadcast payload of each, flushed in batches"""
+
+    def __init__(self, batch_size, interval, max_queue):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._inflight = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._task = None
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+        self.last_flush_ms = None
+
+    def __len__(self):
+        return len(self._queue) + len(self._inflight)
+
+    def enqueue(self, row, payload):
+        """Queue a row; when MAX_QUEUE rows are waiting the sender flushes first.
+
+        If that flush fails (database down) the error propagates and the row
+        is not queued, so the caller can report the send as failed.
+        """
+        if len(self) >= self.max_queue:
+            # Backpressure: the database is behind, so this sender waits for a flush
+            self.flush()
+        with self._lock:
+            self._queue.append((row, payload))
+            size = len(self._queue)
+        if size >= self.batch_size:
+            self._wake.set()
+
+    def pending(self, room_id):
+        """Payloads of queued or in-flight messages for a room, oldest first"""
+        with self._lock:
+            return [payload for row, payload in list(self._inflight) + list(self._queue) if row['room_id'] == room_id]
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows inserted"""
+        from src.app import db
+        from src.models.match_chat import ChatMessage
+        total = 0
+        # One flusher at a time keeps insert order equal to queue order
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    while self._queue and len(self._inflight) < self.batch_size:
+                        self._inflight.append(self._queue.popleft())
+                    batch = [row for row, _ in self._inflight]
+                if not batch:
+                    return total
+                started = time.monotonic()
+                try:
+                    db.session.execute(insert(ChatMessage), batch)
+                    db.session.commit()
+                    inserted = len(batch)
+                except IntegrityError as e:
+                    db.session.rollback()
+                    print(f"Chat batch insert failed, retrying row by row: {e}") # Log the error
+                    inserted = self._insert_rows(db, ChatMessage, batch)
+                except Exception:
+                    # Database unavailable: the batch stays in flight and is retried next time
+                    db.session.rollback()
+                    raise
+                with self._lock:
+                    self._inflight = []
+                    self.flushed += inserted
+                    self.batches += 1
+                    self.last_flush_ms = round((time.monotonic() - started) * 1000, 2)
+                total += inserted
+
+    def _insert_rows(self, db, model, rows):
+        # A bad row (e.g. its room was deleted) must not take the whole batch with it
+        inserted = 0
+        for index, row in enumerate(rows):
+            try:
+                db.session.execute(insert(model), [row])
+                db.session.commit()
+                inserted += 1
+            except IntegrityError as e:
+                db.session.rollback()
+                with self._lock:
+                    self.dropped += 1
+                print(f"Dropped chat message {row['id']}: {e}") # Log the error
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    # rows mirrors _inflight: keep only those not handled yet for the next attempt
+                    del self._inflight[:index]
+                raise
+        return inserted
+
+    def start(self, app, socketio):
+        """Run the flusher in the background (once per process) and flush on exit"""
+        with self._lock:
+            if self._task is not None:
+                return self._task
+            self._task = True
+
+        def loop():
+            from src.app import db
+            while True:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                with app.app_context():
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        print(f"Error flushing chat messages: {e}") # Log the error
+                    finally:
+                        db.session.remove()
+
+        def flush_at_exit():
+            with app.app_context():
+                self.flush()
+
+        atexit.register(flush_at_exit)
+        self._task = socketio.start_background_task(loop)
+        return self._task
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'mode': CHAT_CONFIG['WRITE_MODE'],
+                'queued': len(self._queue),
+                'inflight': len(self._inflight),
+                'flushed': self.flushed,
+                'batches': self.batches,
+                'dropped': self.dropped,
+                'last_flush_ms': self.last_flush_ms,
+                'worker_id': message_ids.worker_id
+            }
+
+
+def _worker_id():
+    if CHAT_CONFIG['WORKER_ID'] is not None:
+        return int(CHAT_CONFIG['WORKER_ID'])
+    # Unset: a random id, fine for one worker; set CHAT_WORKER_ID when running several
+    return random.randrange(1 << WORKER_BITS)
+
+
+message_ids = MessageIds(_worker_id())
+chat_writer = ChatWriter(
+    batch_size=CHAT_CONFIG['FLUSH_BATCH_SIZE'],
+    interval=CHAT_CONFIG['FLUSH_INTERVAL_MS'] / 1000,
+    max_queue=CHAT_CONFIG['MAX_QUEUE']
+)
+
+
+def queue_message(room_id, sender_id, sender_name, content, message_type='user'):
+    """Assign an id, queue the row and return the payload to broadcast now"""
+    from flask import current_app
+    from src.extensions import socketio
+    chat_writer.start(current_app._get_current_object(), socketio)
+    row = {
+        'id': message_ids.next(),
+        'room_id': room_id,
+        'sender_id': sender_id,
+        'message_type': message_type,
+        'content': content,
+        'timestamp': datetime.utcnow()
+    }
+    payload = {
+        'id': row['id'],
+        'room_id': room_id,
+        'sender_id': sender_id,
+        'sender_name': sender_name,
+        'message_type': message_type,
+        'content': content,
+        'timestamp': row['timestamp'].isoformat()
+    }
+    chat_writer.enqueue(row, payload)
+    return payload
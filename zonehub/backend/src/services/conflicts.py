@@ -0,0 +1,101 @@
+# backend/src/services/conflicts.py
+# Booking conflict checks. The overlap probe is a single-row LIMIT 1 read over
+# the (field_id, start_time, end_time) index, and check + insert for one field
+# run under a lock so two requests cannot both see the slot as free.
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from src.app import db
+from src.services.availability import INACTIVE_STATUSES
+
+# Fixed pool of per-field locks (field_id % LOCK_STRIPES); bounded however many fields exist
+LOCK_STRIPES = 64
+_stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+class BookingConflict(Exception):
+    """The requested slot overlaps a live booking of the same field"""
+
+
+def has_conflict(field_id, start_time, end_time, exclude_id=None):
+    """True if a live booking of the field overlaps [start_time, end_time).
+
+    A locking read (FOR UPDATE) so that, under REPEATABLE READ, it sees rows
+    committed after this transaction's snapshot was taken.
+    """
+    from src.models.booking import Booking
+    query = db.session.query(Booking.id).filter(
+        Booking.field_id == field_id,
+        Booking.start_time < end_time,
+        Booking.end_time > start_time,
+        Booking.status.notin_(INACTIVE_STATUSES)
+    )
+    if exclude_id is not None:
+        query = query.filter(Booking.id != exclude_id)
+    return query.limit(1).with_for_update().first() is not None
+
+
+@contextmanager
+def field_booking_lock(field_id):
+    """Serialize booking writes for one field until the block's commit/rollback.
+
+    The in-process stripe lock covers threads of this worker; the FOR UPDATE on
+    the field row covers other workers (a no-op on SQLite, which serializes
+    writers itself). The row lock is released by the caller's commit or rollback.
+    """
+    from src.models.field import Field
+    with _stripes[field_id % LOCK_STRIPES]:
+        db.session.query(Field.id).filter(Field.id == field_id).with_for_update().first()
+        try:
+            yield
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def ensure_slot_free(field_id, start_time, end_time, exclude_id=None):
+    """Raise BookingConflict if the slot is taken; call inside field_booking_lock"""
+    if has_conflict(field_id, start_time, end_time, exclude_id):
+        raise BookingConflict("Time slot is not available")
+
+
+def sweep_conflicts(field_id, intervals):
+    """Check many [start, end) intervals against the field's bookings and each other.
+
+    Existing bookings come from one locking range query ordered by start_time;
+    with a running max of their end times, an interval conflicts iff the
+    bookings starting before its end reach past its start. Returns
+    {index: (reason, booking_id)} with reason 'booked' or 'duplicate' (overlaps
+    an earlier interval of the same request). Call inside field_booking_lock.
+    """
+    from src.models.booking import Booking
+    if not intervals:
+        return {}
+    rows = db.session.query(Booking.id, Booking.start_time, Booking.end_time).filter(
+        Booking.field_id == field_id,
+        Booking.start_time < max(end for _, end in intervals),
+        Booking.end_time > min(start for start, _ in intervals),
+        Booking.status.notin_(INACTIVE_STATUSES)
+    ).order_by(Booking.start_time).with_for_update().all()
+
+    starts = [start for _, start, _ in rows]
+    # reach[k] = (latest end, its booking id) among rows[0..k]
+    reach = []
+    for booking_id, _, end in rows:
+        if not reach or end > reach[-1][0]:
+            reach.append((end, booking_id))
+        else:
+            reach.append(reach[-1])
+
+    conflicts = {}
+    accepted_end = None
+    for index in sorted(range(len(intervals)), key=lambda i: intervals[i]):
+        start, end = intervals[index]
+        k = bisect_left(starts, end)
+        if k and reach[k - 1][0] > start:
+            conflicts[index] = ('booked', reach[k - 1][1])
+        elif accepted_end is not None and accepted_end > start:
+            conflicts[index] = ('duplicate', None)
+        else:
+            accepted_end = end if accepted_end is None else max(accepted_end, end)
+    return conflicts
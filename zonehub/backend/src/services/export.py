@@ -0,0 +1,90 @@
+# backend/src/services/export.py
+# Streamed CSV / NDJSON exports for accounting. Rows come off a server-side
+# cursor in batches (yield_per) and are encoded and sent batch by batch,
+# optionally through gzip, so memory stays flat however many rows there are.
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from flask import Response, stream_with_context
+
+EXPORT_BATCH_SIZE = 1000
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson')
+}
+
+
+def _cell(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+# Leading characters Excel would read as a formula (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _encode_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens Vietnamese text as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_cell(value) for value in row])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _encode_ndjson(rows, columns):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_cell, row))), ensure_ascii=False))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(query, columns, fmt, filename, compress=False):
+    """Stream the tuples of `query` (one value per name in `columns`) as a file download.
+
+    `query` should select plain columns (with_entities), not ORM objects, so
+    nothing piles up in the session while it streams.
+    """
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    rows = query.yield_per(EXPORT_BATCH_SIZE)
+    chunks = _encode_csv(rows, columns) if fmt == 'csv' else _encode_ndjson(rows, columns)
+
+    def generate():
+        # wbits 31 = gzip container, so the .gz opens with any gunzip
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor:
+            yield compressor.flush()
+
+    filename = f'{filename}.{extension}' + ('.gz' if compress else '')
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/gzip' if compress else mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
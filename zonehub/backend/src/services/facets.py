@@ -0,0 +1,111 @@
+# backend/src/services/facets.py
+# Columnar in-memory snapshot of the facetable field attributes, and a
+# one-pass facet counter over it for /api/fields/search?facets=1.
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from src.services.cache import index_fresh
+
+# VND per hour; the last bucket is open-ended
+DEFAULT_PRICE_EDGES = (100000, 200000, 300000, 500000)
+
+
+class FieldColumns:
+    """One dict per column (city, field_type, price), keyed by field id"""
+
+    def __init__(self):
+        self.city = {}
+        self.field_type = {}
+        self.price = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.price)
+
+    def ids(self):
+        with self._lock:
+            return list(self.price)
+
+    def upsert(self, field_id, city, field_type, price):
+        with self._lock:
+            self.city[field_id] = city
+            self.field_type[field_id] = field_type
+            self.price[field_id] = price
+
+    def remove(self, field_id):
+        with self._lock:
+            self.city.pop(field_id, None)
+            self.field_type.pop(field_id, None)
+            self.price.pop(field_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.city = {}
+            self.field_type = {}
+            self.price = {}
+            self.loaded = False
+
+
+field_columns = FieldColumns()
+
+
+def ensure_field_columns():
+    """Load the snapshot with one narrow SELECT on first use, and again once INDEX_TTL has passed"""
+    if index_fresh(field_columns):
+        return field_columns
+    from src.models.field import Field
+    with field_columns._lock:
+        if not index_fresh(field_columns):
+            field_columns.clear()
+            rows = Field.query.with_entities(Field.id, Field.city, Field.field_type, Field.price_per_hour).all()
+            for field_id, city, field_type, price in rows:
+                field_columns.upsert(field_id, city, field_type, price)
+            field_columns.loaded = True
+            field_columns.loaded_at = time.monotonic()
+    return field_columns
+
+
+def price_buckets(edges):
+    """[(min, max)] ranges for sorted edges, open at both ends"""
+    bounds = [0] + list(edges) + [None]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def compute_facets(universe, type_ids=None, city_ids=None, min_price=None, max_price=None,
+                   edges=DEFAULT_PRICE_EDGES):
+    """Count field_type, city and price-bucket facets in a single pass.
+
+    `universe` holds the ids matching every filter except the facetable ones.
+    Each facet is counted with the *other* facet filters applied but not its
+    own, so a dropdown shows what picking a different option would return.
+    type_ids / city_ids are the id sets matching those filters (None = no filter).
+    """
+    columns = ensure_field_columns()
+    type_counts = Counter()
+    city_counts = Counter()
+    bucket_counts = [0] * (len(edges) + 1)
+    with columns._lock:
+        for field_id in universe:
+            price = columns.price.get(field_id)
+            if price is None:
+                continue # Not in the snapshot (deleted meanwhile)
+            in_type = type_ids is None or field_id in type_ids
+            in_city = city_ids is None or field_id in city_ids
+            in_price = (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+            if in_city and in_price:
+                type_counts[columns.field_type.get(field_id)] += 1
+            if in_type and in_price:
+                city_counts[columns.city.get(field_id)] += 1
+            if in_type and in_city:
+                bucket_counts[bisect_right(edges, price)] += 1
+    return {
+        'field_type': [{'value': value, 'count': count} for value, count in type_counts.most_common()],
+        'city': [{'value': value, 'count': count} for value, count in city_counts.most_common()],
+        'price': [
+            {'min': lo, 'max': hi, 'count': count}
+            for (lo, hi), count in zip(price_buckets(edges), bucket_counts)
+        ]
+    }
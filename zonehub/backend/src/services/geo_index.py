@@ -0,0 +1,162 @@
+# backend/src/services/geo_index.py
+# In-memory grid index over field coordinates, used by /api/fields/search
+# for radius and nearest-K queries without touching MySQL for the geometry.
+import math
+import threading
+import time
+from src.services.cache import index_fresh
+
+EARTH_RADIUS_KM = 6371.0088
+# ~5.5 km per cell at the equator; a city district spans a handful of cells
+DEFAULT_CELL_DEG = 0.05
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Uniform lat/lng grid: cell -> {field_id: (lat, lng)}"""
+
+    def __init__(self, cell_deg=DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells = {}
+        self._points = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.loaded_at = None
+
+    def _cell_of(self, lat, lng):
+        return (int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg)))
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, field_id):
+        return field_id in self._points
+
+    def clear(self):
+        with self._lock:
+            self._cells = {}
+            self._points = {}
+            self.loaded = False
+
+    def upsert(self, field_id, lat, lng):
+        """Insert or move a field; fields without coordinates are dropped"""
+        with self._lock:
+            self.remove(field_id)
+            if lat is None or lng is None:
+                return
+            lat, lng = float(lat), float(lng)
+            cell = self._cell_of(lat, lng)
+            self._cells.setdefault(cell, {})[field_id] = (lat, lng)
+            self._points[field_id] = (lat, lng, cell)
+
+    def remove(self, field_id):
+        with self._lock:
+            entry = self._points.pop(field_id, None)
+            if entry is None:
+                return
+            bucket = self._cells.get(entry[2])
+            if bucket is not None:
+                bucket.pop(field_id, None)
+                if not bucket:
+                    del self._cells[entry[2]]
+
+    def _ring(self, center, r):
+        """Cells at Chebyshev distance exactly r from center"""
+        ci, cj = center
+        if r == 0:
+            yield center
+            return
+        for dj in range(-r, r + 1):
+            yield (ci - r, cj + dj)
+            yield (ci + r, cj + dj)
+        for di in range(-r + 1, r):
+            yield (ci + di, cj - r)
+            yield (ci + di, cj + r)
+
+    def _ring_min_km(self, lat, r):
+        """Lower bound on the distance to any point in ring r (or beyond)"""
+        if r == 0:
+            return 0.0
+        # Longitude degrees shrink with latitude; use the narrower axis
+        lat_km = 111.32 * self.cell_deg
+        lng_km = lat_km * max(math.cos(math.radians(min(abs(lat) + (r + 1) * self.cell_deg, 89.9))), 0.01)
+        return (r - 1) * min(lat_km, lng_km)
+
+    def iter_nearest(self, lat, lng, max_km=None):
+        """Yield (field_id, distance_km) in increasing distance order"""
+        center = self._cell_of(lat, lng)
+        with self._lock:
+            if not self._cells:
+                return
+            ci, cj = center
+            # Ring search never needs to go past the farthest occupied cell
+            max_r = max(max(abs(c[0] - ci), abs(c[1] - cj)) for c in self._cells)
+        pending = []
+        for r in range(max_r + 1):
+            # Hold the lock per ring only, never across a yield
+            with self._lock:
+                if 8 * r > len(self._cells):
+                    # Sparse far-out rings: walk occupied cells instead of the ring
+                    ring = [c for c in self._cells if max(abs(c[0] - ci), abs(c[1] - cj)) == r]
+                else:
+                    ring = self._ring(center, r)
+                for cell in ring:
+                    bucket = self._cells.get(cell)
+                    if not bucket:
+                        continue
+                    for field_id, (plat, plng) in bucket.items():
+                        dist = haversine_km(lat, lng, plat, plng)
+                        if max_km is None or dist <= max_km:
+                            pending.append((dist, field_id))
+            pending.sort(reverse=True)
+            bound = self._ring_min_km(lat, r + 1)
+            last_ring = r == max_r or (max_km is not None and bound > max_km)
+            # Anything closer than the next ring's lower bound is final
+            while pending and (last_ring or pending[-1][0] <= bound):
+                dist, field_id = pending.pop()
+                yield field_id, dist
+            if last_ring:
+                return
+
+    def within_radius(self, lat, lng, radius_km):
+        """All fields within radius_km, sorted by distance"""
+        return list(self.iter_nearest(lat, lng, max_km=radius_km))
+
+    def nearest(self, lat, lng, k, max_km=None):
+        """The k closest fields, optionally capped at max_km"""
+        results = []
+        for item in self.iter_nearest(lat, lng, max_km=max_km):
+            results.append(item)
+            if len(results) >= k:
+                break
+        return results
+
+
+geo_index = GeoIndex()
+
+
+def ensure_geo_index():
+    """Build the index from the fields table on first use, and again once INDEX_TTL has passed"""
+    if index_fresh(geo_index):
+        return geo_index
+    from src.models.field import Field
+    with geo_index._lock:
+        if not index_fresh(geo_index):
+            geo_index.clear()
+            rows = Field.query.with_entities(Field.id, Field.latitude, Field.longitude).filter(
+                Field.latitude.isnot(None), Field.longitude.isnot(None)
+            ).all()
+            for field_id, lat, lng in rows:
+                geo_index.upsert(field_id, lat, lng)
+            geo_index.loaded = True
+            geo_index.loaded_at = time.monotonic()
+    return geo_index
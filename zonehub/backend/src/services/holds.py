@@ -0,0 +1,248 @@
+# backend/src/services/holds.py
+# Short-lived slot holds (leases). Picking a slot in the booking form takes a
+# hold keyed by (field_id, slot); confirming the booking consumes it. Competing
+# users are turned away in memory, so a hot slot does not turn into a stream
+# of pending rows and rollbacks on the bookings table.
+import secrets
+import threading
+from datetime import datetime, timedelta
+from src.config import HOLD_CONFIG
+from src.services.conflicts import BookingConflict
+from src.services.socket_queue import on_sync, on_reconnect, publish_sync
+
+# Holds are tracked in half-hour slots; a hold covers every slot it touches
+HOLD_SLOT_MINUTES = 30
+# Expired holds are only dropped when their slot is looked at; sweep the whole map every N inserts
+PURGE_EVERY = 100
+_SLOT_EPOCH = datetime(2000, 1, 1)
+
+
+class SlotHeld(BookingConflict):
+    """The slot is held by another user"""
+
+
+class TooManyHolds(Exception):
+    """The user already holds HOLD_CONFIG['MAX_PER_USER'] slots"""
+
+
+class Hold:
+    def __init__(self, token, field_id, user_id, start_time, end_time, expires_at):
+        self.token = token
+        self.field_id = field_id
+        self.user_id = user_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.expires_at = expires_at
+
+    def to_dict(self):
+        return {
+            'token': self.token,
+            'field_id': self.field_id,
+            'user_id': self.user_id,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+            'expires_at': self.expires_at.isoformat()
+        }
+
+
+def hold_slots(field_id, start_time, end_time):
+    """(field_id, slot number) keys covering [start_time, end_time)"""
+    size = HOLD_SLOT_MINUTES * 60
+    first = int((start_time - _SLOT_EPOCH).total_seconds() // size)
+    last = -int(-(end_time - _SLOT_EPOCH).total_seconds() // size)
+    return [(field_id, slot) for slot in range(first, last)]
+
+
+class SlotHoldMap:
+    """(field_id, slot) -> hold token, with expiry checked on every lookup"""
+
+    def __init__(self, clock=datetime.utcnow):
+        self._clock = clock
+        self._slots = {}
+        self._holds = {}
+        self._by_user = {}
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._holds)
+
+    def _live(self, token, now):
+        hold = self._holds.get(token)
+        if hold is not None and hold.expires_at <= now:
+            self._drop(token)
+            return None
+        return hold
+
+    def _drop(self, token):
+        hold = self._holds.pop(token, None)
+        if hold is None:
+            return None
+        for key in hold_slots(hold.field_id, hold.start_time, hold.end_time):
+            if self._slots.get(key) == token:
+                del self._slots[key]
+        tokens = self._by_user.get(hold.user_id)
+        if tokens:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[hold.user_id]
+        return hold
+
+    def _blocking(self, keys, user_id, now):
+        # First live hold of another user on any of the slots
+        for key in keys:
+            token = self._slots.get(key)
+            if token is None:
+                continue
+            hold = self._live(token, now)
+            if hold is not None and hold.user_id != user_id:
+                return hold
+        return None
+
+    def acquire(self, field_id, user_id, start_time, end_time, ttl, max_per_user, replace=None):
+        """Hold [start_time, end_time) for user_id; raises SlotHeld or TooManyHolds.
+
+        The user's own holds on these slots, and the hold named by `replace`
+        (the slot they picked before), are released first.
+        """
+        now = self._clock()
+        keys = hold_slots(field_id, start_time, end_time)
+        with self._lock:
+            if self._blocking(keys, user_id, now) is not None:
+                raise SlotHeld("Time slot is being held by another user")
+            for token in list(self._by_user.get(user_id, ())):
+                self._live(token, now)
+            mine = self._by_user.get(user_id, set())
+            replaced = mine & ({self._slots.get(key) for key in keys} | {replace})
+            if len(mine) - len(replaced) >= max_per_user:
+                raise TooManyHolds(f"At most {max_per_user} slots can be held at once")
+            released = [self._drop(token) for token in replaced]
+            hold = Hold(secrets.token_urlsafe(16), field_id, user_id, start_time, end_time,
+                        now + timedelta(seconds=ttl))
+            self._insert(hold)
+            return hold, released
+
+    def _insert(self, hold):
+        self._inserts += 1
+        if self._inserts % PURGE_EVERY == 0:
+            self._purge(self._clock())
+        self._holds[hold.token] = hold
+        self._by_user.setdefault(hold.user_id, set()).add(hold.token)
+        for key in hold_slots(hold.field_id, hold.start_time, hold.end_time):
+            self._slots[key] = hold.token
+
+    def restore(self, hold):
+        """Re-insert a persisted hold unless it expired or collides"""
+        with self._lock:
+            keys = hold_slots(hold.field_id, hold.start_time, hold.end_time)
+            if hold.expires_at > self._clock() and self._blocking(keys, hold.user_id, self._clock()) is None:
+                self._insert(hold)
+
+    def get(self, token):
+        with self._lock:
+            return self._live(token, self._clock())
+
+    def release(self, token):
+        with self._lock:
+            return self._drop(token)
+
+    def check(self, field_id, start_time, end_time, user_id):
+        """Raise SlotHeld if another user holds part of the interval"""
+        with self._lock:
+            if self._blocking(hold_slots(field_id, start_time, end_time), user_id, self._clock()) is not None:
+                raise SlotHeld("Time slot is being held by another user")
+
+    def _purge(self, now):
+        expired = [token for token, hold in self._holds.items() if hold.expires_at <= now]
+        for token in expired:
+            self._drop(token)
+        return len(expired)
+
+    def purge_expired(self):
+        with self._lock:
+            return self._purge(self._clock())
+
+    def clear(self):
+        with self._lock:
+            self._slots = {}
+            self._holds = {}
+            self._by_user = {}
+            self.loaded = False
+
+
+slot_holds = SlotHoldMap()
+
+
+def ensure_holds_loaded():
+    """With persistence on, bring unexpired holds back after a restart (once)"""
+    if slot_holds.loaded:
+        return slot_holds
+    if HOLD_CONFIG['PERSIST']:
+        from src.app import db
+        from src.models.booking import SlotHold
+        now = datetime.utcnow()
+        SlotHold.query.filter(SlotHold.expires_at <= now).delete()
+        db.session.commit()
+        for row in SlotHold.query.all():
+            slot_holds.restore(Hold(row.token, row.field_id, row.user_id, row.start_time, row.end_time, row.expires_at))
+    slot_holds.loaded = True
+    return slot_holds
+
+
+def take_hold(field_id, user_id, start_time, end_time, replace=None):
+    """Acquire a hold (and persist it when configured); raises SlotHeld / TooManyHolds"""
+    ensure_holds_loaded()
+    hold, released = slot_holds.acquire(
+        field_id, user_id, start_time, end_time,
+        HOLD_CONFIG['TTL'], HOLD_CONFIG['MAX_PER_USER'], replace=replace
+    )
+    if HOLD_CONFIG['PERSIST']:
+        from src.app import db
+        from src.models.booking import SlotHold
+        for old in released:
+            SlotHold.query.filter_by(token=old.token).delete()
+        db.session.add(SlotHold(token=hold.token, field_id=field_id, user_id=user_id,
+                                start_time=start_time, end_time=end_time, expires_at=hold.expires_at))
+        db.session.commit()
+    publish_sync('hold', hold=hold.to_dict(), released=[old.token for old in released])
+    return hold
+
+
+def release_hold(token):
+    """Drop a hold (and its persisted row); returns the hold or None"""
+    ensure_holds_loaded()
+    hold = slot_holds.release(token)
+    if HOLD_CONFIG['PERSIST']:
+        from src.app import db
+        from src.models.booking import SlotHold
+        SlotHold.query.filter_by(token=token).delete()
+        db.session.commit()
+    publish_sync('hold_released', token=token)
+    return hold
+
+
+@on_sync('hold')
+def _apply_remote_hold(hold, released):
+    # Two workers granting the same slot within the broadcast delay both keep
+    # their hold; the booking itself is still checked against the database
+    for token in released:
+        slot_holds.release(token)
+    slot_holds.restore(Hold(
+        hold['token'], hold['field_id'], hold['user_id'],
+        datetime.fromisoformat(hold['start_time']), datetime.fromisoformat(hold['end_time']),
+        datetime.fromisoformat(hold['expires_at'])
+    ))
+
+
+@on_sync('hold_released')
+def _apply_remote_release(token):
+    slot_holds.release(token)
+
+
+@on_reconnect
+def _reload_holds():
+    # Persisted holds are reloaded from the table; without persistence, holds
+    # taken elsewhere during the outage stay unknown here until they expire
+    if HOLD_CONFIG['PERSIST']:
+        slot_holds.clear()
@@ -0,0 +1,136 @@
+# backend/src/services/idempotency.py
+# Idempotency-Key support for write endpoints. The first request with a key
+# claims it by inserting a row into idempotency_keys (unique on user, route,
+# key), so the claim holds across workers; its 2xx response is stored in that
+# row and a retry with the same key (same user, same route, same body) gets it
+# back without running the view again, whichever worker it lands on. Finished
+# responses are also kept in a bounded LRU/TTL cache in front of the table.
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from src.config import CACHE_CONFIG
+from src.services.cache import TTLCache
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# (user_id, path, key) -> (body fingerprint, status, body, mimetype)
+idempotency_store = TTLCache(maxsize=CACHE_CONFIG['IDEMPOTENCY_MAXSIZE'], ttl=CACHE_CONFIG['IDEMPOTENCY_TTL'])
+
+
+def _fingerprint():
+    return hashlib.sha1(request.get_data()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored[0] != fingerprint:
+        return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+    response = Response(stored[2], status=stored[1], mimetype=stored[3])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _scope_query(scope):
+    from src.models.booking import IdempotencyKey
+    user_id, path, key = scope
+    return IdempotencyKey.query.filter_by(user_id=user_id, path=path, key=key)
+
+
+def _claim(scope, fingerprint):
+    """Insert the in-progress row for scope; None when claimed, else the response to send"""
+    from src.app import db
+    from src.models.booking import IdempotencyKey
+    user_id, path, key = scope
+    for _ in range(3):
+        db.session.add(IdempotencyKey(user_id=user_id, path=path, key=key, fingerprint=fingerprint))
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+        row = _scope_query(scope).first()
+        if row is None:
+            continue # Released in the meantime; claim again
+        now = datetime.utcnow()
+        if row.status is None:
+            if row.created_at > now - timedelta(seconds=CACHE_CONFIG['IDEMPOTENCY_IN_FLIGHT_TIMEOUT']):
+                return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+        elif row.created_at > now - timedelta(seconds=CACHE_CONFIG['IDEMPOTENCY_TTL']):
+            stored = (row.fingerprint, row.status, row.body, row.mimetype)
+            idempotency_store.set(scope, stored)
+            return _replay(stored, fingerprint)
+        # Expired, or abandoned by a worker that died mid-request: take it over
+        db.session.delete(row)
+        db.session.commit()
+    return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+
+
+def _finish(scope, stored):
+    """Store the response on the claimed row, or drop the claim (stored=None) so a retry runs"""
+    from src.app import db
+    try:
+        if stored is None:
+            _scope_query(scope).delete(synchronize_session=False)
+        else:
+            _scope_query(scope).update(
+                {'status': stored[1], 'body': stored[2], 'mimetype': stored[3]}, synchronize_session=False
+            )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving Idempotency-Key {scope[2]}: {e}") # Log the error
+
+
+def purge_idempotency_keys(now=None):
+    """Delete rows older than IDEMPOTENCY_TTL; returns the number deleted"""
+    from src.app import db
+    from src.models.booking import IdempotencyKey
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=CACHE_CONFIG['IDEMPOTENCY_TTL'])
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def idempotent(view):
+    """Replay the stored response for a repeated Idempotency-Key (place under @jwt_required).
+
+    Only 2xx responses are stored: errors are cheap to recompute and a retry
+    may legitimately succeed later. A retry arriving while the first request
+    is still running, on any worker, gets 409.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        scope = (str(get_jwt_identity()), request.path, key)
+        fingerprint = _fingerprint()
+        stored = idempotency_store.get(scope)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        refused = _claim(scope, fingerprint)
+        if refused is not None:
+            return refused
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            from src.app import db
+            db.session.rollback()
+            _finish(scope, None)
+            raise
+        if 200 <= response.status_code < 300:
+            stored = (fingerprint, response.status_code, response.get_data(), response.mimetype)
+            _finish(scope, stored)
+            idempotency_store.set(scope, stored)
+        else:
+            _finish(scope, None)
+        return response
+
+    return wrapper
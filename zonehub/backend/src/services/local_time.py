@@ -0,0 +1,85 @@
+# backend/src/services/local_time.py
+# Bookings are stored as naive local wall time (the venue's clock), which is
+# what the hourly price tables and occupancy bitmaps are keyed on. Clients
+# send ISO strings, usually UTC from Date.toISOString(); anything carrying an
+# offset is converted to TIME_CONFIG['TIMEZONE'] before the offset is dropped.
+#
+# Bookings written before this conversion hold UTC wall time; shift them once
+# with `flask localize-booking-times --before <deploy time, UTC>`.
+from datetime import datetime, timedelta, timezone
+import click
+from src.config import TIME_CONFIG
+
+LOCALIZE_BATCH_SIZE = 500
+
+
+def _local_zone():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(TIME_CONFIG['TIMEZONE'])
+    except Exception:
+        # No tz database (e.g. Windows without the tzdata package): fixed offset
+        return timezone(timedelta(hours=TIME_CONFIG['FALLBACK_UTC_OFFSET']), TIME_CONFIG['TIMEZONE'])
+
+
+LOCAL_TZ = _local_zone()
+
+
+def to_local(dt):
+    """Naive local wall time; aware datetimes are converted first, naive ones are already local"""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(LOCAL_TZ).replace(tzinfo=None)
+
+
+def parse_local_time(value):
+    """ISO 8601 string -> naive local datetime as stored; raises ValueError"""
+    return to_local(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
+
+def local_today():
+    """Today's date on the venue's clock (the default day for date filters)"""
+    return datetime.now(LOCAL_TZ).date()
+
+
+def localize_booking_times(before, batch_size=LOCALIZE_BATCH_SIZE):
+    """Shift bookings created before `before` (naive UTC) from UTC to local wall time.
+
+    Not idempotent: run it once, with `before` no later than the deploy that
+    started storing local time. Returns the number of bookings shifted.
+    """
+    from src.app import db
+    from src.models.booking import Booking
+    shifted = 0
+    last_id = 0
+    while True:
+        rows = Booking.query.filter(Booking.created_at < before, Booking.id > last_id).order_by(Booking.id).limit(batch_size).all()
+        if not rows:
+            return shifted
+        for booking in rows:
+            booking.start_time = to_local(booking.start_time.replace(tzinfo=timezone.utc))
+            booking.end_time = to_local(booking.end_time.replace(tzinfo=timezone.utc))
+        db.session.commit()
+        shifted += len(rows)
+        last_id = rows[-1].id
+
+
+def to_utc_naive(dt):
+    # created_at is naive UTC; a cutoff given with an offset is converted to it
+    return dt if dt.tzinfo is None else dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def register_commands(app):
+    @app.cli.command('localize-booking-times')
+    @click.option('--before', required=True, help='Bookings created before this UTC time (ISO 8601) hold UTC times')
+    def localize_booking_times_command(before):
+        """One-off: convert booking times stored as UTC to the venue's local time"""
+        try:
+            cutoff = datetime.fromisoformat(before)
+        except ValueError:
+            raise click.BadParameter('--before must be an ISO 8601 date/time')
+        shifted = localize_booking_times(to_utc_naive(cutoff))
+        click.echo(f"Shifted {shifted} bookings to {TIME_CONFIG['TIMEZONE']}")
+        from src.services.rollups import rebuild_daily_stats
+        result = rebuild_daily_stats()
+        click.echo(f"Rebuilt {result['days']} daily rows for {result['fields']} fields; restart the workers to reload their caches")
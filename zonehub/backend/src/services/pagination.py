@@ -0,0 +1,183 @@
+# backend/src/services/pagination.py
+# Keyset (cursor) pagination and streamed JSON list responses.
+# A cursor is the sort key of the last row served, so the next page is an
+# index range scan ("WHERE id > :last ORDER BY id LIMIT n") instead of OFFSET.
+import base64
+import json
+from datetime import datetime
+from flask import Response, jsonify, stream_with_context
+from sqlalchemy import DateTime, Integer, and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+# Streaming keeps memory flat, so it may serve much larger pages
+MAX_STREAM_LIMIT = 10000
+STREAM_BATCH_SIZE = 200
+
+
+class PageArgs:
+    """Parsed limit/cursor/stream query parameters"""
+
+    def __init__(self, limit, after, stream):
+        self.limit = limit
+        self.after = after
+        self.stream = stream
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or not all(isinstance(v, (int, float, str)) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_page_args(args, default_limit=DEFAULT_LIMIT, max_limit=MAX_LIMIT):
+    """Read limit, cursor and stream from request.args; raises ValueError"""
+    stream = args.get("stream", "").lower() in ("1", "true", "yes")
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    cap = MAX_STREAM_LIMIT if stream else max_limit
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, cap)
+    cursor = args.get("cursor")
+    after = decode_cursor(cursor) if cursor else None
+    return PageArgs(limit, after, stream)
+
+
+def cursor_value(value):
+    """JSON-safe form of a sort key for encode_cursor"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _cursor_bound(column, value):
+    """Turn a decoded cursor value back into something comparable with column"""
+    if isinstance(column.type, DateTime):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    if isinstance(column.type, Integer) and (not isinstance(value, int) or isinstance(value, bool)):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def keyset_filter(query, column, page, tiebreaker=None, descending=False):
+    """Order by a column and resume after the cursor; fetches limit + 1 rows.
+
+    `column` alone must be unique; for non-unique sort columns (created_at,
+    start_time, ...) pass the primary key as `tiebreaker` and build cursors as
+    [cursor_value(sort_value), id].
+    """
+    if page.after:
+        value = _cursor_bound(column, page.after[0])
+        if tiebreaker is None:
+            query = query.filter(column < value if descending else column > value)
+        else:
+            if len(page.after) < 2:
+                raise ValueError("Invalid cursor")
+            last_id = _cursor_bound(tiebreaker, page.after[1])
+            if descending:
+                query = query.filter(or_(column < value, and_(column == value, tiebreaker < last_id)))
+            else:
+                query = query.filter(or_(column > value, and_(column == value, tiebreaker > last_id)))
+    order = [column.desc() if descending else column.asc()]
+    if tiebreaker is not None:
+        order.append(tiebreaker.desc() if descending else tiebreaker.asc())
+    query = query.order_by(*order).limit(page.limit + 1)
+    if page.stream:
+        # Rows come off the DB cursor in batches instead of one big fetchall
+        query = query.yield_per(STREAM_BATCH_SIZE)
+    return query
+
+
+def keyset_sorted(query, page, column, pk, descending=False):
+    """keyset_filter on any sort column, with pk as tiebreaker when needed.
+
+    Returns (query, cursor_of) ready for paginated_response.
+    """
+    if column is pk:
+        return keyset_filter(query, pk, page, descending=descending), lambda row: [getattr(row, pk.key)]
+    query = keyset_filter(query, column, page, tiebreaker=pk, descending=descending)
+    return query, lambda row: [cursor_value(getattr(row, column.key)), getattr(row, pk.key)]
+
+
+def like_prefix(text):
+    """LIKE pattern matching values that start with text (use escape='\\')"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def parse_sort_args(args, allowed, default):
+    """Read sort/order params; `allowed` maps sort names to columns. Raises ValueError"""
+    sort = args.get("sort", default)
+    if sort not in allowed:
+        raise ValueError("sort must be one of: " + ", ".join(sorted(allowed)))
+    order = args.get("order", "asc").lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+    return allowed[sort], order == "desc"
+
+
+def paginated_response(key, rows, page, serialize_many, cursor_of, extra=None):
+    """Serve up to page.limit rows as {key: [...], "next_cursor": ...}.
+
+    `rows` may yield page.limit + 1 items; the extra one only signals that a
+    next page exists. `serialize_many` turns a list of rows into a list of
+    dicts, so related data can be resolved once per page (or per streamed
+    chunk) instead of once per row. In stream mode rows are encoded as they
+    are read.
+    """
+    if not page.stream:
+        batch = []
+        has_more = False
+        for row in rows:
+            if len(batch) >= page.limit:
+                has_more = True
+                break
+            batch.append(row)
+        next_cursor = encode_cursor(cursor_of(batch[-1])) if has_more else None
+        payload = {key: serialize_many(batch), "next_cursor": next_cursor}
+        if extra:
+            payload.update(extra)
+        return jsonify(payload), 200
+
+    def encode(batch, first):
+        parts = [json.dumps(item, ensure_ascii=False, default=str) for item in serialize_many(batch)]
+        return ("" if first else ",") + ",".join(parts)
+
+    def generate():
+        yield '{"%s":[' % key
+        count = 0
+        batch = []
+        last = None
+        has_more = False
+        for row in rows:
+            if count >= page.limit:
+                has_more = True
+                break
+            batch.append(row)
+            count += 1
+            last = row
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield encode(batch, count == len(batch))
+                batch = []
+        if batch:
+            yield encode(batch, count == len(batch))
+        tail = {"next_cursor": encode_cursor(cursor_of(last)) if has_more else None}
+        if extra:
+            tail.update(extra)
+        yield "]," + json.dumps(tail, ensure_ascii=False, default=str)[1:]
+
+    return Response(stream_with_context(generate()), mimetype="application/json"), 200
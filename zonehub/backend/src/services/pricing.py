@@ -0,0 +1,141 @@
+# backend/src/services/pricing.py
+# Server-side pricing. A field's rate rules (peak, off-peak, weekend, ...) are
+# compiled once into a weekly table of 7 x 24 hourly rates plus prefix sums,
+# so pricing any interval is a few lookups instead of evaluating rules.
+from datetime import datetime
+from src.config import CACHE_CONFIG
+from src.services.cache import TTLCache
+
+HOURS_PER_WEEK = 7 * 24
+# A Monday; weekly tables are indexed by hours since this instant
+_WEEK_EPOCH = datetime(2000, 1, 3)
+
+# Compiled tables keyed ('prices', field_id)
+price_tables = TTLCache(maxsize=CACHE_CONFIG['PRICING_MAXSIZE'], ttl=CACHE_CONFIG['PRICING_TTL'])
+
+
+class PriceTable:
+    """Hourly rates for one week, hour 0 = Monday 00:00"""
+
+    def __init__(self, rates):
+        self.rates = rates
+        self.prefix = [0.0]
+        for rate in rates:
+            self.prefix.append(self.prefix[-1] + rate)
+        self.week_total = self.prefix[-1]
+
+    def _accrued(self, moment):
+        # Price of every hour from _WEEK_EPOCH up to moment
+        seconds = (moment - _WEEK_EPOCH).total_seconds()
+        hours, rest = divmod(seconds, 3600)
+        weeks, hour = divmod(int(hours), HOURS_PER_WEEK)
+        return weeks * self.week_total + self.prefix[hour] + self.rates[hour] * rest / 3600
+
+    def price(self, start_time, end_time):
+        """Total for [start_time, end_time), pro rata inside partial hours"""
+        if end_time <= start_time:
+            return 0.0
+        return round(self._accrued(end_time) - self._accrued(start_time), 2)
+
+    def day_rates(self, day, start_hour=0, end_hour=24):
+        """Hourly rates of one date between start_hour and end_hour"""
+        first = day.weekday() * 24
+        return self.rates[first + start_hour:first + end_hour]
+
+    def cheapest_run(self, day, start_hour, end_hour, duration, occupied=0):
+        """Lowest price of `duration` consecutive hours in [start_hour, end_hour) not in `occupied`"""
+        base = day.weekday() * 24
+        best = None
+        for hour in range(start_hour, end_hour - duration + 1):
+            if occupied >> hour & ((1 << duration) - 1):
+                continue
+            total = self.prefix[base + hour + duration] - self.prefix[base + hour]
+            if best is None or total < best:
+                best = total
+        return round(best, 2) if best is not None else None
+
+
+def compile_rules(base_price, rules):
+    """Fold rules over the flat base price; where rules overlap the highest priority wins"""
+    rates = [float(base_price or 0)] * HOURS_PER_WEEK
+    # Ascending priority so later (higher) rules overwrite; ties keep rule order
+    for rule in sorted(rules, key=lambda r: r.priority or 0):
+        for day in range(7):
+            if not rule.days_mask >> day & 1:
+                continue
+            for hour in range(rule.start_hour, rule.end_hour):
+                rates[day * 24 + hour] = float(rule.price_per_hour)
+    return PriceTable(rates)
+
+
+def price_tables_for(field_ids):
+    """{field_id: PriceTable}; uncached fields are compiled from two queries total"""
+    from src.models.field import Field, FieldPriceRule
+    tables = {}
+    missing = []
+    for field_id in set(field_ids):
+        table = price_tables.get(('prices', field_id))
+        if table is None:
+            missing.append(field_id)
+        else:
+            tables[field_id] = table
+    if not missing:
+        return tables
+
+    generation = price_tables.generation
+    base_prices = dict(Field.query.with_entities(Field.id, Field.price_per_hour).filter(Field.id.in_(missing)).all())
+    rules = {}
+    for rule in FieldPriceRule.query.filter(FieldPriceRule.field_id.in_(missing)).order_by(FieldPriceRule.id).all():
+        rules.setdefault(rule.field_id, []).append(rule)
+    for field_id, base_price in base_prices.items():
+        table = compile_rules(base_price, rules.get(field_id, []))
+        price_tables.set(('prices', field_id), table, generation=generation)
+        tables[field_id] = table
+    return tables
+
+
+def price_table(field_id):
+    """Compiled table for one field, or None if the field does not exist"""
+    return price_tables_for([field_id]).get(field_id)
+
+
+def quote(field_id, start_time, end_time):
+    table = price_table(field_id)
+    return table.price(start_time, end_time) if table else None
+
+
+def invalidate_price_table(field_id):
+    """Drop a field's compiled table after its rules or base price change"""
+    price_tables.delete(('prices', field_id))
+
+
+def parse_rules(payload):
+    """Validate [{days, start_hour, end_hour, price_per_hour, label, priority}]; raises ValueError"""
+    if not isinstance(payload, list):
+        raise ValueError("rules must be a list")
+    parsed = []
+    for index, item in enumerate(payload):
+        try:
+            days = item.get('days', list(range(7)))
+            days_mask = 0
+            for day in days:
+                if not 0 <= int(day) <= 6:
+                    raise ValueError
+                days_mask |= 1 << int(day)
+            start_hour = int(item['start_hour'])
+            end_hour = int(item['end_hour'])
+            price = float(item['price_per_hour'])
+            priority = int(item.get('priority', 0))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid rule at index {index}: needs days 0-6, start_hour, end_hour, price_per_hour")
+        if not (0 <= start_hour < end_hour <= 24) or price < 0 or not days_mask:
+            raise ValueError(f"Invalid rule at index {index}: hours must satisfy 0 <= start < end <= 24, price >= 0")
+        parsed.append({
+            'label': item.get('label'),
+            'days_mask': days_mask,
+            'start_hour': start_hour,
+            'end_hour': end_hour,
+            'price_per_hour': price,
+            'priority': priority
+        })
+    return parsed
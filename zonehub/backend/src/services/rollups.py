@@ -0,0 +1,149 @@
+# backend/src/services/rollups.py
+# Daily per-field rollups of the bookings table (field_daily_stats). A booking
+# write re-folds only the (field, day) rows it touched, so dashboards read
+# O(days) rows instead of scanning raw bookings. rebuild_daily_stats (and
+# `flask rebuild-daily-stats`) backfills or repairs a date range.
+import json
+from datetime import datetime, time, timedelta
+import click
+from sqlalchemy import and_, or_, insert
+from src.app import db
+from src.models.booking import Booking
+from src.models.field import Field, FieldDailyStat
+from src.services.availability import HOURS_PER_DAY, INACTIVE_STATUSES
+from src.services.analytics import REVENUE_STATUSES
+from src.services.conflicts import field_booking_lock
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def fold_bookings(rows):
+    """{day: totals} for (start_time, end_time, status, total_price) rows, keyed by start day"""
+    days = {}
+    for start_time, end_time, status, total_price in rows:
+        entry = days.get(start_time.date())
+        if entry is None:
+            entry = days[start_time.date()] = {
+                'total_bookings': 0,
+                'active_bookings': 0,
+                'pending_bookings': 0,
+                'revenue': 0.0,
+                'booked_hours': 0.0,
+                'hourly_minutes': [0.0] * HOURS_PER_DAY
+            }
+        entry['total_bookings'] += 1
+        if status == 'pending':
+            entry['pending_bookings'] += 1
+        if status in REVENUE_STATUSES:
+            entry['revenue'] += float(total_price or 0)
+        if status in INACTIVE_STATUSES:
+            continue
+        entry['active_bookings'] += 1
+        entry['booked_hours'] += (end_time - start_time).total_seconds() / 3600
+        # Spread the booking over the clock hours of its start day
+        moment = start_time
+        stop = min(end_time, _day_bounds(start_time.date())[1])
+        while moment < stop:
+            hour_end = min(stop, moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+            entry['hourly_minutes'][moment.hour] += (hour_end - moment).total_seconds() / 60
+            moment = hour_end
+    return days
+
+
+def _stat_rows(field_id, folded):
+    now = datetime.utcnow()
+    return [
+        {
+            'field_id': field_id,
+            'day': day,
+            'total_bookings': entry['total_bookings'],
+            'active_bookings': entry['active_bookings'],
+            'pending_bookings': entry['pending_bookings'],
+            'revenue': entry['revenue'],
+            'booked_hours': round(entry['booked_hours'], 4),
+            'hourly_minutes': json.dumps([round(minutes, 2) for minutes in entry['hourly_minutes']]),
+            'updated_at': now
+        }
+        for day, entry in folded.items()
+    ]
+
+
+def _booking_rows():
+    return db.session.query(Booking.start_time, Booking.end_time, Booking.status, Booking.total_price)
+
+
+def refresh_daily_stats(*bookings):
+    """Re-fold the rollup rows of the (field, start day) pairs touched by committed bookings.
+
+    Runs after the booking's own commit, one short transaction per field under
+    its booking lock; a failure is logged (rebuild_daily_stats repairs it) so
+    it never fails a write that already happened.
+    """
+    touched = {}
+    for booking in bookings:
+        touched.setdefault(booking.field_id, set()).add(booking.start_time.date())
+    for field_id in sorted(touched):
+        days = sorted(touched[field_id])
+        try:
+            with field_booking_lock(field_id):
+                # Shared-lock read so it sees the latest commits, not an older snapshot
+                rows = _booking_rows().filter(
+                    Booking.field_id == field_id,
+                    or_(*[and_(Booking.start_time >= lo, Booking.start_time < hi)
+                          for lo, hi in map(_day_bounds, days)])
+                ).with_for_update(read=True).all()
+                FieldDailyStat.query.filter(
+                    FieldDailyStat.field_id == field_id,
+                    FieldDailyStat.day.in_(days)
+                ).delete(synchronize_session=False)
+                stat_rows = _stat_rows(field_id, fold_bookings(rows))
+                if stat_rows:
+                    db.session.execute(insert(FieldDailyStat), stat_rows)
+                db.session.commit()
+        except Exception as e:
+            print(f"Error refreshing daily stats for field {field_id}: {e}") # Log the error
+
+
+def rebuild_daily_stats(start_date=None, end_date=None, field_ids=None):
+    """Recompute rollups for [start_date, end_date] (all time by default), one field per transaction"""
+    if field_ids is None:
+        field_ids = [field_id for field_id, in db.session.query(Field.id).order_by(Field.id).all()]
+    days = 0
+    for field_id in field_ids:
+        with field_booking_lock(field_id):
+            stats = FieldDailyStat.query.filter(FieldDailyStat.field_id == field_id)
+            rows = _booking_rows().filter(Booking.field_id == field_id)
+            if start_date:
+                stats = stats.filter(FieldDailyStat.day >= start_date)
+                rows = rows.filter(Booking.start_time >= _day_bounds(start_date)[0])
+            if end_date:
+                stats = stats.filter(FieldDailyStat.day <= end_date)
+                rows = rows.filter(Booking.start_time < _day_bounds(end_date)[1])
+            stats.delete(synchronize_session=False)
+            stat_rows = _stat_rows(field_id, fold_bookings(rows.yield_per(REBUILD_BATCH_SIZE)))
+            for index in range(0, len(stat_rows), REBUILD_BATCH_SIZE):
+                db.session.execute(insert(FieldDailyStat), stat_rows[index:index + REBUILD_BATCH_SIZE])
+            db.session.commit()
+        days += len(stat_rows)
+    return {'fields': len(field_ids), 'days': days}
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-daily-stats')
+    @click.option('--from', 'start', default=None, help='First day to rebuild (YYYY-MM-DD)')
+    @click.option('--to', 'end', default=None, help='Last day to rebuild (YYYY-MM-DD)')
+    @click.option('--field-id', 'field_ids', type=int, multiple=True, help='Only these fields (repeatable)')
+    def rebuild_daily_stats_command(start, end, field_ids):
+        """Backfill or repair field_daily_stats from the bookings table"""
+        try:
+            start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        except ValueError:
+            raise click.BadParameter('Dates must be YYYY-MM-DD')
+        result = rebuild_daily_stats(start_date, end_date, list(field_ids) or None)
+        click.echo(f"Rebuilt {result['days']} daily rows for {result['fields']} fields")
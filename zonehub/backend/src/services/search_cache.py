@@ -0,0 +1,109 @@
+# backend/src/services/search_cache.py
+# Result cache for /api/fields/search. Entries hold only the ordered list of
+# matching field ids for a canonicalized filter set; row payloads come from
+# the detail cache or one batch load. Date/availability is not part of the key:
+# it is applied on top from the occupancy bitmaps, so bookings never evict.
+from src.config import CACHE_CONFIG
+from src.services.cache import TTLCache
+from src.services.text_search import tokenize
+
+# Placeholder values sent by the search page dropdowns meaning "no filter"
+ANY_FIELD_TYPE = 'Tất cả loại sân'
+ANY_AREA = 'Tất cả khu vực'
+TEXT_FILTERS = ('q', 'field_type', 'area', 'city')
+PRICE_FILTERS = ('min_price', 'max_price')
+
+search_cache = TTLCache(maxsize=CACHE_CONFIG['SEARCH_MAXSIZE'], ttl=CACHE_CONFIG['SEARCH_TTL'])
+# Cached instead of the ids when more than SEARCH_MAX_IDS fields match
+TOO_MANY = object()
+
+
+def canonical_filters(args):
+    """Normalize search args so equivalent requests share one cache entry.
+
+    Text is accent-folded and re-joined from its tokens ("Quận  1" and
+    "quan 1" are the same filter); unparseable prices are dropped, as the
+    search route has always ignored them.
+    """
+    filters = {}
+    for name in TEXT_FILTERS:
+        value = args.get(name)
+        if not value or (name == 'field_type' and value == ANY_FIELD_TYPE) or (name == 'area' and value == ANY_AREA):
+            continue
+        tokens = tokenize(value)
+        if tokens:
+            filters[name] = ' '.join(tokens)
+    for name in PRICE_FILTERS:
+        value = args.get(name)
+        if not value:
+            continue
+        try:
+            filters[name] = float(value)
+        except ValueError:
+            pass
+    return filters
+
+
+def search_key(filters):
+    return ('search',) + tuple(sorted(filters.items()))
+
+
+def field_snapshot(field):
+    """The attributes a cached search entry can be keyed on"""
+    return {'city': field.city, 'field_type': field.field_type, 'price_per_hour': field.price_per_hour}
+
+
+def _tokens_within(filter_text, value):
+    return set(filter_text.split()) <= set(tokenize(value))
+
+
+def could_match(filters, snapshot):
+    """Whether a field in this state might belong to a search with these filters.
+
+    Conservative: free text (q) is not evaluated and always counts as a match.
+    """
+    for name in ('area', 'city'):
+        if name in filters and not _tokens_within(filters[name], snapshot['city']):
+            return False
+    if 'field_type' in filters and not _tokens_within(filters['field_type'], snapshot['field_type']):
+        return False
+    price = snapshot['price_per_hour']
+    if price is not None:
+        if 'min_price' in filters and price < filters['min_price']:
+            return False
+        if 'max_price' in filters and price > filters['max_price']:
+            return False
+    return True
+
+
+def invalidate_field(*snapshots):
+    """Evict only the entries a field could have left or joined.
+
+    Pass the snapshot from before and/or after the change (None is skipped).
+    """
+    snapshots = [s for s in snapshots if s is not None]
+    if not snapshots:
+        return
+
+    def affected(key):
+        filters = dict(key[1:])
+        return any(could_match(filters, snapshot) for snapshot in snapshots)
+
+    search_cache.delete_where(affected)
+
+
+def cached_search_ids(filters, load_ids):
+    """Ordered ids for `filters`, from cache or load_ids(limit).
+
+    Returns None when more than SEARCH_MAX_IDS fields match: the caller then
+    pages in SQL. Only that fact is cached, so such a search never loads
+    more than SEARCH_MAX_IDS + 1 ids.
+    """
+    max_ids = CACHE_CONFIG['SEARCH_MAX_IDS']
+
+    def load():
+        ids = load_ids(max_ids + 1)
+        return ids if len(ids) <= max_ids else TOO_MANY
+
+    ids = search_cache.get_or_load(search_key(filters), load)
+    return None if ids is TOO_MANY else ids
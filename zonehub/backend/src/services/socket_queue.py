@@ -0,0 +1,311 @@
+# backend/src/services/socket_queue.py
+# Cross-process SocketIO for running several app workers. Each worker keeps its
+# own sockets; emits, room joins/leaves and close_room go through a pub/sub
+# backend (SOCKETIO_CONFIG['MESSAGE_QUEUE']) so a broadcast reaches clients
+# connected to any worker:
+#   redis://, rediss://  Redis (pip install redis) - production
+#   kafka://             Kafka (pip install kafka-python)
+#   amqp://, memory://   Kombu (pip install kombu); memory:// only within one process
+#   tcp://host:port      The small broker below (`flask socketio-broker`), no
+#                        extra packages - local runs and the fan-out load test
+# Unset: single process, exactly as before.
+#
+# The same channel carries index and slot-hold changes between workers
+# (publish_sync / on_sync), so a field or booking written on one worker is
+# searchable and blocks the slot on the others right away. Changes published
+# while a worker is cut off from the tcp:// broker are lost, so on reconnect it
+# drops what may have gone stale (on_reconnect) and reloads it from the database.
+#
+# Socket.IO sessions are per worker, so the load balancer must be sticky
+# (e.g. nginx ip_hash): long-polling requests of one client have to land on
+# the worker that holds its sid. See README.md.
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlsplit
+import queue
+import click
+import socketio
+from src.config import CHAT_CONFIG, SOCKETIO_CONFIG
+from src.services.chat_auth import chat_sessions, chat_room_id
+
+RECONNECT_MAX_DELAY = 30  # seconds between broker reconnect attempts, at most
+# Lines queued for one worker before the broker gives up on it as stalled
+BROKER_CLIENT_BACKLOG = 10000
+# pub/sub method for cross-worker state changes; python-socketio ignores unknown methods
+SYNC_METHOD = 'zonehub_sync'
+
+_sync_handlers = {}
+_reconnect_handlers = []
+
+
+def on_sync(kind):
+    """Register the function that applies a `kind` change published by another worker"""
+    def register(handler):
+        _sync_handlers[kind] = handler
+        return handler
+    return register
+
+
+def on_reconnect(handler):
+    """Register a function that drops local state other workers may have changed
+    while this one was disconnected from the message queue"""
+    _reconnect_handlers.append(handler)
+    return handler
+
+
+def resync_local_state(logger=None):
+    """Run the on_reconnect handlers; each one failing on its own"""
+    for handler in _reconnect_handlers:
+        try:
+            handler()
+        except Exception as e:
+            if logger is not None:
+                logger.error(f'Cannot reset {handler.__name__} after reconnecting: {e}')
+
+
+def publish_sync(kind, **data):
+    """Send a local change to the other workers (no-op without a message queue)"""
+    from src.extensions import socketio as app_socketio
+    manager = getattr(app_socketio.server, 'manager', None)
+    if isinstance(manager, socketio.PubSubManager):
+        manager._publish({'method': SYNC_METHOD, 'kind': kind, 'data': data, 'host_id': manager.host_id})
+
+
+def parse_tcp_url(url):
+    """'tcp://host:port' -> (host, port)"""
+    parts = urlsplit(url)
+    if parts.scheme != 'tcp' or not parts.hostname or not parts.port:
+        raise ValueError(f'Expected tcp://host:port, got {url!r}')
+    return parts.hostname, parts.port
+
+
+class TcpManager(socketio.PubSubManager):
+    """Client manager for the tcp:// broker: one JSON line per message, tagged with the channel"""
+    name = 'tcp'
+
+    def __init__(self, url='tcp://127.0.0.1:6390', channel='socketio', write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.address = parse_tcp_url(url)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _publish(self, data):
+        line = (self.json.dumps({'channel': self.channel, 'data': data}) + '\n').encode('utf-8')
+        with self._publish_lock:
+            for retries_left in (1, 0):  # 2 attempts, like the Redis manager
+                try:
+                    if self._publisher is None:
+                        self._publisher = socket.create_connection(self.address)
+                    self._publisher.sendall(line)
+                    return
+                except OSError as e:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                        self._publisher = None
+                    if not retries_left:
+                        self._get_logger().error(f'Cannot publish to {self.address}: {e}')
+
+    def _listen(self):
+        delay = 1
+        connected_before = False
+        while True:
+            try:
+                with socket.create_connection(self.address) as conn:
+                    delay = 1
+                    if connected_before:
+                        # publish_sync messages sent meanwhile never reached us
+                        resync_local_state(self._get_logger())
+                    connected_before = True
+                    for line in conn.makefile('rb'):
+                        message = self.json.loads(line)
+                        if message.get('channel') == self.channel:
+                            yield message['data']
+            except (OSError, ValueError) as e:
+                self._get_logger().error(f'Lost broker {self.address}, retrying in {delay}s: {e}')
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+class _BrokerClient:
+    """One worker connection: lines are queued by fan_out and written by a thread
+    of its own, so a worker that stops reading only holds up itself"""
+
+    def __init__(self, connection, wfile, backlog=BROKER_CLIENT_BACKLOG):
+        self.connection = connection
+        self.wfile = wfile
+        self.outbox = queue.Queue(maxsize=backlog)
+        self.closed = False
+        threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def send(self, line):
+        """Queue a line; False when the backlog is full"""
+        try:
+            self.outbox.put_nowait(line)
+            return True
+        except queue.Full:
+            return False
+
+    def _write_loop(self):
+        while not self.closed:
+            try:
+                line = self.outbox.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.wfile.write(line)
+                self.wfile.flush()
+            except (OSError, ValueError):
+                self.close()
+
+    def close(self):
+        """Drop the connection; the worker's read loop ends and it reconnects"""
+        self.closed = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # Already gone
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker = self.server
+        client = _BrokerClient(self.connection, self.wfile)
+        with broker.lock:
+            broker.clients.add(client)
+        try:
+            for line in self.rfile:
+                broker.fan_out(line)
+        except OSError:
+            pass  # The worker went away
+        finally:
+            client.closed = True
+            with broker.lock:
+                broker.clients.discard(client)
+
+
+class Broker(socketserver.ThreadingTCPServer):
+    """Relays every line received from any connection to all connections (senders included;
+    PubSubManager skips its own messages by host_id)"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _BrokerHandler)
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.relayed = 0
+
+    def fan_out(self, line):
+        with self.lock:
+            self.relayed += 1
+            clients = list(self.clients)
+        for client in clients:
+            if not client.send(line):
+                print(f"Broker: a worker fell {BROKER_CLIENT_BACKLOG} messages behind, disconnecting it") # Log the error
+                client.close()
+                with self.lock:
+                    self.clients.discard(client)
+
+
+def start_broker(host='127.0.0.1', port=6390):
+    """Serve the tcp:// broker on a daemon thread; returns the server (port=0 picks a free port)"""
+    broker = Broker((host, port))
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    return broker
+
+
+class _RevokeOnCloseRoom:
+    # close_room from any worker also drops this worker's cached chat grants
+    # for the room (services/chat_auth.py), so an archived room can't be
+    # re-joined or written to from another worker until the grant TTL runs out
+    def _handle_close_room(self, message):
+        super()._handle_close_room(message)
+        room_id = chat_room_id(message.get('room'))
+        if room_id is not None:
+            chat_sessions.revoke_room(room_id)
+
+
+class _ApplySync:
+    # Takes the publish_sync messages out of the stream before PubSubManager
+    # sees them and applies other workers' changes to this one
+    def _listen(self):
+        for message in super()._listen():
+            data = message
+            if not isinstance(data, dict):
+                try:
+                    data = self.json.loads(message)
+                except (TypeError, ValueError):
+                    yield message
+                    continue
+            if isinstance(data, dict) and data.get('method') == SYNC_METHOD:
+                if data.get('host_id') != self.host_id:
+                    self._apply_sync(data)
+                continue
+            yield data
+
+    def _apply_sync(self, data):
+        handler = _sync_handlers.get(data.get('kind'))
+        if handler is None:
+            return
+        try:
+            handler(**data.get('data', {}))
+        except Exception as e:
+            self._get_logger().error(f"Cannot apply {data.get('kind')} change from another worker: {e}")
+
+
+def _manager_class(url):
+    # Same scheme mapping as Flask-SocketIO, plus tcp://
+    if url.startswith('tcp://'):
+        return TcpManager
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager
+    if url.startswith('kafka://'):
+        return socketio.KafkaManager
+    if url.startswith('zmq'):
+        return socketio.ZmqManager
+    return socketio.KombuManager
+
+
+def client_manager(url, channel, write_only=False):
+    base = _manager_class(url)
+    manager_class = type(f'Chat{base.__name__}', (_RevokeOnCloseRoom, _ApplySync, base), {})
+    return manager_class(url, channel=channel, write_only=write_only)
+
+
+def socketio_options(config=SOCKETIO_CONFIG):
+    """Keyword arguments for socketio.init_app: the client manager when a message queue is set"""
+    options = {}
+    if config['ASYNC_MODE']:
+        options['async_mode'] = config['ASYNC_MODE']
+    if config['MESSAGE_QUEUE']:
+        options['client_manager'] = client_manager(config['MESSAGE_QUEUE'], config['CHANNEL'])
+        if CHAT_CONFIG['WORKER_ID'] is None:
+            print("SOCKETIO_MESSAGE_QUEUE is set but CHAT_WORKER_ID is not: give every worker its own id (0-31)") # Warn
+    return options
+
+
+def start_listening(socketio_instance):
+    """Subscribe to the message queue now: python-socketio waits for the first
+    socket connection, and until then this worker would miss publish_sync changes"""
+    server = socketio_instance.server
+    if server is not None and isinstance(server.manager, socketio.PubSubManager) and not server.manager_initialized:
+        server.manager_initialized = True
+        server.manager.initialize()
+
+
+def register_commands(app):
+    @app.cli.command('socketio-broker')
+    @click.option('--host', default='127.0.0.1', help='Interface to bind (keep it private: messages are not authenticated)')
+    @click.option('--port', type=int, default=6390, help='Port the workers connect to (SOCKETIO_MESSAGE_QUEUE=tcp://host:port)')
+    def socketio_broker_command(host, port):
+        """Run the tcp:// pub/sub broker in the foreground"""
+        broker = Broker((host, port))
+        click.echo(f'SocketIO broker listening on tcp://{host}:{port}')
+        try:
+            broker.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            broker.server_close()
@@ -0,0 +1,170 @@
+# backend/src/services/sweeper.py
+# Expires pending bookings that were never paid. Runs as a background task in
+# the app process (start_pending_sweeper) or once from the CLI
+# (flask expire-pending-bookings); each pass works in batches of one locking
+# SELECT, one UPDATE and one multi-row notification INSERT per commit.
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import insert
+from src.app import db
+from src.config import SWEEPER_CONFIG
+from src.models.booking import Booking
+from src.models.field import Field
+from src.models.notification import Notification
+from src.services.availability import booking_changed
+from src.services.analytics import invalidate_owner_stats
+from src.services.booking_feed import publish_booking_changes
+from src.services.rollups import refresh_daily_stats
+from src.services.idempotency import purge_idempotency_keys
+
+EXPIRED_STATUS = 'expired'
+
+# What booking_changed() needs to free the slot without reloading the row
+_ExpiredBooking = namedtuple('_ExpiredBooking', 'id field_id user_id start_time end_time status')
+
+
+class SweepMetrics:
+    """Counters for /api/admin/sweeper: rows processed and time taken per run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.errors = 0
+        self.total_expired = 0
+        self.last_run_at = None
+        self.last_expired = 0
+        self.last_batches = 0
+        self.last_duration_ms = None
+        self.last_error = None
+
+    def record(self, expired, batches, duration, error=None):
+        with self._lock:
+            self.runs += 1
+            self.total_expired += expired
+            self.last_run_at = datetime.utcnow()
+            self.last_expired = expired
+            self.last_batches = batches
+            self.last_duration_ms = round(duration * 1000, 2)
+            if error is not None:
+                self.errors += 1
+                self.last_error = error
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'errors': self.errors,
+                'total_expired': self.total_expired,
+                'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+                'last_expired': self.last_expired,
+                'last_batches': self.last_batches,
+                'last_duration_ms': self.last_duration_ms,
+                'last_error': self.last_error
+            }
+
+
+sweep_metrics = SweepMetrics()
+
+
+def _expire_batch(cutoff, now, batch_size):
+    """Expire up to batch_size stale pending bookings; returns the rows handled"""
+    # SKIP LOCKED leaves rows that a payment is confirming right now to the next run
+    rows = db.session.query(
+        Booking.id, Booking.field_id, Booking.user_id, Booking.start_time, Booking.end_time, Field.owner_id
+    ).join(Field, Field.id == Booking.field_id).filter(
+        Booking.status == 'pending',
+        Booking.created_at < cutoff
+    ).order_by(Booking.id).limit(batch_size).with_for_update(skip_locked=True, of=Booking).all()
+    if not rows:
+        db.session.rollback()
+        return rows
+
+    Booking.query.filter(Booking.id.in_([row.id for row in rows])).update(
+        {'status': EXPIRED_STATUS, 'updated_at': now}, synchronize_session=False
+    )
+    db.session.execute(insert(Notification), [
+        {
+            'user_id': row.user_id,
+            'title': 'Đặt sân đã hết hạn',
+            'message': f'Đơn đặt sân #{row.id} lúc {row.start_time.strftime("%H:%M %d/%m/%Y")} '
+                       f'đã bị hủy do chưa được thanh toán.',
+            'type': 'booking',
+            'related_id': row.id,
+            'is_read': False,
+            'created_at': now
+        }
+        for row in rows
+    ])
+    db.session.commit()
+    return rows
+
+
+def expire_pending_bookings(ttl=None, batch_size=None, now=None):
+    """One sweep: expire every pending booking created more than `ttl` seconds ago"""
+    ttl = SWEEPER_CONFIG['PENDING_TTL'] if ttl is None else ttl
+    batch_size = batch_size or SWEEPER_CONFIG['BATCH_SIZE']
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=ttl)
+    started = time.monotonic()
+    expired = 0
+    batches = 0
+    try:
+        while True:
+            rows = _expire_batch(cutoff, now, batch_size)
+            if not rows:
+                break
+            batches += 1
+            expired += len(rows)
+            # Free the slots in the in-memory availability views, dashboards and live feeds
+            by_owner = {}
+            for row in rows:
+                by_owner.setdefault(row.owner_id, []).append(_ExpiredBooking(
+                    row.id, row.field_id, row.user_id, row.start_time, row.end_time, EXPIRED_STATUS
+                ))
+            for owner_id, expired_rows in by_owner.items():
+                booking_changed(*expired_rows)
+                refresh_daily_stats(*expired_rows)
+                invalidate_owner_stats(owner_id)
+                publish_booking_changes(EXPIRED_STATUS, owner_id, *expired_rows)
+            if len(rows) < batch_size:
+                break
+    except Exception as e:
+        db.session.rollback()
+        sweep_metrics.record(expired, batches, time.monotonic() - started, error=str(e))
+        raise
+    sweep_metrics.record(expired, batches, time.monotonic() - started)
+    return {'expired': expired, 'batches': batches}
+
+
+def start_pending_sweeper(app, socketio):
+    """Run expire_pending_bookings (and purge old Idempotency-Key rows) every SWEEPER_CONFIG['INTERVAL'] seconds in the background"""
+    def loop():
+        while True:
+            socketio.sleep(SWEEPER_CONFIG['INTERVAL'])
+            with app.app_context():
+                try:
+                    result = expire_pending_bookings()
+                    if result['expired']:
+                        print(f"Pending sweeper expired {result['expired']} bookings") # Log the run
+                    purge_idempotency_keys()
+                except Exception as e:
+                    print(f"Error expiring pending bookings: {e}") # Log the error
+                finally:
+                    db.session.remove()
+
+    return socketio.start_background_task(loop)
+
+
+def register_commands(app):
+    @app.cli.command('expire-pending-bookings')
+    @click.option('--ttl', type=int, default=None, help='Age in seconds after which a pending booking expires')
+    @click.option('--batch-size', type=int, default=None, help='Rows per UPDATE batch')
+    def expire_pending_bookings_command(ttl, batch_size):
+        """Expire stale pending bookings and purge old Idempotency-Key rows once (for cron in multi-worker deployments)"""
+        result = expire_pending_bookings(ttl=ttl, batch_size=batch_size)
+        click.echo(f"Expired {result['expired']} bookings in {result['batches']} batches "
+                   f"({sweep_metrics.last_duration_ms} ms)")
+        click.echo(f"Purged {purge_idempotency_keys()} old Idempotency-Key rows")
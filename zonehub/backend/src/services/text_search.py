@@ -0,0 +1,173 @@
+# backend/src/services/text_search.py
+# Inverted index over field name/address/city/type and complex name.
+# Tokens are accent-folded so "quan 1", "Quận 1" and "QUAN 1" all match, and a
+# sorted vocabulary per attribute gives prefix matching for autocomplete.
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from src.services.cache import index_fresh
+
+ATTRIBUTES = ('name', 'address', 'city', 'field_type', 'complex')
+# Pseudo-attribute holding the union of all the above, used for free text
+ALL = 'all'
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Lowercase and strip Vietnamese diacritics ('Đà Nẵng' -> 'da nang')"""
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn').lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text))
+
+
+class TextIndex:
+    """attribute -> token -> {field_id}, plus a small doc store for suggestions"""
+
+    def __init__(self):
+        self._postings = {attr: {} for attr in ATTRIBUTES + (ALL,)}
+        self._vocab = {attr: [] for attr in ATTRIBUTES + (ALL,)}
+        self._docs = {}
+        self._doc_tokens = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def clear(self):
+        with self._lock:
+            self._postings = {attr: {} for attr in ATTRIBUTES + (ALL,)}
+            self._vocab = {attr: [] for attr in ATTRIBUTES + (ALL,)}
+            self._docs = {}
+            self._doc_tokens = {}
+            self.loaded = False
+
+    def _add_token(self, attr, token, field_id):
+        postings = self._postings[attr]
+        ids = postings.get(token)
+        if ids is None:
+            ids = postings[token] = set()
+            insort(self._vocab[attr], token)
+        ids.add(field_id)
+
+    def _remove_token(self, attr, token, field_id):
+        postings = self._postings[attr]
+        ids = postings.get(token)
+        if ids is None:
+            return
+        ids.discard(field_id)
+        if not ids:
+            del postings[token]
+            vocab = self._vocab[attr]
+            pos = bisect_left(vocab, token)
+            if pos < len(vocab) and vocab[pos] == token:
+                del vocab[pos]
+
+    def upsert(self, field_id, name=None, address=None, city=None, field_type=None, complex_name=None):
+        """Index (or re-index) one field; only changed tokens touch the postings"""
+        values = {'name': name, 'address': address, 'city': city,
+                  'field_type': field_type, 'complex': complex_name}
+        new_tokens = {attr: set(tokenize(values[attr])) for attr in ATTRIBUTES}
+        new_tokens[ALL] = set().union(*new_tokens.values())
+        with self._lock:
+            old_tokens = self._doc_tokens.get(field_id, {})
+            for attr, tokens in new_tokens.items():
+                previous = old_tokens.get(attr, set())
+                for token in previous - tokens:
+                    self._remove_token(attr, token, field_id)
+                for token in tokens - previous:
+                    self._add_token(attr, token, field_id)
+            self._doc_tokens[field_id] = new_tokens
+            self._docs[field_id] = {
+                'id': field_id,
+                'name': name,
+                'city': city,
+                'field_type': field_type,
+                'cluster_name': complex_name,
+                '_folded_name': fold(name)
+            }
+
+    def remove(self, field_id):
+        with self._lock:
+            for attr, tokens in self._doc_tokens.pop(field_id, {}).items():
+                for token in tokens:
+                    self._remove_token(attr, token, field_id)
+            self._docs.pop(field_id, None)
+
+    def _lookup(self, attr, token, prefix):
+        if not prefix:
+            return self._postings[attr].get(token, set())
+        vocab = self._vocab[attr]
+        postings = self._postings[attr]
+        matched = set()
+        pos = bisect_left(vocab, token)
+        while pos < len(vocab) and vocab[pos].startswith(token):
+            matched |= postings[vocab[pos]]
+            pos += 1
+        return matched
+
+    def match(self, text, attr=ALL, prefix=False):
+        """Ids containing every token of `text` in `attr`.
+
+        With prefix=True the last token is treated as a prefix (type-ahead).
+        Returns None when `text` has no searchable tokens.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        with self._lock:
+            result = None
+            # Rarest-first keeps the intersections small
+            lookups = []
+            for i, token in enumerate(tokens):
+                lookups.append(self._lookup(attr, token, prefix and i == len(tokens) - 1))
+            for ids in sorted(lookups, key=len):
+                result = set(ids) if result is None else result & ids
+                if not result:
+                    break
+            return result
+
+    def suggest(self, text, limit=10):
+        """Autocomplete: fields matching `text`, name-prefix hits first"""
+        ids = self.match(text, prefix=True)
+        if not ids:
+            return []
+        folded = fold(text).strip()
+        with self._lock:
+            docs = [self._docs[field_id] for field_id in ids if field_id in self._docs]
+        top = heapq.nsmallest(
+            limit, docs, key=lambda d: (not d['_folded_name'].startswith(folded), d['_folded_name'], d['id'])
+        )
+        return [{k: v for k, v in d.items() if not k.startswith('_')} for d in top]
+
+
+text_index = TextIndex()
+
+
+def ensure_text_index():
+    """Build the index from one join over fields/field_complexes on first use, and again once INDEX_TTL has passed"""
+    if index_fresh(text_index):
+        return text_index
+    from src.app import db
+    from src.models.field import Field, FieldComplex
+    with text_index._lock:
+        if not index_fresh(text_index):
+            text_index.clear()
+            rows = db.session.query(
+                Field.id, Field.name, Field.address, Field.city, Field.field_type, FieldComplex.name
+            ).outerjoin(FieldComplex, Field.complex_id == FieldComplex.id).all()
+            for field_id, name, address, city, field_type, complex_name in rows:
+                text_index.upsert(field_id, name, address, city, field_type, complex_name)
+            text_index.loaded = True
+            text_index.loaded_at = time.monotonic()
+    return text_index
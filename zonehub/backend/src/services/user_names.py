@@ -0,0 +1,52 @@
+# backend/src/services/user_names.py
+# In-process cache of user display names (full_name) for serializers that
+# show who did something, e.g. chat messages. Misses for a whole batch are
+# loaded with one query; a profile change drops the user's entry on every worker.
+from src.config import CACHE_CONFIG
+from src.services.cache import TTLCache
+from src.services.socket_queue import on_sync, on_reconnect, publish_sync
+
+# Keyed ('name', user_id)
+display_names = TTLCache(maxsize=CACHE_CONFIG['NAMES_MAXSIZE'], ttl=CACHE_CONFIG['NAMES_TTL'])
+
+
+def display_names_for(user_ids):
+    """{user_id: full_name}; uncached users are loaded in one query (unknown ids are left out)"""
+    from src.app import db
+    from src.models.user import User
+    names = {}
+    missing = []
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        name = display_names.get(('name', user_id))
+        if name is None:
+            missing.append(user_id)
+        else:
+            names[user_id] = name
+    if not missing:
+        return names
+
+    generation = display_names.generation
+    for user_id, full_name in db.session.query(User.id, User.full_name).filter(User.id.in_(missing)).all():
+        display_names.set(('name', user_id), full_name, generation=generation)
+        names[user_id] = full_name
+    return names
+
+
+def display_name(user_id):
+    return display_names_for([user_id]).get(user_id)
+
+
+def invalidate_display_name(user_id):
+    """Drop a cached name after the user's profile changes, here and on the other workers"""
+    _drop_display_name(user_id)
+    publish_sync('user_name', user_id=user_id)
+
+
+@on_sync('user_name')
+def _drop_display_name(user_id):
+    display_names.delete(('name', user_id))
+
+
+on_reconnect(display_names.clear)
@@ -1,6 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import api from '../../services/api';
+import { subscribeField, BookingFeedEvent } from '../../services/bookingFeed';
 import { Button } from '../ui/button';
 import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from '../ui/card';
 import { Calendar } from '../ui/calendar';
@@ -20,6 +21,10 @@ const BookingForm: React.FC<BookingFormProps> = () => {
   const [date, setDate] = useState<Date | undefined>(new Date());
   const [timeSlots, setTimeSlots] = useState<{ start: string; end: string; available: boolean }[]>([]);
   const [selectedSlot, setSelectedSlot] = useState<number | null>(null);
+  // Short server-side hold on the picked slot so nobody else grabs it during checkout
+  const [holdToken, setHoldToken] = useState<string | null>(null);
+  // One Idempotency-Key per picked slot, so a retried or double-clicked booking is created once
+  const [bookingKey, setBookingKey] = useState<string>('');
   
   useEffect(() => {
     const fetchField = async () => {
@@ -47,6 +52,40 @@ const BookingForm: React.FC<BookingFormProps> = () => {
     }
   }, [date]);
   
+  // Live slot changes for this field, so the grid stays current without re-polling
+  const dateRef = useRef(date);
+  dateRef.current = date;
+  
+  useEffect(() => {
+    if (!fieldId) return;
+    
+    const applyEvent = (event: BookingFeedEvent) => {
+      if (!dateRef.current) return;
+      const day = format(dateRef.current, 'yyyy-MM-dd');
+      const freed = event.action === 'cancelled' || event.action === 'expired';
+      setTimeSlots((prev) => {
+        const next = prev.map((slot) => ({ ...slot }));
+        for (const booking of event.bookings) {
+          // Server times are naive local times: 'YYYY-MM-DDTHH:MM:SS'
+          if (booking.start_time.slice(0, 10) !== day) continue;
+          const startHour = parseInt(booking.start_time.slice(11, 13));
+          const endHour = booking.end_time.slice(0, 10) === day
+            ? Math.ceil(parseInt(booking.end_time.slice(11, 13)) + parseInt(booking.end_time.slice(14, 16)) / 60)
+            : 24;
+          next.forEach((slot) => {
+            const hour = parseInt(slot.start);
+            if (hour >= startHour && hour < endHour) {
+              slot.available = freed;
+            }
+          });
+        }
+        return next;
+      });
+    };
+    
+    return subscribeField(parseInt(fieldId), applyEvent, () => generateTimeSlots());
+  }, [fieldId]);
+  
   const generateTimeSlots = async () => {
     if (!date || !fieldId) return;
     
@@ -67,25 +106,19 @@ const BookingForm: React.FC<BookingFormProps> = () => {
       // Format date for API
       const formattedDate = format(date, 'yyyy-MM-dd');
       
-      // Fetch bookings for this field on this date
-      const response = await api.get(`/api/bookings/field/${fieldId}`, {
-        params: { date: formattedDate }
+      // Booked hours for this date as a bitmap, one '0'/'1' per hour from 6:00
+      const response = await api.get(`/api/fields/${fieldId}/availability`, {
+        params: { from: formattedDate, to: formattedDate, granularity: 60 }
       });
       
-      const bookings = response.data.bookings || [];
+      const busy: string = response.data.days?.[0]?.busy || '';
       
       // Mark booked slots as unavailable
-      bookings.forEach((booking: any) => {
-        const startHour = new Date(booking.start_time).getHours();
-        const endHour = new Date(booking.end_time).getHours();
-        
-        for (let hour = startHour; hour < endHour; hour++) {
-          const index = hour - 6; // Adjust for our 6:00 start
-          if (index >= 0 && index < slots.length) {
-            slots[index].available = false;
-          }
+      for (let index = 0; index < slots.length; index++) {
+        if (busy[index] === '1') {
+          slots[index].available = false;
         }
-      });
+      }
       
       setTimeSlots(slots);
     } catch (error) {
@@ -98,29 +131,60 @@ const BookingForm: React.FC<BookingFormProps> = () => {
     }
   };
   
-  const handleBooking = async () => {
-    if (!date || selectedSlot === null || !field) return;
-    
-    const selectedTimeSlot = timeSlots[selectedSlot];
-    const [startHour] = selectedTimeSlot.start.split(':').map(Number);
-    const [endHour] = selectedTimeSlot.end.split(':').map(Number);
+  const slotDates = (index: number) => {
+    const [startHour] = timeSlots[index].start.split(':').map(Number);
+    const [endHour] = timeSlots[index].end.split(':').map(Number);
     
-    const startDate = new Date(date);
+    const startDate = new Date(date as Date);
     startDate.setHours(startHour, 0, 0, 0);
     
-    const endDate = new Date(date);
+    const endDate = new Date(date as Date);
     endDate.setHours(endHour, 0, 0, 0);
     
+    return { startDate, endDate };
+  };
+  
+  const handleSelectSlot = async (index: number) => {
+    if (!date) return;
+    const { startDate, endDate } = slotDates(index);
+    
+    try {
+      const response = await api.post('/api/bookings/holds', {
+        field_id: parseInt(fieldId as string),
+        start_time: startDate.toISOString(),
+        end_time: endDate.toISOString(),
+        replace: holdToken
+      });
+      setHoldToken(response.data.hold.token);
+      setBookingKey(crypto.randomUUID());
+      setSelectedSlot(index);
+    } catch (error) {
+      console.error('Error holding slot:', error);
+      toast({
+        title: 'Lỗi',
+        description: 'Khung giờ này đang được người khác giữ chỗ. Vui lòng chọn giờ khác.',
+        variant: 'destructive',
+      });
+    }
+  };
+  
+  const handleBooking = async () => {
+    if (!date || selectedSlot === null || !field) return;
+    
+    const { startDate, endDate } = slotDates(selectedSlot);
+    
     try {
       const bookingData = {
         field_id: parseInt(fieldId as string),
         start_time: startDate.toISOString(),
         end_time: endDate.toISOString(),
-        total_price: field.price_per_hour,
+        hold_token: holdToken,
         notes: 'Đặt sân qua ZoneHub'
       };
       
-      const response = await api.post('/api/bookings', bookingData);
+      const response = await api.post('/api/bookings', bookingData, {
+        headers: { 'Idempotency-Key': bookingKey }
+      });
       
       toast({
         title: 'Đặt sân thành công',
@@ -180,7 +244,7 @@ const BookingForm: React.FC<BookingFormProps> = () => {
                   variant={selectedSlot === index ? "default" : "outline"}
                   className={`${!slot.available ? 'bg-gray-200 text-gray-500 cursor-not-allowed' : ''}`}
                   disabled={!slot.available}
-                  onClick={() => setSelectedSlot(index)}
+                  onClick={() => handleSelectSlot(index)}
                 >
                   {slot.start} - {slot.end}
                 </Button>
@@ -30,6 +30,8 @@ const ChatComponent: React.FC<ChatComponentProps> = ({ roomId }) => {
   const [messages, setMessages] = useState<ChatMessageData[]>([]);
   const [newMessage, setNewMessage] = useState('');
   const [isConnected, setIsConnected] = useState(false);
+  // Cursor for the next older page; null once the start of the room is reached
+  const [olderCursor, setOlderCursor] = useState<number | null>(null);
   const socketRef = useRef<Socket | null>(null);
   const scrollAreaRef = useRef<HTMLDivElement>(null);
 
@@ -49,11 +51,9 @@ const ChatComponent: React.FC<ChatComponentProps> = ({ roomId }) => {
     if (!roomId || !token) return;
 
     // Initialize Socket.IO connection
-    // Pass token for potential authentication on connect or join
+    // The backend authenticates once per connection from this token and caches room access
     socketRef.current = io(SOCKET_URL, {
-      // auth: { token } // Standard way to send token on connection
-      // query: { token } // Alternative if backend expects it in query
-      // Backend example uses token in join_room event, so we don't strictly need it here
+      auth: { token },
       reconnectionAttempts: 5,
     });
 
@@ -81,11 +81,17 @@ const ChatComponent: React.FC<ChatComponentProps> = ({ roomId }) => {
       // Backend sends history upon joining
     });
 
-    socket.on('chat_history', (data: { room_id: number; messages: ChatMessageData[] }) => {
+    socket.on('chat_history', (data: { room_id: number; messages: ChatMessageData[]; before_id: number | null; next_before_id: number | null }) => {
       if (data.room_id === roomId) {
         console.log('Received chat history:', data.messages);
-        setMessages(data.messages);
-        scrollToBottom();
+        setOlderCursor(data.next_before_id);
+        if (data.before_id) {
+          // An older page goes above what is already shown
+          setMessages((prevMessages) => [...data.messages, ...prevMessages]);
+        } else {
+          setMessages(data.messages);
+          scrollToBottom();
+        }
       }
     });
 
@@ -114,13 +120,19 @@ const ChatComponent: React.FC<ChatComponentProps> = ({ roomId }) => {
     };
   }, [roomId, token, scrollToBottom]); // Add scrollToBottom dependency
 
+  const loadOlderMessages = () => {
+    if (socketRef.current && isConnected && olderCursor) {
+      socketRef.current.emit('get_chat_history', { room_id: roomId, before_id: olderCursor });
+    }
+  };
+
   const handleSendMessage = (e: React.FormEvent) => {
     e.preventDefault();
     if (newMessage.trim() && socketRef.current && isConnected && token) {
       const messageData = {
         room_id: roomId,
         content: newMessage,
-        token: token, // Send token with each message for stateless auth on backend event
+        // No token: the socket was authenticated on connect
       };
       socketRef.current.emit('send_message', messageData);
       setNewMessage('');
@@ -136,6 +148,11 @@ const ChatComponent: React.FC<ChatComponentProps> = ({ roomId }) => {
       <CardContent className="flex-grow overflow-hidden p-0">
         <ScrollArea className="h-full p-4" ref={scrollAreaRef}>
           <div className="space-y-4">
+            {olderCursor && (
+              <div className="text-center">
+                <Button variant="ghost" size="sm" onClick={loadOlderMessages}>Xem tin nhắn cũ hơn</Button>
+              </div>
+            )}
             {messages.map((msg) => (
               <div
                 key={msg.id}
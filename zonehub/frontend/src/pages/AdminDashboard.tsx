@@ -27,31 +27,24 @@ const AdminDashboard: React.FC = () => {
   const fetchAdminData = async () => {
     setLoading(true);
     try {
-      // Fetch all users
-      const usersResponse = await api.get('/api/users/all');
+      // Totals come pre-aggregated from the server; the lists below are the first page only
+      const summaryResponse = await api.get('/api/admin/summary');
+      const summary = summaryResponse.data;
+      
+      const usersResponse = await api.get('/api/users/all', { params: { sort: 'created_at', order: 'desc' } });
       setUsers(usersResponse.data.users || []);
       
-      // Fetch all fields
-      const fieldsResponse = await api.get('/api/fields');
+      const fieldsResponse = await api.get('/api/fields/');
       setFields(fieldsResponse.data.fields || []);
       
-      // Fetch all bookings
-      const bookingsResponse = await api.get('/api/bookings/all');
+      const bookingsResponse = await api.get('/api/bookings/all', { params: { sort: 'created_at', order: 'desc' } });
       setBookings(bookingsResponse.data.bookings || []);
       
-      // Calculate stats
-      const confirmedBookings = bookingsResponse.data.bookings.filter(
-        (booking: any) => booking.status === 'confirmed' || booking.status === 'completed'
-      );
-      const totalRevenue = confirmedBookings.reduce(
-        (sum: number, booking: any) => sum + booking.total_price, 0
-      );
-      
       setStats({
-        totalUsers: usersResponse.data.users.length,
-        totalFields: fieldsResponse.data.fields.length,
-        totalBookings: bookingsResponse.data.bookings.length,
-        totalRevenue: totalRevenue
+        totalUsers: summary.users.total,
+        totalFields: summary.fields.total,
+        totalBookings: summary.bookings.total,
+        totalRevenue: summary.revenue.bookings
       });
     } catch (error) {
       console.error('Error fetching admin data:', error);
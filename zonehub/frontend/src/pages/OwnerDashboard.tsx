@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import api from '../services/api';
+import { subscribeOwner, mergeBookings } from '../services/bookingFeed';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "../components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "../components/ui/tabs";
 import { Button } from "../components/ui/button";
@@ -12,17 +13,47 @@ const OwnerDashboard: React.FC = () => {
   const [fields, setFields] = useState<any[]>([]);
   const [bookings, setBookings] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  // Aggregates from /api/bookings/owner/stats (last 30 days, computed on the server)
   const [stats, setStats] = useState({
-    totalFields: 0,
-    totalBookings: 0,
-    pendingBookings: 0,
+    fields: 0,
+    total_bookings: 0,
+    pending_bookings: 0,
     revenue: 0
   });
+  const statsTimer = useRef<ReturnType<typeof setTimeout>>();
 
   useEffect(() => {
     fetchOwnerData();
+    // Bookings on our fields arrive as live events instead of re-fetching the list;
+    // the totals are re-read from the server
+    const unsubscribe = subscribeOwner(
+      (event) => {
+        setBookings((prev) => mergeBookings(prev, event.bookings));
+        scheduleStatsRefresh();
+      },
+      () => fetchOwnerData()
+    );
+    return () => {
+      unsubscribe();
+      clearTimeout(statsTimer.current);
+    };
   }, []);
 
+  const fetchStats = async () => {
+    try {
+      const response = await api.get('/api/bookings/owner/stats');
+      setStats(response.data.totals);
+    } catch (error) {
+      console.error('Error fetching owner stats:', error);
+    }
+  };
+
+  // A burst of feed events costs one stats request
+  const scheduleStatsRefresh = () => {
+    clearTimeout(statsTimer.current);
+    statsTimer.current = setTimeout(fetchStats, 500);
+  };
+
   const fetchOwnerData = async () => {
     setLoading(true);
     try {
@@ -30,22 +61,12 @@ const OwnerDashboard: React.FC = () => {
       const fieldsResponse = await api.get('/api/fields/owner');
       setFields(fieldsResponse.data.fields || []);
       
-      // Fetch bookings for all fields owned by the current user
-      const bookingsResponse = await api.get('/api/bookings/owner');
+      // Latest bookings on the owner's fields and the dashboard totals
+      const [bookingsResponse] = await Promise.all([
+        api.get('/api/bookings/owner', { params: { sort: 'start_time', order: 'desc', limit: 100 } }),
+        fetchStats()
+      ]);
       setBookings(bookingsResponse.data.bookings || []);
-      
-      // Calculate stats
-      const allBookings = bookingsResponse.data.bookings || [];
-      const pendingBookings = allBookings.filter((booking: any) => booking.status === 'pending');
-      const confirmedBookings = allBookings.filter((booking: any) => booking.status === 'confirmed' || booking.status === 'completed');
-      const totalRevenue = confirmedBookings.reduce((sum: number, booking: any) => sum + booking.total_price, 0);
-      
-      setStats({
-        totalFields: fieldsResponse.data.fields.length,
-        totalBookings: allBookings.length,
-        pendingBookings: pendingBookings.length,
-        revenue: totalRevenue
-      });
     } catch (error) {
       console.error('Error fetching owner data:', error);
       toast({
@@ -68,14 +89,12 @@ const OwnerDashboard: React.FC = () => {
           booking.id === bookingId ? { ...booking, status: newStatus } : booking
         )
       );
+      scheduleStatsRefresh();
       
       toast({
         title: 'Thành công',
         description: `Đã cập nhật trạng thái đặt sân thành ${newStatus === 'confirmed' ? 'đã xác nhận' : 'đã hủy'}`,
       });
-      
-      // Refresh data
-      fetchOwnerData();
     } catch (error) {
       console.error('Error updating booking status:', error);
       toast({
@@ -108,26 +127,26 @@ const OwnerDashboard: React.FC = () => {
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 mb-6">
         <Card>
           <CardContent className="p-6">
-            <div className="text-2xl font-bold">{stats.totalFields}</div>
+            <div className="text-2xl font-bold">{stats.fields}</div>
             <p className="text-muted-foreground">Tổng số sân</p>
           </CardContent>
         </Card>
         <Card>
           <CardContent className="p-6">
-            <div className="text-2xl font-bold">{stats.totalBookings}</div>
-            <p className="text-muted-foreground">Tổng số đặt sân</p>
+            <div className="text-2xl font-bold">{stats.total_bookings}</div>
+            <p className="text-muted-foreground">Đặt sân 30 ngày qua</p>
           </CardContent>
         </Card>
         <Card>
           <CardContent className="p-6">
-            <div className="text-2xl font-bold">{stats.pendingBookings}</div>
+            <div className="text-2xl font-bold">{stats.pending_bookings}</div>
             <p className="text-muted-foreground">Đặt sân chờ xác nhận</p>
           </CardContent>
         </Card>
         <Card>
           <CardContent className="p-6">
             <div className="text-2xl font-bold">{stats.revenue.toLocaleString('vi-VN')} VNĐ</div>
-            <p className="text-muted-foreground">Tổng doanh thu</p>
+            <p className="text-muted-foreground">Doanh thu 30 ngày qua</p>
           </CardContent>
         </Card>
       </div>
@@ -164,7 +183,7 @@ const OwnerDashboard: React.FC = () => {
                   <TableBody>
                     {bookings.map((booking) => (
                       <TableRow key={booking.id}>
-                        <TableCell>{booking.field_name}</TableCell>
+                        <TableCell>{booking.field_name ?? fields.find((field) => field.id === booking.field_id)?.name}</TableCell>
                         <TableCell>{booking.user_name}</TableCell>
                         <TableCell>
                           {formatDateTime(booking.start_time)} - {formatDateTime(booking.end_time)}
@@ -0,0 +1,67 @@
+import { io, Socket } from 'socket.io-client';
+
+// Live booking changes pushed by the backend (services/booking_feed.py)
+export interface BookingFeedEntry {
+  id: number;
+  start_time: string;
+  end_time: string;
+  status: string;
+  field_id?: number;
+  user_id?: number | null;
+  total_price?: number | null;
+}
+
+export interface BookingFeedEvent {
+  action: 'created' | 'updated' | 'cancelled' | 'paid' | 'expired';
+  field_id?: number;
+  at: string;
+  bookings: BookingFeedEntry[];
+}
+
+const SOCKET_URL = import.meta.env.VITE_SOCKET_URL || 'http://localhost:5000';
+
+const subscribe = (
+  event: string,
+  payload: () => object,
+  onEvent: (event: BookingFeedEvent) => void,
+  onReconnect?: () => void
+) => {
+  const socket: Socket = io(SOCKET_URL, { reconnectionAttempts: 5 });
+  let connectedBefore = false;
+
+  socket.on('connect', () => {
+    // Rooms do not survive a reconnect; events missed meanwhile need one re-fetch
+    if (connectedBefore && onReconnect) onReconnect();
+    connectedBefore = true;
+    socket.emit(event, payload());
+  });
+  socket.on('booking_event', onEvent);
+
+  return () => {
+    socket.disconnect();
+  };
+};
+
+// Slot changes of one field (no user details); returns an unsubscribe function
+export const subscribeField = (
+  fieldId: number,
+  onEvent: (event: BookingFeedEvent) => void,
+  onReconnect?: () => void
+) => subscribe('subscribe_field', () => ({ field_id: fieldId }), onEvent, onReconnect);
+
+// Every booking on the signed-in owner's fields; returns an unsubscribe function
+export const subscribeOwner = (
+  onEvent: (event: BookingFeedEvent) => void,
+  onReconnect?: () => void
+) => subscribe('subscribe_owner', () => ({ token: localStorage.getItem('token') }), onEvent, onReconnect);
+
+// Patch a booking list with feed entries: known ids are updated, new ones prepended
+export const mergeBookings = <T extends { id: number }>(current: T[], entries: BookingFeedEntry[]): T[] => {
+  const byId = new Map(entries.map((entry) => [entry.id, entry]));
+  const patch = (entry: BookingFeedEntry) =>
+    Object.fromEntries(Object.entries(entry).filter(([, value]) => value !== null && value !== undefined));
+  const merged = current.map((item) => (byId.has(item.id) ? { ...item, ...patch(byId.get(item.id)!) } : item));
+  const known = new Set(current.map((item) => item.id));
+  const added = entries.filter((entry) => !known.has(entry.id)).map((entry) => patch(entry) as unknown as T);
+  return [...added, ...merged];
+};